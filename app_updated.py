@@ -1,24 +1,67 @@
 import os
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, send_file
+import tempfile
+import json
+import hashlib
+import hmac
+import gzip
+import time
+from functools import partial, wraps
+import click
+from flask import Flask, Blueprint, current_app, render_template, request, redirect, url_for, flash, jsonify, session, send_file, Response, stream_with_context, abort
+from flask.cli import with_appcontext
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.dialects.mysql import LONGBLOB
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.local import LocalProxy
 from datetime import datetime
-from templates import get_built_in_templates
+from templates import SheetTemplate, get_built_in_templates, get_built_in_template
+from ttl_cache import TTLCache
+from pagination import keyset_page
+from sheet_patches import apply_patches, PatchError, PatchConflict
+from formula_engine import FormulaEngine, SheetCellReader, GridReader
+from sheet_export import iter_csv, write_csv, write_xlsx, attachment_header, EXPORT_MIMETYPES
+from pdf_export import create_pdf
+from export_cache import ExportCache
+from job_queue import JobQueue, DONE
+from sheet_import import RowReader, SheetImportError, IMPORT_FORMATS
+from sheet_codec import to_columns, from_columns, pack_rows, unpack_rows, SheetCodecError
+from assets import AssetPipeline
+from password_policy import PasswordHasher, PasswordHasherBusy
+from pool_metrics import PoolMetrics, engine_options
+from request_metrics import RequestMetrics, RequestProfiler
 from flask_wtf.csrf import CSRFProtect  # Add this import for CSRF protection
-import pandas as pd
 
-# Initialize Flask app
-app = Flask(__name__)
+# Extensions are bound to the app in create_app()
+db = SQLAlchemy()
+csrf = CSRFProtect()
+login_manager = LoginManager()
+login_manager.login_view = 'main.login'
+
+# Every route lives on this blueprint; create_app() registers it
+bp = Blueprint('main', __name__)
 
-# Load configuration from config.py
-app.config.from_pyfile('config.py')
+def _service(name):
+    """Proxy to one of the current app's services, built by create_app()"""
+    return LocalProxy(lambda: current_app.extensions['excel_generator'][name])
 
-# Initialize CSRF protection
-csrf = CSRFProtect(app)
+# Per-app services, usable wherever an app context is active (requests, CLI
+# commands and background jobs)
+password_hasher = _service('password_hasher')
+assets = _service('assets')
+export_cache = _service('export_cache')
+custom_template_cache = _service('custom_template_cache')
+user_cache = _service('user_cache')
+import_jobs = _service('import_jobs')
+export_jobs = _service('export_jobs')
+pool_metrics = _service('pool_metrics')
+request_metrics = _service('request_metrics')
+column_cache = _service('column_cache')
 
-# Add this new context processor somewhere near the top of the file, after app initialization but before route definitions
-@app.context_processor
+@bp.app_context_processor
 def utility_processor():
     """Add utility functions to Jinja context"""
     def route_exists(route_name):
@@ -28,16 +71,14 @@ def utility_processor():
             return True
         except:
             return False
+    
+    def asset_urls(bundle):
+        """URLs to load for an asset bundle: the hashed bundle, or its source files when bundling is off"""
+        if assets.enabled:
+            return [url_for('main.asset', filename=assets.bundle(bundle).filename)]
+        return [url_for('static', filename=filename) for filename in assets.files(bundle)]
             
-    return dict(route_exists=route_exists)
-
-# Initialize database
-db = SQLAlchemy(app)
-
-# Initialize LoginManager
-login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login'
+    return dict(route_exists=route_exists, asset_urls=asset_urls)
 
 # User model
 class User(UserMixin, db.Model):
@@ -56,37 +97,377 @@ class User(UserMixin, db.Model):
     # Relationship with DownloadHistory model
     downloads = db.relationship('DownloadHistory', backref='user', lazy=True)
     
+    # Relationship with CustomTemplate model
+    custom_templates = db.relationship('CustomTemplate', backref='user', lazy=True, cascade="all, delete-orphan")
+    
     def set_password(self, password):
-        # Use generate_password_hash with specified method and salt length
-        self.password_hash = generate_password_hash(
-            password, 
-            method='pbkdf2:sha256', 
-            salt_length=8
-        )
+        # Method and salt length come from the PASSWORD_HASH_* settings
+        self.password_hash = password_hasher.hash(password)
         
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        """Verify a password, upgrading the stored hash if the policy has changed"""
+        if not password_hasher.verify(self.password_hash, password):
+            return False
+        if password_hasher.needs_rehash(self.password_hash):
+            self.set_password(password)
+            db.session.commit()
+        return True
         
     def __repr__(self):
         return f'<User {self.username}>'
 
+@db.event.listens_for(User, 'after_update')
+@db.event.listens_for(User, 'after_delete')
+def invalidate_cached_user(mapper, connection, target):
+    """Profile or password changes drop the user's cached principal"""
+    user_cache.invalidate(target.id)
+
+class SessionUser(UserMixin):
+    """
+    Read-only snapshot of the signed-in user
+    
+    Holds only the fields views and templates read from current_user, so it
+    can be cached between requests and threads without a database session.
+    """
+    
+    def __init__(self, id, username, email, name, created_at):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.name = name
+        self.created_at = created_at
+    
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.username, user.email, user.name, user.created_at)
+    
+    def to_session(self):
+        """JSON-safe copy stored in the session cookie, stamped with when it was read"""
+        return {
+            'id': self.id,
+            'username': self.username,
+            'email': self.email,
+            'name': self.name,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'loaded_at': time.time()
+        }
+    
+    @classmethod
+    def from_session(cls, data, user_id, max_age):
+        """Rebuild the snapshot from the session if it belongs to user_id and is recent enough"""
+        if not isinstance(data, dict) or data.get('id') != user_id:
+            return None
+        if time.time() - data.get('loaded_at', 0) > max_age:
+            return None
+        created_at = data.get('created_at')
+        return cls(user_id, data.get('username'), data.get('email'), data.get('name'),
+                   datetime.fromisoformat(created_at) if created_at else None)
+    
+    def __repr__(self):
+        return f'<SessionUser {self.username}>'
+
 # Sheet model
 class Sheet(db.Model):
     __tablename__ = 'sheet'
     
     id = db.Column(db.Integer, primary_key=True)
     sheet_name = db.Column(db.String(100), nullable=False)
-    data = db.Column(db.JSON, nullable=False)
+    # Large JSON payloads are only loaded when accessed, so listings stay cheap
+    data = db.deferred(db.Column(db.JSON, nullable=True), group='content')  # Whole grid, only used by 'blob' storage
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    storage = db.Column(db.String(20), nullable=False, default='blob')  # blob or chunked
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+    chunk_size = db.Column(db.Integer, nullable=False, default=500)
+    version = db.Column(db.Integer, nullable=False, default=1)
+    # Version of the last save that may have moved cells (rows or columns inserted, deleted or moved)
+    structure_version = db.Column(db.Integer, nullable=False, default=1)
+    formula_cells = db.deferred(db.Column(db.JSON, nullable=True), group='content')    # {"row:col": formula}
+    computed_values = db.deferred(db.Column(db.JSON, nullable=True), group='content')  # {"row:col": display value}
+    typed_values = db.deferred(db.Column(db.JSON, nullable=True), group='content')     # {"row:col": value} the display misreads
+    
+    __table_args__ = (
+        db.Index('ix_sheet_user_id_sheet_name', 'user_id', 'sheet_name', unique=True),
+        db.Index('ix_sheet_user_id_created_at', 'user_id', 'created_at'),
+    )
+    # Every UPDATE is conditional on the version that was read (WHERE version = ?),
+    # so a concurrent writer raises StaleDataError instead of being overwritten.
+    # Writers bump the version themselves once per save.
+    __mapper_args__ = {'version_id_col': version, 'version_id_generator': False}
     
     # Relationship with DownloadHistory model
     downloads = db.relationship('DownloadHistory', backref='sheet', lazy=True)
     
+    def __init__(self, **kwargs):
+        data = kwargs.pop('data', None)
+        kwargs.setdefault('storage', current_app.config['SHEET_STORAGE'])
+        kwargs.setdefault('chunk_size', current_app.config['SHEET_CHUNK_ROWS'])
+        kwargs.setdefault('row_count', 0)
+        kwargs.setdefault('version', 1)
+        super().__init__(**kwargs)
+        if data is not None:
+            self.set_data(data)
+    
+    @property
+    def is_chunked(self):
+        return self.storage == 'chunked'
+    
+    def num_rows(self):
+        """Number of rows in the grid, header row included"""
+        if self.is_chunked:
+            return self.row_count
+        return len(self.data or [])
+    
+    def get_rows(self, start=0, stop=None):
+        """
+        Return rows [start, stop) of the grid. Row 0 is the header row.
+        
+        For chunked sheets only the chunks overlapping the range are loaded.
+        """
+        total = self.num_rows()
+        stop = total if stop is None else min(stop, total)
+        start = max(start, 0)
+        if start >= stop:
+            return []
+        # Rows are copied so callers can edit them without mutating loaded JSON in place
+        if not self.is_chunked:
+            return [list(row) for row in self.data[start:stop]]
+        
+        first = start // self.chunk_size
+        last = (stop - 1) // self.chunk_size
+        chunks = SheetChunk.query.filter(
+            SheetChunk.sheet_id == self.id,
+            SheetChunk.chunk_index.between(first, last)
+        ).order_by(SheetChunk.chunk_index)
+        
+        rows = []
+        for chunk in chunks:
+            rows.extend(chunk.load_rows())
+        offset = start - first * self.chunk_size
+        return rows[offset:offset + (stop - start)]
+    
+    def iter_rows(self, start=0, stop=None, chunks_per_query=8):
+        """Yield the rows of the grid, fetching a few chunks at a time"""
+        total = self.num_rows()
+        stop = total if stop is None else min(stop, total)
+        step = self.chunk_size * chunks_per_query if self.is_chunked else max(stop - start, 1)
+        for window_start in range(start, stop, step):
+            yield from self.get_rows(window_start, min(window_start + step, stop))
+    
+    def set_data(self, rows):
+        """Replace the whole grid. Chunked sheets only rewrite chunks whose contents changed."""
+        self.splice_rows(0, self.num_rows(), rows)
+        self.recalculate(rows=rows)
+    
+    def recalculate(self, changed_cells=None, rows=None):
+        """
+        Refresh the cached formula results stored with the sheet.
+        
+        Args:
+            changed_cells: (row, col) cells that were edited. Only formulas
+                downstream of them are recomputed. When omitted the formula
+                index is rebuilt by scanning the grid.
+            rows: The full grid, if the caller already has it in memory
+        """
+        reader = GridReader(rows) if rows is not None else SheetCellReader(self)
+        # Caches written before typed_values existed may have lost result types, so they are rebuilt
+        if changed_cells is None or self.formula_cells is None or self.typed_values is None:
+            engine = FormulaEngine.scan(reader)
+            engine.recalculate()
+            updated = engine.values
+        else:
+            # Columns parsed by an earlier save of this version; edited ones are dropped by update_cell
+            cached = column_cache.get(self.id)
+            columns = cached[1] if cached and cached[0] == self.version else None
+            engine = FormulaEngine.from_cache(reader, self.formula_cells, self.computed_values,
+                                              columns, self.typed_values)
+            for row, col in changed_cells:
+                engine.update_cell(row, col, reader.get(row, col))
+            updated = engine.recalculate(changed_cells)
+        self.formula_cells, self.computed_values, self.typed_values = engine.to_cache()
+        # Kept for the next save once this one commits (see publish_parsed_columns)
+        self._parsed_columns = engine.columns.columns
+        return {cell: engine.display_value(*cell) for cell in updated}
+    
+    def get_display_rows(self, start=0, stop=None):
+        """Like get_rows, but formula cells hold their computed value"""
+        return self.apply_computed(self.get_rows(start, stop), start)
+    
+    def iter_display_rows(self):
+        """Yield every row with formula results in place, reading a few chunks at a time"""
+        if self.formula_cells is None:
+            self.recalculate()
+        computed = {}
+        for key, value in (self.computed_values or {}).items():
+            row, col = map(int, key.split(':'))
+            computed.setdefault(row, []).append((col, value))
+        
+        for row_index, row in enumerate(self.iter_rows()):
+            for col, value in computed.get(row_index, ()):
+                if col < len(row):
+                    row[col] = value
+            yield row
+    
+    def apply_computed(self, rows, start):
+        """Replace formulas in `rows` (beginning at grid row `start`) with cached results"""
+        for key, value in self.computed_between(start, start + len(rows)).items():
+            row, col = map(int, key.split(':'))
+            if col < len(rows[row - start]):
+                rows[row - start][col] = value
+        return rows
+    
+    def computed_between(self, start, stop):
+        """Cached formula results ("row:col" -> display value) of grid rows [start, stop)"""
+        if self.formula_cells is None:
+            # Sheets saved before the formula cache existed build it on first use
+            self.recalculate()
+        return {key: value for key, value in (self.computed_values or {}).items()
+                if start <= int(key.split(':', 1)[0]) < stop}
+    
+    def set_rows(self, start, rows):
+        """Overwrite rows starting at `start`, growing the grid if needed"""
+        overlap = max(min(len(rows), self.num_rows() - start), 0)
+        self.splice_rows(start, overlap, rows)
+    
+    def splice_rows(self, start, delete_count, rows):
+        """
+        Remove `delete_count` rows at `start` and insert `rows` in their place.
+        
+        Args:
+            start: Index of the first row to replace (0 is the header row)
+            delete_count: Number of existing rows to remove
+            rows: List of rows to insert at `start`
+        """
+        total = self.num_rows()
+        start = min(max(start, 0), total)
+        delete_count = min(max(delete_count, 0), total - start)
+        new_total = total - delete_count + len(rows)
+        if not rows and not delete_count:
+            return
+        
+        if not self.is_chunked:
+            data = list(self.data or [])
+            data[start:start + delete_count] = rows
+            self.data = data
+            self.row_count = len(data)
+            return
+        
+        if self.id is None:
+            db.session.add(self)
+            db.session.flush()
+        
+        first = start // self.chunk_size
+        window_start = first * self.chunk_size
+        if len(rows) == delete_count:
+            # Same shape: only the chunks covering the replaced rows change
+            last = (start + delete_count - 1) // self.chunk_size
+            window_stop = min((last + 1) * self.chunk_size, total)
+        else:
+            # Rows after the splice point shift, so every later chunk is rewritten
+            window_stop = total
+        
+        if window_start == start and window_stop == start + delete_count:
+            # The replaced rows cover whole chunks, nothing else needs reading
+            window = list(rows)
+        else:
+            window = self.get_rows(window_start, window_stop)
+            offset = start - window_start
+            window[offset:offset + delete_count] = rows
+        
+        self._store_chunks(first, window, truncate=len(rows) != delete_count, total=new_total)
+        self.row_count = new_total
+    
+    def _store_chunks(self, first, rows, truncate, total):
+        """Write `rows` as consecutive chunks starting at chunk `first`"""
+        existing = dict(
+            db.session.query(SheetChunk.chunk_index, SheetChunk.checksum)
+            .filter(SheetChunk.sheet_id == self.id, SheetChunk.chunk_index >= first)
+        )
+        
+        for offset in range(0, len(rows), self.chunk_size):
+            index = first + offset // self.chunk_size
+            chunk_rows = rows[offset:offset + self.chunk_size]
+            checksum = chunk_checksum(chunk_rows)
+            if index not in existing:
+                db.session.add(SheetChunk(sheet_id=self.id, chunk_index=index,
+                                          checksum=checksum, **SheetChunk.encode(chunk_rows)))
+            elif existing[index] != checksum:
+                SheetChunk.query.filter_by(sheet_id=self.id, chunk_index=index)\
+                    .update(dict(SheetChunk.encode(chunk_rows), checksum=checksum), synchronize_session='fetch')
+        
+        if truncate:
+            last_needed = (total - 1) // self.chunk_size if total else -1
+            SheetChunk.query.filter(
+                SheetChunk.sheet_id == self.id,
+                SheetChunk.chunk_index > last_needed
+            ).delete(synchronize_session='fetch')
+    
+    def convert_to_chunked(self, chunk_size=None):
+        """Move a blob sheet into row chunks"""
+        if self.is_chunked:
+            return
+        rows = list(self.data or [])
+        self.storage = 'chunked'
+        self.chunk_size = chunk_size or current_app.config['SHEET_CHUNK_ROWS']
+        self.data = None
+        self.row_count = 0
+        self.splice_rows(0, 0, rows)
+    
+    def delete_chunks(self):
+        """Remove all chunk rows belonging to this sheet"""
+        SheetChunk.query.filter_by(sheet_id=self.id).delete(synchronize_session='fetch')
+    
     def __repr__(self):
         return f'<Sheet {self.sheet_name}>'
 
+def chunk_checksum(rows):
+    """Stable fingerprint of a chunk's rows, used to skip unchanged writes"""
+    payload = json.dumps(rows, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+# Sheet row chunk model
+class SheetChunk(db.Model):
+    __tablename__ = 'sheet_chunk'
+    
+    sheet_id = db.Column(db.Integer, db.ForeignKey('sheet.id', ondelete='CASCADE'), primary_key=True)
+    chunk_index = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    rows = db.Column(db.JSON, nullable=True)  # Plain JSON rows, used when compression is off
+    packed = db.Column(db.LargeBinary().with_variant(LONGBLOB(), 'mysql'), nullable=True)  # See sheet_codec
+    checksum = db.Column(db.String(40), nullable=False)
+    
+    @staticmethod
+    def encode(rows):
+        """Column values for storing `rows` with the configured compression"""
+        codec = current_app.config['SHEET_COMPRESSION']
+        if codec == 'none':
+            return {'rows': rows, 'packed': None}
+        return {'rows': None, 'packed': pack_rows(rows, codec)}
+    
+    def load_rows(self):
+        """Rows of this chunk as fresh lists; chunks written before compression are plain JSON"""
+        if self.packed is not None:
+            return unpack_rows(self.packed)
+        return [list(row) for row in self.rows]
+
+@db.event.listens_for(Sheet, 'after_insert')
+@db.event.listens_for(Sheet, 'after_update')
+def stage_parsed_columns(mapper, connection, target):
+    """Hold the columns parsed for the version being written until the transaction commits"""
+    columns = vars(target).pop('_parsed_columns', None)
+    if columns is not None:
+        object_session(target).info.setdefault('parsed_columns', {})[target.id] = (target.version, columns)
+
+@db.event.listens_for(Session, 'after_commit')
+def publish_parsed_columns(session):
+    """Share the committed versions' parsed columns with later requests in this process"""
+    for sheet_id, entry in session.info.pop('parsed_columns', {}).items():
+        column_cache.set(sheet_id, entry)
+
+@db.event.listens_for(Session, 'after_rollback')
+def discard_parsed_columns(session):
+    session.info.pop('parsed_columns', None)
+
 # Download History model
 class DownloadHistory(db.Model):
     __tablename__ = 'download_history'
@@ -98,23 +479,136 @@ class DownloadHistory(db.Model):
     format = db.Column(db.String(20), nullable=False)  # xlsx, csv, pdf
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     file_path = db.Column(db.String(255), nullable=True)  # Path to saved file if stored
+    
+    __table_args__ = (
+        db.Index('ix_download_history_user_id_created_at', 'user_id', 'created_at'),
+    )
+
+# Custom template model
+class CustomTemplate(db.Model):
+    __tablename__ = 'custom_template'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    name = db.Column(db.String(100), nullable=False)
+    description = db.Column(db.String(255), nullable=True)
+    default_sheet_name = db.Column(db.String(100), nullable=True)
+    headers = db.Column(db.JSON, nullable=False)
+    sample_data = db.Column(db.JSON, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_template(self):
+        """Read-only SheetTemplate copy, safe to cache across requests"""
+        return SheetTemplate(
+            id=str(self.id),
+            name=self.name,
+            headers=self.headers,
+            sample_data=self.sample_data,
+            default_sheet_name=self.default_sheet_name,
+            description=self.description
+        )
+
+def get_custom_templates(user_id):
+    """Return the user's custom templates, oldest first"""
+    templates = custom_template_cache.get(user_id)
+    if templates is None:
+        rows = CustomTemplate.query.filter_by(user_id=user_id)\
+            .order_by(CustomTemplate.created_at, CustomTemplate.id).all()
+        templates = tuple(row.to_template() for row in rows)
+        custom_template_cache.set(user_id, templates)
+    return templates
+
+# JSON endpoints the editor calls many times a minute. They only scope queries by
+# current_user.id, so on a cache miss they may use the snapshot in the session.
+SESSION_PRINCIPAL_ENDPOINTS = {
+    'main.sheet_rows', 'main.update_sheet', 'main.patch_sheet', 'main.sheet_preview', 'main.get_template',
+    'main.import_job_status', 'main.start_export', 'main.export_job_status'
+}
 
 # User loader function for Flask-Login
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+    
+    principal = user_cache.get(user_id)
+    if principal is not None:
+        return principal
+    
+    if request.endpoint in SESSION_PRINCIPAL_ENDPOINTS:
+        principal = SessionUser.from_session(session.get('principal'), user_id,
+                                             current_app.config['SESSION_PRINCIPAL_SECONDS'])
+        if principal is not None:
+            return principal
+    
+    # Only the columns current_user needs, never the password hash
+    row = db.session.query(User.id, User.username, User.email, User.name, User.created_at)\
+        .filter(User.id == user_id).first()
+    if row is None:
+        return None
+    principal = SessionUser(*row)
+    user_cache.set(user_id, principal)
+    session['principal'] = principal.to_session()
+    return principal
+
+# Body types worth compressing; files, exports and streams are left alone
+COMPRESSIBLE_MIMETYPES = {'text/html', 'application/json', 'text/css', 'application/javascript', 'text/plain'}
+
+@bp.after_app_request
+def compress_response(response):
+    """Gzip HTML and JSON bodies of at least GZIP_MIN_BYTES for clients that accept it"""
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    
+    data = response.get_data()
+    if len(data) < current_app.config['GZIP_MIN_BYTES']:
+        return response
+    response.vary.add('Accept-Encoding')
+    if not request.accept_encodings['gzip']:
+        return response
+    
+    response.set_data(gzip.compress(data, current_app.config['GZIP_LEVEL']))
+    response.content_encoding = 'gzip'
+    # The compressed body is a different byte sequence, so a strong ETag becomes weak
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+@bp.route('/assets/<filename>')
+def asset(filename):
+    """Serve a bundle by its content-hashed name; the URL changes whenever the content does"""
+    bundle = assets.get(filename)
+    if bundle is None:
+        abort(404)
+    
+    gzipped = bool(request.accept_encodings['gzip'])
+    response = Response(bundle.gzipped if gzipped else bundle.body, mimetype=bundle.mimetype)
+    if gzipped:
+        response.content_encoding = 'gzip'
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.max_age = 365 * 24 * 3600
+    response.cache_control.immutable = True
+    return response
 
 # Routes for your application
-@app.route('/')
+@bp.route('/')
 def index():
     if current_user.is_authenticated:
-        return render_template('index.html')
-    return redirect(url_for('login'))
+        sheets = Sheet.query.filter_by(user_id=current_user.id).order_by(Sheet.id).all()
+        return render_template('index.html', sheets=sheets)
+    return redirect(url_for('main.login'))
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     
     if request.method == 'POST':
         username = request.form.get('username')
@@ -122,24 +616,30 @@ def login():
         
         user = User.query.filter_by(username=username).first()
         
-        if user and user.check_password(password):
-            login_user(user)
-            return redirect(url_for('index'))
+        try:
+            if user and user.check_password(password):
+                login_user(user)
+                session['principal'] = SessionUser.from_user(user).to_session()
+                return redirect(url_for('main.index'))
+        except PasswordHasherBusy:
+            flash('Too many people are signing in right now. Please try again in a moment.')
+            return render_template('login.html'), 503
         
         flash('Invalid username or password')
     
     return render_template('login.html')
 
-@app.route('/logout')
+@bp.route('/logout')
 @login_required
 def logout():
     logout_user()
-    return redirect(url_for('login'))
+    session.pop('principal', None)
+    return redirect(url_for('main.login'))
 
-@app.route('/register', methods=['GET', 'POST'])
+@bp.route('/register', methods=['GET', 'POST'])
 def register():
     if current_user.is_authenticated:
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     
     if request.method == 'POST':
         username = request.form.get('username')
@@ -150,25 +650,29 @@ def register():
         # Check if username or email already exists
         if User.query.filter_by(username=username).first():
             flash('Username already exists')
-            return redirect(url_for('register'))
+            return redirect(url_for('main.register'))
         
         if User.query.filter_by(email=email).first():
             flash('Email already exists')
-            return redirect(url_for('register'))
+            return redirect(url_for('main.register'))
         
         # Create new user
         user = User(username=username, email=email, name=name)
-        user.set_password(password)
+        try:
+            user.set_password(password)
+        except PasswordHasherBusy:
+            flash('Too many people are signing up right now. Please try again in a moment.')
+            return redirect(url_for('main.register'))
         
         db.session.add(user)
         db.session.commit()
         
         flash('Registration successful! Please login.')
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     
     return render_template('register.html')
 
-@app.route('/add_sheet', methods=['GET', 'POST'])
+@bp.route('/add_sheet', methods=['GET', 'POST'])
 @login_required
 def add_sheet():
     if request.method == 'POST':
@@ -177,14 +681,14 @@ def add_sheet():
         
         if not sheet_name:
             flash('Sheet name is required.', 'error')
-            return redirect(url_for('add_sheet'))
+            return redirect(url_for('main.add_sheet'))
             
         # Check if sheet name already exists for this user
         existing_sheet = Sheet.query.filter_by(user_id=current_user.id, sheet_name=sheet_name).first()
         
         if existing_sheet:
             flash('A sheet with this name already exists.', 'error')
-            return redirect(url_for('add_sheet'))
+            return redirect(url_for('main.add_sheet'))
             
         # Parse data if provided
         sheet_data = []
@@ -198,47 +702,223 @@ def add_sheet():
             sheet_data = [[''] * 5 for _ in range(6)]
             
         # Create new sheet
-        new_sheet = Sheet(
-            sheet_name=sheet_name,
-            data=sheet_data,
-            user_id=current_user.id
-        )
-        
-        db.session.add(new_sheet)
-        db.session.commit()
+        try:
+            new_sheet = Sheet(
+                sheet_name=sheet_name,
+                data=sheet_data,
+                user_id=current_user.id
+            )
+            
+            db.session.add(new_sheet)
+            db.session.commit()
+        except IntegrityError:
+            # Another request created a sheet with this name in the meantime
+            db.session.rollback()
+            flash('A sheet with this name already exists.', 'error')
+            return redirect(url_for('main.add_sheet'))
         
         flash(f'Sheet "{sheet_name}" created successfully!', 'success')
-        return redirect(url_for('edit_sheet', sheet_name=sheet_name))
+        return redirect(url_for('main.edit_sheet', sheet_name=sheet_name))
     
     # GET request - render the form with templates
     built_in_templates = get_built_in_templates()
     
-    # Add a sample_data_string property to each template
-    for template in built_in_templates:
-        if hasattr(template, 'sample_data') and template.sample_data:
-            template.sample_data_string = template.sample_data_string
-        else:
-            template.sample_data_string = ""
-    
-    # Add custom templates if needed
-    custom_templates = []  # You can add custom template logic here
+    custom_templates = get_custom_templates(current_user.id)
     
     return render_template('add_sheet.html', 
                           built_in_templates=built_in_templates,
                           custom_templates=custom_templates)
 
-@app.route('/edit_sheet/<sheet_name>')
+@bp.route('/import_sheet', methods=['POST'])
+@login_required
+def import_sheet():
+    """Upload a CSV or XLSX file into a new sheet; rows are loaded by a background job"""
+    sheet_name = (request.form.get('sheet_name') or '').strip()
+    upload = request.files.get('file')
+    
+    if not upload or not upload.filename:
+        return jsonify({'success': False, 'message': 'Please choose a file to import'}), 400
+    
+    format_type = upload.filename.rsplit('.', 1)[-1].lower() if '.' in upload.filename else ''
+    if format_type not in IMPORT_FORMATS:
+        return jsonify({'success': False, 'message': 'Only .csv and .xlsx files can be imported'}), 400
+    
+    sheet_name = sheet_name or upload.filename.rsplit('.', 1)[0]
+    if Sheet.query.filter_by(user_id=current_user.id, sheet_name=sheet_name).first():
+        return jsonify({'success': False, 'message': 'A sheet with this name already exists.'}), 409
+    
+    # Imported sheets always use chunked storage so rows can be appended batch by batch
+    try:
+        sheet = Sheet(sheet_name=sheet_name, user_id=current_user.id, storage='chunked')
+        db.session.add(sheet)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': 'A sheet with this name already exists.'}), 409
+    
+    # Werkzeug has already spooled the upload to disk; copy it where the worker can read it
+    upload_dir = os.path.join(current_app.root_path, 'uploads')
+    os.makedirs(upload_dir, exist_ok=True)
+    handle, filepath = tempfile.mkstemp(suffix=f'.{format_type}', dir=upload_dir)
+    os.close(handle)
+    upload.save(filepath)
+    
+    job_id = import_jobs.enqueue(current_user.id, sheet.id, format_type, file_path=filepath)
+    
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status_url': url_for('main.import_job_status', job_id=job_id),
+        'sheet_url': url_for('main.edit_sheet', sheet_name=sheet_name)
+    })
+
+def run_import_job(app, job, report_progress):
+    """Load an uploaded file into its sheet in batches, on a worker thread"""
+    batch_rows = app.config['IMPORT_BATCH_ROWS']
+    with app.app_context():
+        sheet = db.session.get(Sheet, job['sheet_id'])
+        try:
+            if sheet is None:
+                raise LookupError('Sheet no longer exists')
+            
+            reader = RowReader(job['file_path'], job['format'])
+            batch = []
+            for row in reader:
+                batch.append(row)
+                if len(batch) >= batch_rows:
+                    sheet.splice_rows(sheet.num_rows(), 0, batch)
+                    db.session.commit()
+                    batch = []
+                    report_progress(*reader.progress())
+            if batch:
+                sheet.splice_rows(sheet.num_rows(), 0, batch)
+            
+            # Build the formula cache from the stored chunks
+            sheet.recalculate()
+            sheet.version += 1
+            sheet.structure_version = sheet.version
+            db.session.commit()
+            report_progress(*reader.progress())
+        except Exception:
+            # Drop the partial sheet so the import can be retried under the same name
+            db.session.rollback()
+            if sheet is not None:
+                sheet.delete_chunks()
+                db.session.delete(sheet)
+                db.session.commit()
+            raise
+        finally:
+            os.remove(job['file_path'])
+
+@bp.route('/import_job/<job_id>')
+@login_required
+def import_job_status(job_id):
+    """Poll the status of a file import"""
+    job = import_jobs.get(job_id, current_user.id)
+    
+    if not job:
+        return jsonify({'success': False, 'message': 'Import job not found'}), 404
+    
+    response = {
+        'success': True,
+        'status': job['status'],
+        'progress': job['progress'],
+        'total': job['total']
+    }
+    if job['error']:
+        response['message'] = job['error']
+    return jsonify(response)
+
+@bp.route('/edit_sheet/<sheet_name>')
 @login_required
 def edit_sheet(sheet_name):
     sheet = Sheet.query.filter_by(user_id=current_user.id, sheet_name=sheet_name).first()
     
     if not sheet:
         flash('Sheet not found.', 'error')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
+    
+    # Large sheets render only the header and first block of rows; the editor
+    # fetches the rest through sheet_rows as the user scrolls
+    total_rows = max(sheet.num_rows() - 1, 0)
+    row_block = current_app.config['EDITOR_ROW_BLOCK']
+    virtual = total_rows > current_app.config['EDITOR_VIRTUAL_THRESHOLD']
+    data = sheet.get_rows(0, 1 + row_block) if virtual else sheet.get_rows()
+    # Formula results of the rows above, which the virtual grid shows in place of the formulas
+    computed = sheet.computed_between(0, len(data)) if virtual else {}
+    
+    # Lets export-handler.js send large sheets to the background export queue
+    export_cells = sheet.num_rows() * (len(data[0]) if data else 0)
     
-    return render_template('sheet_editor.html', sheet=sheet, data=sheet.data)
+    return render_template('sheet_editor.html', sheet=sheet, data=data,
+                          virtual=virtual, computed=computed, total_rows=total_rows, row_block=row_block,
+                          export_cells=export_cells,
+                          async_export_cells=current_app.config['EXPORT_ASYNC_CELLS'])
+
+@bp.route('/sheet_rows/<sheet_name>')
+@login_required
+def sheet_rows(sheet_name):
+    """Return a window of data rows (header excluded) with their formula results, optionally limited to a column window"""
+    sheet = Sheet.query.filter_by(user_id=current_user.id, sheet_name=sheet_name).first()
+    
+    if not sheet:
+        return jsonify({'success': False, 'message': 'Sheet not found'})
+    
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = request.args.get('limit', current_app.config['EDITOR_ROW_BLOCK'], type=int)
+    limit = min(max(limit, 0), current_app.config['EDITOR_MAX_WINDOW'])
+    col_offset = max(request.args.get('col_offset', 0, type=int), 0)
+    col_limit = request.args.get('col_limit', type=int)
+    
+    # Row 0 of the grid is the header, so data row N lives at grid row N + 1
+    rows = sheet.get_rows(offset + 1, offset + 1 + limit)
+    col_stop = None
+    if col_offset or col_limit is not None:
+        col_stop = col_offset + max(col_limit, 0) if col_limit is not None else None
+        rows = [row[col_offset:col_stop] for row in rows]
+    
+    # Formula cells keep their formula in `rows`; `values` has their results by grid "row:col"
+    values = {}
+    for key, value in sheet.computed_between(offset + 1, offset + 1 + len(rows)).items():
+        col = int(key.split(':', 1)[1])
+        if col >= col_offset and (col_stop is None or col < col_stop):
+            values[key] = value
+    
+    response = {
+        'success': True,
+        'offset': offset,
+        'total_rows': max(sheet.num_rows() - 1, 0),
+        'version': sheet.version,
+        'values': values
+    }
+    # The editor asks for the dictionary-encoded column layout, which is much smaller
+    if request.args.get('encoding') == 'columns':
+        response['encoding'] = 'columns'
+        response['columns'] = to_columns(rows)
+    else:
+        response['rows'] = rows
+    return jsonify(response)
+
+def version_conflict(sheet, base_version=None, cells=()):
+    """
+    409 response telling the client which version to rebase its edits on
+    
+    Args:
+        sheet: The sheet as it is now stored
+        base_version: Version the client's edits were based on, if it sent one
+        cells: (row, col) cells the client's edits expected to hold other contents
+    """
+    return jsonify({
+        'success': False,
+        'conflict': True,
+        'message': 'This sheet was changed in another window or by another user',
+        'version': sheet.version,
+        # Cell coordinates from before this version may now point at other cells
+        'structure_changed': base_version is None or sheet.structure_version > base_version,
+        'cells': [f'{row}:{col}' for row, col in cells]
+    }), 409
 
-@app.route('/update_sheet/<sheet_name>', methods=['POST'])
+@bp.route('/update_sheet/<sheet_name>', methods=['POST'])
 @login_required
 def update_sheet(sheet_name):
     sheet = Sheet.query.filter_by(user_id=current_user.id, sheet_name=sheet_name).first()
@@ -249,14 +929,90 @@ def update_sheet(sheet_name):
     data = request.json.get('data')
     if not data:
         return jsonify({'success': False, 'message': 'No data provided'})
+    if request.json.get('encoding') == 'columns':
+        try:
+            data = from_columns(data)
+        except SheetCodecError as e:
+            return jsonify({'success': False, 'message': str(e)})
     
-    sheet.data = data
-    sheet.updated_at = datetime.utcnow()
-    db.session.commit()
+    # Clients send the version their edits are based on; older clients skip the check
+    base_version = request.json.get('base_version')
+    if base_version is not None and base_version != sheet.version:
+        return version_conflict(sheet, base_version)
+    
+    try:
+        sheet.set_data(data)
+        sheet.version += 1
+        sheet.structure_version = sheet.version
+        sheet.updated_at = datetime.utcnow()
+        db.session.commit()
+    except StaleDataError:
+        # Another writer committed between our read and our write
+        db.session.rollback()
+        return version_conflict(sheet, base_version)
     
-    return jsonify({'success': True, 'message': 'Sheet updated successfully'})
+    return jsonify({'success': True, 'message': 'Sheet updated successfully', 'version': sheet.version})
 
-@app.route('/delete_sheet/<sheet_name>', methods=['POST'])
+@bp.route('/patch_sheet/<sheet_name>', methods=['POST'])
+@login_required
+def patch_sheet(sheet_name):
+    """Apply a batch of cell/row/column patches to a sheet"""
+    sheet = Sheet.query.filter_by(user_id=current_user.id, sheet_name=sheet_name).first()
+    
+    if not sheet:
+        return jsonify({'success': False, 'message': 'Sheet not found'})
+    
+    payload = request.get_json(silent=True) or {}
+    patches = payload.get('patches')
+    if not isinstance(patches, list) or not patches:
+        return jsonify({'success': False, 'message': 'No patches provided'})
+    
+    base_version = payload.get('base_version')
+    if base_version is not None and base_version != sheet.version:
+        return version_conflict(sheet, base_version)
+    
+    try:
+        changed_cells = apply_patches(sheet, patches, max_cols=current_app.config['MAX_SHEET_COLS'],
+                                      max_insert_rows=current_app.config['MAX_PATCH_ROWS'])
+        
+        # Recompute only the formulas downstream of the edited cells
+        updated = sheet.recalculate(changed_cells)
+        
+        sheet.version += 1
+        if changed_cells is None:
+            sheet.structure_version = sheet.version
+        sheet.updated_at = datetime.utcnow()
+        db.session.commit()
+    except PatchConflict as e:
+        # Replayed edits whose cells were changed by the other writer
+        db.session.rollback()
+        return version_conflict(sheet, sheet.version, e.cells)
+    except PatchError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)})
+    except StaleDataError:
+        db.session.rollback()
+        return version_conflict(sheet, base_version)
+    
+    return jsonify({
+        'success': True,
+        'version': sheet.version,
+        'applied': len(patches),
+        'values': {f'{row}:{col}': value for (row, col), value in updated.items()}
+    })
+
+@bp.route('/sheet_preview/<sheet_name>')
+@login_required
+def sheet_preview(sheet_name):
+    """Return the first rows of a sheet with formula results for the preview modal"""
+    sheet = Sheet.query.filter_by(user_id=current_user.id, sheet_name=sheet_name).first()
+    
+    if not sheet:
+        return jsonify({'success': False, 'error': 'Sheet not found'})
+    
+    return jsonify({'success': True, 'data': sheet.get_display_rows(0, current_app.config['PREVIEW_ROWS'])})
+
+@bp.route('/delete_sheet/<sheet_name>', methods=['POST'])
 @login_required
 def delete_sheet(sheet_name):
     sheet = Sheet.query.filter_by(user_id=current_user.id, sheet_name=sheet_name).first()
@@ -264,103 +1020,114 @@ def delete_sheet(sheet_name):
     if not sheet:
         return jsonify({'success': False, 'message': 'Sheet not found'})
     
+    sheet.delete_chunks()
     db.session.delete(sheet)
     db.session.commit()
     
     return jsonify({'success': True, 'message': 'Sheet deleted successfully'})
 
-@app.route('/get_template/<template_id>')
+@bp.route('/get_template/<template_id>')
 @login_required
 def get_template(template_id):
-    templates = get_built_in_templates()
-    template = next((t for t in templates if str(t.id) == template_id), None)
+    template = get_built_in_template(template_id)
     
     if not template:
         return jsonify({'success': False, 'error': 'Template not found'})
     
-    # Convert headers to string
-    headers = ','.join(template.headers) if template.headers else ''
-    
-    # Use the pre-computed sample_data_string
-    sample_data = template.sample_data_string
-    
-    return jsonify({
-        'success': True,
-        'headers': headers,
-        'sample_data': sample_data
-    })
+    # Built-in templates never change while the app runs, so the payload is
+    # precomputed and browsers may keep it for a day
+    response = Response(template.json_payload, mimetype='application/json')
+    response.set_etag(template.etag)
+    response.cache_control.private = True
+    response.cache_control.max_age = current_app.config['TEMPLATE_CACHE_SECONDS']
+    return response.make_conditional(request)
 
-@app.route('/history')
+@bp.route('/history')
 @login_required
 def view_history():
     """View the history of sheets created by the current user."""
-    # Get all sheets for the current user, ordered by creation date
-    sheets = Sheet.query.filter_by(user_id=current_user.id).order_by(Sheet.created_at.desc()).all()
+    # Only the listed columns, one page at a time, newest first
+    query = db.session.query(Sheet.id, Sheet.sheet_name, Sheet.created_at, Sheet.updated_at)\
+        .filter(Sheet.user_id == current_user.id)
+    sheets, next_cursor = keyset_page(query, Sheet.created_at, Sheet.id,
+                                      request.args.get('cursor'), current_app.config['HISTORY_PAGE_SIZE'])
     
-    return render_template('history.html', sheets=sheets)
+    return render_template('history.html', sheets=sheets, next_cursor=next_cursor,
+                          is_first_page=not request.args.get('cursor'))
 
-@app.route('/download_history')
+@bp.route('/download_history')
 @login_required
 def download_history():
     """View download history for the current user"""
-    downloads = DownloadHistory.query.filter_by(user_id=current_user.id)\
-        .order_by(DownloadHistory.created_at.desc()).all()
-    return render_template('download_history.html', downloads=downloads)
+    downloads, next_cursor = keyset_page(download_listing_query(), DownloadHistory.created_at,
+                                         DownloadHistory.id, request.args.get('cursor'),
+                                         current_app.config['HISTORY_PAGE_SIZE'])
+    return render_template('download_history.html', downloads=downloads, next_cursor=next_cursor,
+                          is_first_page=not request.args.get('cursor'))
 
-@app.route('/manage_templates')
+def download_listing_query():
+    """The current user's downloads with only the columns the listings show"""
+    return db.session.query(
+        DownloadHistory.id,
+        DownloadHistory.filename,
+        DownloadHistory.format,
+        DownloadHistory.created_at,
+        Sheet.sheet_name
+    ).outerjoin(Sheet, Sheet.id == DownloadHistory.sheet_id)\
+        .filter(DownloadHistory.user_id == current_user.id)
+
+@bp.route('/manage_templates')
 @login_required
 def manage_templates():
     """Manage templates including adding from download history"""
     # Get built-in templates
     built_in_templates = get_built_in_templates()
     
-    # Get user's download history for potential templates
-    downloads = DownloadHistory.query.filter_by(user_id=current_user.id)\
-        .order_by(DownloadHistory.created_at.desc()).all()
+    move_session_templates()
+    custom_templates = get_custom_templates(current_user.id)
+    
+    # Latest downloads as potential templates; the rest are on download_history
+    downloads, more_downloads = keyset_page(download_listing_query(), DownloadHistory.created_at,
+                                            DownloadHistory.id, per_page=current_app.config['HISTORY_PAGE_SIZE'])
     
     return render_template('manage_templates.html', 
                           built_in_templates=built_in_templates,
-                          downloads=downloads)
+                          custom_templates=custom_templates,
+                          downloads=downloads,
+                          more_downloads=more_downloads is not None)
 
-@app.route('/delete_template/<template_id>', methods=['POST'])
+@bp.route('/delete_template/<template_id>', methods=['POST'])
 @login_required
 def delete_template(template_id):
     """Delete a custom template"""
-    # Get custom templates from session
-    custom_templates = session.get('custom_templates', [])
-    
-    # Find the template with matching ID
-    found = False
-    for i, template in enumerate(custom_templates):
-        if template.get('id') == template_id:
-            # Remove the template
-            custom_templates.pop(i)
-            found = True
-            break
+    deleted = 0
+    if template_id.isdigit():
+        deleted = CustomTemplate.query.filter_by(id=int(template_id), user_id=current_user.id).delete()
+        db.session.commit()
     
-    if found:
-        # Update the session
-        session['custom_templates'] = custom_templates
-        session.modified = True
+    if deleted:
+        custom_template_cache.invalidate(current_user.id)
         return jsonify({'success': True, 'message': 'Template deleted successfully'})
     else:
         return jsonify({'success': False, 'message': 'Template not found'})
 
-@app.route('/user_profile')
+@bp.route('/user_profile')
 @login_required
 def user_profile():
     """View user profile"""
     # Count sheets and downloads
     sheet_count = Sheet.query.filter_by(user_id=current_user.id).count()
     download_count = DownloadHistory.query.filter_by(user_id=current_user.id).count()
-    custom_template_count = len(session.get('custom_templates', []))
+    custom_template_count = len(get_custom_templates(current_user.id))
+    recent_sheets = Sheet.query.filter_by(user_id=current_user.id).order_by(Sheet.id).limit(5).all()
     
     return render_template('user_profile.html', 
+                          recent_sheets=recent_sheets,
                           sheet_count=sheet_count, 
                           download_count=download_count,
                           custom_template_count=custom_template_count)
 
-@app.route('/user_settings')
+@bp.route('/user_settings')
 @login_required
 def user_settings():
     """User settings page"""
@@ -381,92 +1148,219 @@ def track_download(sheet_id, filename, format_type, file_path=None):
         return download
     return None
 
-@app.route('/export_sheet/<sheet_name>/<format_type>')
+@bp.route('/export_sheet/<sheet_name>/<format_type>')
 @login_required
 def export_sheet(sheet_name, format_type):
     """Export a sheet to the specified format"""
     # Find the sheet
     sheet = Sheet.query.filter_by(sheet_name=sheet_name, user_id=current_user.id).first_or_404()
     
-    # Create export directory if it doesn't exist
-    export_dir = os.path.join(app.root_path, 'exports')
-    os.makedirs(export_dir, exist_ok=True)
+    format_type = format_type.lower()
+    if format_type not in EXPORT_MIMETYPES:
+        flash(f"Unsupported export format: {format_type}", "danger")
+        return redirect(url_for('main.edit_sheet', sheet_name=sheet_name))
     
-    # Generate a unique filename
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f"{sheet_name}_{timestamp}"
+    # Exports of an unchanged sheet are identical, so the key doubles as the ETag
+    key = ExportCache.make_key(sheet.id, sheet.version, sheet.updated_at, format_type)
+    if key in request.if_none_match:
+        export_cache.record_not_modified()
+        response = Response(status=304)
+        response.set_etag(key)
+        return response
     
-    # Export based on format
-    if format_type.lower() == 'xlsx':
-        # Export to Excel
-        filepath = os.path.join(export_dir, f"{filename}.xlsx")
-        
-        # Use pandas to create Excel file
-        df = pd.DataFrame(sheet.data[1:], columns=sheet.data[0])
-        df.to_excel(filepath, index=False)
-        
-        # Add to download history
-        add_download_history(sheet_name, 'xlsx', filepath)
-        
-        # Return file for download
-        return send_file(filepath, 
-                         as_attachment=True,
-                         download_name=f"{sheet_name}.xlsx",
-                         mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    download_name = f"{sheet_name}.{format_type}"
+    filepath = export_cache.get(key, format_type)
     
-    elif format_type.lower() == 'csv':
-        # Export to CSV
-        filepath = os.path.join(export_dir, f"{filename}.csv")
-        
-        # Use pandas to create CSV file
-        df = pd.DataFrame(sheet.data[1:], columns=sheet.data[0])
-        df.to_csv(filepath, index=False)
-        
-        # Add to download history
-        add_download_history(sheet_name, 'csv', filepath)
-        
-        # Return file for download
-        return send_file(filepath,
-                         as_attachment=True,
-                         download_name=f"{sheet_name}.csv",
-                         mimetype='text/csv')
+    if filepath is None and format_type == 'csv':
+        # Stream CSV rows straight into the response, keeping a copy for next time
+        track_download(sheet.id, download_name, format_type, export_cache.path_for(key, format_type))
+        pieces = export_cache.tee(key, format_type, iter_csv(sheet.iter_display_rows()))
+        response = Response(stream_with_context(pieces),
+                            mimetype=EXPORT_MIMETYPES[format_type],
+                            headers={'Content-Disposition': attachment_header(download_name)})
+        response.set_etag(key)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
     
-    elif format_type.lower() == 'pdf':
-        # Export to PDF
-        filepath = os.path.join(export_dir, f"{filename}.pdf")
-        
-        # Generate PDF
-        create_pdf(sheet.data, filepath)
-        
-        # Add to download history
-        add_download_history(sheet_name, 'pdf', filepath)
-        
-        # Return file for download
-        return send_file(filepath,
+    if filepath is None:
+        filepath = render_export(sheet, format_type, key)
+    
+    # Add to download history
+    track_download(sheet.id, download_name, format_type, filepath)
+    
+    # Return file for download
+    response = send_file(filepath,
                          as_attachment=True,
-                         download_name=f"{sheet_name}.pdf",
-                         mimetype='application/pdf')
+                         download_name=download_name,
+                         mimetype=EXPORT_MIMETYPES[format_type],
+                         etag=key)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+# Rows between progress updates of a background export
+EXPORT_PROGRESS_ROWS = 5000
+
+def render_export(sheet, format_type, key, report_progress=None):
+    """
+    Render an export into the export cache and return its path
     
-    else:
-        flash(f"Unsupported export format: {format_type}", "danger")
-        return redirect(url_for('edit_sheet', sheet_name=sheet_name))
+    Args:
+        sheet: Sheet to export
+        format_type: 'xlsx', 'csv' or 'pdf'
+        key: Export cache key of this rendering
+        report_progress: Optional callable(rows_done, total_rows)
+    """
+    total = sheet.num_rows()
+    
+    def rows():
+        for index, row in enumerate(sheet.iter_display_rows(), 1):
+            yield row
+            if report_progress and (index % EXPORT_PROGRESS_ROWS == 0 or index == total):
+                report_progress(index, total)
+    
+    if format_type == 'xlsx':
+        # Export to Excel, one row at a time
+        return export_cache.store(key, format_type, lambda path: write_xlsx(rows(), path))
+    if format_type == 'csv':
+        return export_cache.store(key, format_type, lambda path: write_csv(rows(), path))
+    # Generate PDF
+    return export_cache.store(key, format_type, lambda path: create_pdf(rows(), path, title=sheet.sheet_name))
 
-def add_download_history(sheet_name, format_type, filepath):
-    """Add entry to download history"""
-    try:
-        download = DownloadHistory(
-            user_id=current_user.id,
-            sheet_name=sheet_name,
-            format_type=format_type,
-            download_date=datetime.now(),
-            file_path=filepath
-        )
-        db.session.add(download)
-        db.session.commit()
-    except Exception as e:
-        app.logger.error(f"Error recording download: {str(e)}")
+def run_export_job(app, job, report_progress):
+    """Render a queued export on a worker thread; returns the file path"""
+    with app.app_context():
+        sheet = db.session.get(Sheet, job['sheet_id'])
+        if sheet is None:
+            raise LookupError('Sheet no longer exists')
+        key = ExportCache.make_key(sheet.id, sheet.version, sheet.updated_at, job['format'])
+        return export_cache.get(key, job['format']) or render_export(sheet, job['format'], key, report_progress)
 
-@app.route('/add_to_templates/<int:download_id>')
+@bp.route('/start_export/<sheet_name>/<format_type>', methods=['POST'])
+@login_required
+def start_export(sheet_name, format_type):
+    """Queue an export to be rendered in the background"""
+    sheet = Sheet.query.filter_by(sheet_name=sheet_name, user_id=current_user.id).first()
+    
+    if not sheet:
+        return jsonify({'success': False, 'message': 'Sheet not found'}), 404
+    
+    format_type = format_type.lower()
+    if format_type not in EXPORT_MIMETYPES:
+        return jsonify({'success': False, 'message': f'Unsupported export format: {format_type}'}), 400
+    
+    # An unchanged sheet that was exported before needs no job at all
+    key = ExportCache.make_key(sheet.id, sheet.version, sheet.updated_at, format_type)
+    cached = export_cache.get(key, format_type)
+    job_id = export_jobs.enqueue(current_user.id, sheet.id, format_type,
+                                 file_path=cached, finished=cached is not None)
+    
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status_url': url_for('main.export_job_status', job_id=job_id)
+    })
+
+@bp.route('/export_job/<job_id>')
+@login_required
+def export_job_status(job_id):
+    """Poll the status of a background export"""
+    job = export_jobs.get(job_id, current_user.id)
+    
+    if not job:
+        return jsonify({'success': False, 'message': 'Export job not found'}), 404
+    
+    response = {
+        'success': True,
+        'status': job['status'],
+        'progress': job['progress'],
+        'total': job['total']
+    }
+    if job['status'] == DONE:
+        response['download_url'] = url_for('main.download_export_job', job_id=job_id)
+    elif job['error']:
+        response['message'] = job['error']
+    return jsonify(response)
+
+@bp.route('/export_job/<job_id>/download')
+@login_required
+def download_export_job(job_id):
+    """Download the file rendered by a finished background export"""
+    job = export_jobs.get(job_id, current_user.id)
+    
+    if not job or job['status'] != DONE:
+        flash('Export not found or not finished yet', 'danger')
+        return redirect(url_for('main.download_history'))
+    
+    if not os.path.exists(job['file_path']):
+        flash('This export has expired, please export the sheet again', 'warning')
+        return redirect(url_for('main.download_history'))
+    
+    sheet = db.session.get(Sheet, job['sheet_id'])
+    download_name = f"{sheet.sheet_name if sheet else 'export'}.{job['format']}"
+    
+    # Add to download history
+    track_download(job['sheet_id'], download_name, job['format'], job['file_path'])
+    
+    return send_file(job['file_path'],
+                     as_attachment=True,
+                     download_name=download_name,
+                     mimetype=EXPORT_MIMETYPES[job['format']])
+
+def metrics_token_required(view):
+    """
+    Only serve the view to callers sending "Authorization: Bearer <METRICS_TOKEN>"
+    
+    These views expose every user's traffic and the process internals, so
+    signing in is not enough, and they are turned off while METRICS_TOKEN
+    is unset.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = current_app.config['METRICS_TOKEN']
+        if not token:
+            abort(404)
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            abort(401)
+        return view(*args, **kwargs)
+    return wrapper
+
+@bp.route('/export_cache_stats')
+@metrics_token_required
+def export_cache_stats():
+    """Hit ratio and eviction counters of the export cache in this process"""
+    return jsonify({'success': True, 'stats': export_cache.stats()})
+
+@bp.route('/pool_stats')
+@metrics_token_required
+def pool_stats():
+    """Database pool usage and checkout latency in this worker process"""
+    return jsonify({'success': True, 'stats': pool_metrics.stats()})
+
+@bp.route('/metrics')
+@metrics_token_required
+def metrics():
+    """Request, database and pool metrics of this worker process in the Prometheus text format"""
+    stats = pool_metrics.stats()
+    pool_lines = []
+    for name, key, help_text in (
+            ('db_pool_checked_out', 'checked_out', 'Connections in use'),
+            ('db_pool_checked_in', 'checked_in', 'Idle connections in the pool'),
+            ('db_pool_overflow', 'overflow', 'Connections open beyond pool_size')):
+        if key in stats:
+            pool_lines += [f'# HELP excelapp_{name} {help_text}', f'# TYPE excelapp_{name} gauge',
+                           f'excelapp_{name} {stats[key]}']
+    for name, key, help_text in (
+            ('db_pool_checkouts_total', 'checkouts', 'Connections handed out by the pool'),
+            ('db_pool_timeouts_total', 'timeouts', 'Checkouts that gave up waiting for a connection'),
+            ('db_pool_wait_seconds_total', 'wait_seconds_total', 'Time spent waiting for connections')):
+        pool_lines += [f'# HELP excelapp_{name} {help_text}', f'# TYPE excelapp_{name} counter',
+                       f'excelapp_{name} {stats[key]}']
+    
+    return Response(request_metrics.render(pool_lines), mimetype='text/plain; version=0.0.4')
+
+@bp.route('/add_to_templates/<int:download_id>')
 @login_required
 def add_to_templates(download_id):
     """Add a downloaded file as a template"""
@@ -477,47 +1371,50 @@ def add_to_templates(download_id):
     
     if not sheet:
         flash('Sheet not found', 'error')
-        return redirect(url_for('manage_templates'))
+        return redirect(url_for('main.manage_templates'))
     
-    # Get the next available template ID
-    template_id = str(int(datetime.now().timestamp()))
+    # Only the header and first few rows are needed
+    rows = sheet.get_rows(0, 6)
     
     # Create a new template from the sheet data
     new_template = {
-        'id': template_id,
         'name': f"{sheet.sheet_name} Template",
-        'headers': sheet.data[0] if sheet.data and len(sheet.data) > 0 else [],
-        'sample_data': sheet.data[1:6] if sheet.data and len(sheet.data) > 1 else [],
+        'headers': rows[0] if rows else [],
+        'sample_data': rows[1:6],
         'default_sheet_name': sheet.sheet_name,
         'description': f"Template created from {download.filename}",
         'user_id': current_user.id,
         'is_custom': True
     }
     
-    # Save the custom template (implementation depends on how you store custom templates)
+    # Save the custom template
     save_custom_template(new_template)
     
     flash('Template created successfully', 'success')
-    return redirect(url_for('manage_templates'))
+    return redirect(url_for('main.manage_templates'))
 
 def save_custom_template(template_data):
-    """Save a custom template to the database or file system"""
-    # This is a placeholder function
-    # Implement based on how you want to store custom templates
-    # You might want to create a CustomTemplate model and save to the database,
-    # or store templates in a JSON file, etc.
-    
-    # For now, we'll store in session as an example
-    if 'custom_templates' not in session:
-        session['custom_templates'] = []
-    
-    session['custom_templates'].append(template_data)
-    session.modified = True
+    """Save a custom template for the current user"""
+    template = CustomTemplate(
+        user_id=current_user.id,
+        name=template_data['name'],
+        description=template_data.get('description'),
+        default_sheet_name=template_data.get('default_sheet_name'),
+        headers=list(template_data.get('headers') or []),
+        sample_data=[list(row) for row in template_data.get('sample_data') or []]
+    )
+    db.session.add(template)
+    db.session.commit()
+    custom_template_cache.invalidate(current_user.id)
+    return template
 
-# Custom filter for column letters
-@app.template_filter('column_letter')
-def column_letter(num):
-    """Convert a number to Excel-style column letter."""
+def move_session_templates():
+    """Move templates saved in the session by older versions into the database"""
+    for template_data in session.pop('custom_templates', None) or []:
+        if template_data.get('name'):
+            save_custom_template(template_data)
+
+def _column_letter(num):
     result = ""
     while num >= 0:
         result = chr(65 + num % 26) + result
@@ -526,16 +1423,190 @@ def column_letter(num):
             break
     return result
 
-# Create database tables if they don't exist
-with app.app_context():
-    db.create_all()
+# Letters of columns A to ZZ, built at import so preloaded workers share one copy
+COLUMN_LETTERS = tuple(_column_letter(num) for num in range(26 * 27))
+
+# Custom filter for column letters
+@bp.app_template_filter('column_letter')
+def column_letter(num):
+    """Convert a number to Excel-style column letter."""
+    if 0 <= num < len(COLUMN_LETTERS):
+        return COLUMN_LETTERS[num]
+    return _column_letter(num)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+# Revision matching the tables db.create_all() made before deploys ran the migrations
+UNVERSIONED_REVISION = '5ba8c28af60b'
+
+def upgrade_schema():
+    """
+    Bring the database schema up to date with the models
     
-    # Create a demo user if none exists
-    if not User.query.filter_by(username='demo').first():
+    A new database gets its tables from db.create_all() and is stamped with the
+    latest migration, because the first migration assumes the tables exist.
+    An existing database has the pending Alembic migrations applied; one without
+    an alembic_version table is taken to be at UNVERSIONED_REVISION.
+    
+    Returns:
+        'created' or 'upgraded'
+    """
+    import flask_migrate
+    app = current_app._get_current_object()
+    if 'migrate' not in app.extensions:
+        flask_migrate.Migrate(app, db, directory=MIGRATIONS_DIR)
+    tables = sa_inspect(db.engine).get_table_names()
+    if 'sheet' not in tables:
+        db.create_all()
+        flask_migrate.stamp(directory=MIGRATIONS_DIR)
+        return 'created'
+    if 'alembic_version' not in tables:
+        flask_migrate.stamp(directory=MIGRATIONS_DIR, revision=UNVERSIONED_REVISION)
+    flask_migrate.upgrade(directory=MIGRATIONS_DIR)
+    return 'upgraded'
+
+@click.command('init-db')
+@click.option('--demo/--no-demo', default=True, help='Also create the demo user (demo / password)')
+@with_appcontext
+def init_db_command(demo):
+    """Create or migrate the tables, and add the demo user"""
+    upgrade_schema()
+    if demo and not User.query.filter_by(username='demo').first():
         demo_user = User(username='demo', email='demo@example.com', name='Demo User')
         demo_user.set_password('password')
         db.session.add(demo_user)
         db.session.commit()
+    click.echo('Database initialized')
+
+def create_app(config=None):
+    """
+    Build and configure the Flask app
+    
+    Nothing here talks to the database: the engine connects on first use, and
+    the schema is created or migrated by the init-db command, or by
+    `python init_db.py upgrade` in the release step.
+    
+    Args:
+        config: Optional mapping of settings that override config.py
+    """
+    app = Flask(__name__)
+    
+    # Load configuration from config.py
+    app.config.from_pyfile('config.py')
+    if config:
+        app.config.from_mapping(config)
+    
+    # Initialize CSRF protection
+    csrf.init_app(app)
+    
+    # Initialize database; pooled connections time their checkouts for /pool_stats
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(
+        app.config['SQLALCHEMY_DATABASE_URI'], app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+    db.init_app(app)
+    # Flask-Migrate imports Alembic, which only the `flask db` commands need
+    if click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate
+        Migrate(app, db, directory=MIGRATIONS_DIR)
+    
+    login_manager.init_app(app)
+    
+    services = app.extensions['excel_generator'] = {}
+    with app.app_context():
+        services['pool_metrics'] = PoolMetrics()
+        services['pool_metrics'].attach(db.engine)
+        
+        # Per-endpoint latency, query and render metrics for /metrics, plus sampled profiles
+        # of slow requests. Registered before the blueprint so its after_request hook runs
+        # after compress_response and sees the body as sent.
+        request_profiler = None
+        if app.config['PROFILE_SAMPLE_RATE'] > 0:
+            request_profiler = RequestProfiler(
+                app.config['PROFILE_DIR'] or os.path.join(app.root_path, 'profiles'),
+                app.config['PROFILE_SAMPLE_RATE'],
+                app.config['PROFILE_THRESHOLD_MS'] / 1000,
+                memory=app.config['PROFILE_MEMORY'],
+                logger=app.logger
+            )
+        services['request_metrics'] = RequestMetrics()
+        services['request_metrics'].init_app(app, db.engine, request_profiler)
+    
+    # Key stretching runs on a bounded pool so logins cannot take every core
+    services['password_hasher'] = PasswordHasher(
+        app.config['PASSWORD_HASH_METHOD'],
+        salt_length=app.config['PASSWORD_SALT_LENGTH'],
+        workers=app.config['PASSWORD_HASH_WORKERS'],
+        max_pending=app.config['PASSWORD_HASH_QUEUE'],
+        wait_seconds=app.config['PASSWORD_HASH_WAIT_SECONDS']
+    )
+    
+    # Per-page JS/CSS bundles, built in memory on first use
+    services['assets'] = AssetPipeline(app.static_folder, enabled=app.config['ASSET_BUNDLING'])
+    
+    # Rendered exports are cached in the exports directory, keyed by sheet version
+    services['export_cache'] = ExportCache(os.path.join(app.root_path, 'exports'),
+                                           app.config['EXPORT_CACHE_MAX_BYTES'])
+    
+    # Per-user tuples of custom templates; writes in this process invalidate
+    # immediately, other processes see changes once the entry expires
+    services['custom_template_cache'] = TTLCache(maxsize=app.config['CUSTOM_TEMPLATE_CACHE_USERS'],
+                                                 ttl=app.config['CUSTOM_TEMPLATE_CACHE_SECONDS'])
+    
+    # Parsed numeric columns by sheet id, tagged with the sheet version they were parsed from
+    services['column_cache'] = TTLCache(maxsize=app.config['COLUMN_CACHE_SHEETS'],
+                                        ttl=app.config['COLUMN_CACHE_SECONDS'])
+    
+    # Signed-in users by id; entries are short-lived and dropped when the user row changes
+    services['user_cache'] = TTLCache(maxsize=app.config['USER_CACHE_SIZE'], ttl=app.config['USER_CACHE_SECONDS'])
+    
+    # Background file imports and large exports, each run inside this app's context
+    services['import_jobs'] = JobQueue(
+        app.config['IMPORT_JOBS_DB'] or os.path.join(app.root_path, 'uploads', '.import_jobs.sqlite'),
+        partial(run_import_job, app),
+        workers=app.config['IMPORT_WORKERS']
+    )
+    services['export_jobs'] = JobQueue(
+        app.config['EXPORT_JOBS_DB'] or os.path.join(app.root_path, 'exports', '.export_jobs.sqlite'),
+        partial(run_export_job, app),
+        workers=app.config['EXPORT_WORKERS']
+    )
+    
+    app.register_blueprint(bp)
+    app.cli.add_command(init_db_command)
+    return app
+
+def warm_caches(app):
+    """
+    Build the app's read-only caches before it serves any request
+    
+    gunicorn.conf.py calls this in the master process when the app is
+    preloaded, so every worker inherits the compiled Jinja templates and the
+    asset bundles instead of building its own copy.
+    
+    Args:
+        app: App returned by create_app()
+    """
+    for name in app.jinja_env.list_templates(extensions=['html']):
+        app.jinja_env.get_template(name)
+    
+    assets = app.extensions['excel_generator']['assets']
+    if assets.enabled:
+        for name in assets.bundles:
+            assets.bundle(name)
+
+def after_fork(app):
+    """
+    Prepare an app inherited from the gunicorn master for use in a worker
+    
+    The worker must not share the master's pooled database connections, so
+    the pool is emptied without closing them (closing would also close them
+    for the master). Pool statistics start from zero in each worker.
+    
+    Args:
+        app: App returned by create_app() before the fork
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    app.extensions['excel_generator']['pool_metrics'].reset()
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
@@ -0,0 +1,285 @@
+"""
+Static asset pipeline for Excel Generator.
+Each page's scripts and stylesheets are concatenated into one bundle,
+minified, and served under a content-hashed filename such as
+editor.3f9a2c1d7e44.js. A changed file gives a new URL, so bundles can be
+cached by browsers forever. Bundles are built in memory on first use, with
+a gzipped copy for clients that accept it.
+"""
+import gzip
+import hashlib
+import os
+import re
+import threading
+from collections import namedtuple
+
+# Bundle name -> files under static/, in load order
+BUNDLES = {
+    'base.css': ['css/styles.css'],
+    'base.js': ['js/global-navigation.js', 'js/scroll-fix.js'],
+    'editor.css': [
+        'css/excel-styles.css',
+        'css/merged-cells.css',
+        'css/grid-operations.css',
+        'css/enhanced-editor.css',
+    ],
+    'editor.js': [
+        'js/sheet-codec.js',
+        'js/excel-buttons.js',
+        'js/excel-formulas.js',
+        'js/excel-filters.js',
+        'js/excel-merge.js',
+        'js/column-resize.js',
+        'js/color-formatting.js',
+        'js/dropdown-fix.js',
+        'js/excel-keyboard.js',
+        'js/excel-data-validation.js',
+        'js/excel-cleanup.js',
+        'js/excel-performance.js',
+        'js/header-formatting.js',
+        'js/format-button.js',
+        'js/excel-grid-operations.js',
+        'js/export-handler.js',
+        'js/sheet-virtual-scroll.js',
+    ],
+}
+
+MIMETYPES = {'.js': 'application/javascript', '.css': 'text/css'}
+
+Asset = namedtuple('Asset', 'filename body gzipped mimetype')
+
+
+class AssetPipeline:
+    """
+    Builds and serves the bundles in BUNDLES
+
+    Args:
+        static_folder: Directory the bundle files are read from
+        bundles: Bundle name -> list of files relative to static_folder
+        enabled: When False, pages load the original files one by one
+    """
+
+    def __init__(self, static_folder, bundles=BUNDLES, enabled=True):
+        self.static_folder = static_folder
+        self.bundles = bundles
+        self.enabled = enabled
+        self._by_name = None      # bundle name -> Asset
+        self._by_filename = None  # hashed filename -> Asset
+        self._lock = threading.Lock()
+
+    def files(self, name):
+        """Files making up a bundle, relative to the static folder"""
+        return self.bundles[name]
+
+    def bundle(self, name):
+        """The built Asset for a bundle name"""
+        self._build()
+        return self._by_name[name]
+
+    def get(self, filename):
+        """The Asset served under a hashed filename, or None"""
+        self._build()
+        return self._by_filename.get(filename)
+
+    def _build(self):
+        if self._by_name is not None:
+            return
+        with self._lock:
+            if self._by_name is not None:
+                return
+            by_name = {name: self._build_bundle(name, files) for name, files in self.bundles.items()}
+            self._by_filename = {asset.filename: asset for asset in by_name.values()}
+            self._by_name = by_name
+
+    def _build_bundle(self, name, files):
+        stem, ext = os.path.splitext(name)
+        minify = minify_js if ext == '.js' else minify_css
+        parts = []
+        for relative in files:
+            with open(os.path.join(self.static_folder, relative), encoding='utf-8') as handle:
+                parts.append(f'/* {relative} */\n' + minify(handle.read()))
+        # The semicolon keeps one file's last statement from running into the next
+        body = ('\n;\n' if ext == '.js' else '\n').join(parts).encode('utf-8')
+        digest = hashlib.sha256(body).hexdigest()[:12]
+        return Asset(f'{stem}.{digest}{ext}', body, gzip.compress(body, 9, mtime=0), MIMETYPES[ext])
+
+
+_REGEX_PREFIX_CHARS = set('(,=:[!&|?{};+-*%<>~^')
+_REGEX_PREFIX_WORDS = {'return', 'typeof', 'case', 'else', 'in', 'of', 'delete', 'void', 'throw', 'new', 'do'}
+_WORD_CHAR = re.compile(r'[\w$]')
+
+
+def minify_js(source):
+    """
+    Remove comments, indentation and blank lines from JavaScript
+
+    Line breaks are kept so automatic semicolon insertion behaves exactly as
+    in the original file. Strings, template literals and regular expressions
+    are copied unchanged.
+    """
+    out = []
+    i = 0
+    n = len(source)
+    line_start = True
+    pending_space = False
+
+    def emit(text):
+        nonlocal line_start, pending_space
+        if pending_space and not line_start:
+            out.append(' ')
+        pending_space = False
+        line_start = False
+        out.append(text)
+
+    while i < n:
+        char = source[i]
+
+        if char == '\n':
+            if not line_start:
+                out.append('\n')
+            line_start = True
+            pending_space = False
+            i += 1
+        elif char in ' \t\r\f\v':
+            pending_space = True
+            i += 1
+        elif source.startswith('//', i):
+            end = source.find('\n', i)
+            i = n if end == -1 else end
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            end = n if end == -1 else end + 2
+            if '\n' in source[i:end] and not line_start:
+                # A comment spanning lines still separates statements
+                out.append('\n')
+                line_start = True
+            pending_space = True
+            i = end
+        elif char in '\'"':
+            end = _skip_string(source, i)
+            emit(source[i:end])
+            i = end
+        elif char == '`':
+            end = _skip_template(source, i)
+            emit(source[i:end])
+            i = end
+        elif char == '/':
+            end = _skip_regex(source, i) if _regex_allowed(source, i) else i + 1
+            emit(source[i:end])
+            i = end
+        else:
+            start = i
+            while i < n and source[i] not in ' \t\r\f\v\n\'"`/':
+                i += 1
+            emit(source[start:i])
+
+    return ''.join(out).rstrip() + '\n'
+
+
+def _regex_allowed(source, i):
+    """Whether a / at i starts a regular expression rather than a division"""
+    i -= 1
+    while i >= 0 and source[i].isspace():
+        i -= 1
+    if i < 0:
+        return True
+    if _WORD_CHAR.match(source[i]):
+        start = i
+        while start > 0 and _WORD_CHAR.match(source[start - 1]):
+            start -= 1
+        return source[start:i + 1] in _REGEX_PREFIX_WORDS
+    return source[i] in _REGEX_PREFIX_CHARS
+
+
+def _skip_string(source, i):
+    """Index just past the quoted string starting at i"""
+    quote = source[i]
+    i += 1
+    while i < len(source):
+        if source[i] == '\\':
+            i += 2
+            continue
+        if source[i] == quote or source[i] == '\n':
+            return i + 1
+        i += 1
+    return i
+
+
+def _skip_template(source, i):
+    """Index just past the template literal starting at i, including nested ${...}"""
+    i += 1
+    while i < len(source):
+        char = source[i]
+        if char == '\\':
+            i += 2
+        elif char == '`':
+            return i + 1
+        elif source.startswith('${', i):
+            i = _skip_braces(source, i + 2)
+        else:
+            i += 1
+    return i
+
+
+def _skip_braces(source, i):
+    """Index just past the } closing an expression that starts at i"""
+    depth = 0
+    while i < len(source):
+        char = source[i]
+        if char in '\'"':
+            i = _skip_string(source, i)
+        elif char == '`':
+            i = _skip_template(source, i)
+        elif char == '/' and _regex_allowed(source, i):
+            i = _skip_regex(source, i)
+        elif char == '{':
+            depth += 1
+            i += 1
+        elif char == '}':
+            if depth == 0:
+                return i + 1
+            depth -= 1
+            i += 1
+        else:
+            i += 1
+    return i
+
+
+def _skip_regex(source, i):
+    """Index just past the regular expression literal (and flags) starting at i"""
+    i += 1
+    in_class = False
+    while i < len(source) and source[i] != '\n':
+        char = source[i]
+        if char == '\\':
+            i += 2
+            continue
+        if char == '[':
+            in_class = True
+        elif char == ']':
+            in_class = False
+        elif char == '/' and not in_class:
+            i += 1
+            while i < len(source) and _WORD_CHAR.match(source[i]):
+                i += 1
+            return i
+        i += 1
+    return i
+
+
+_CSS_TOKENS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|(/\*.*?\*/)|(\s*[{};,]\s*)|(\s+)', re.S)
+
+
+def minify_css(source):
+    """Remove comments and collapse whitespace in CSS, leaving strings unchanged"""
+    def replace(match):
+        string, comment, punctuation, space = match.groups()
+        if string:
+            return string
+        if comment:
+            return ''
+        if punctuation:
+            # Spaces next to braces, semicolons and commas carry no meaning
+            return punctuation.strip()
+        return ' '
+    return _CSS_TOKENS.sub(replace, source).strip() + '\n'
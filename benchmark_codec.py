@@ -0,0 +1,101 @@
+"""
+Benchmark the compact sheet encoding.
+Builds synthetic grids shaped like the built-in templates (repeated
+categories, empty notes) and unique numeric data, then reports the size of
+plain JSON against the column layout and each compressed codec, with the
+encode and decode cost per MB of plain JSON.
+
+Usage:
+    python benchmark_codec.py               # 50k rows per grid
+    python benchmark_codec.py --rows 5000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+# Add the current directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sheet_codec import CODECS, to_columns, from_columns, pack_rows, unpack_rows
+from templates import get_built_in_template
+
+
+def expense_rows(count, rng):
+    """Rows drawn from the Expense Tracker template's sample values"""
+    template = get_built_in_template('2')
+    samples = template.sample_data
+    rows = [list(template.headers)]
+    for row in range(count):
+        sample = rng.choice(samples)
+        rows.append([f'2024-{row % 12 + 1:02d}-{row % 28 + 1:02d}', sample[1], sample[2],
+                     f'{rng.uniform(1, 500):.2f}', rng.choice(samples)[4], ''])
+    return rows
+
+
+def numeric_rows(count, rng, columns=8):
+    """Mostly unique values, the worst case for dictionary encoding"""
+    rows = [[f'Value {col + 1}' for col in range(columns)]]
+    rows.extend([f'{rng.random() * 10000:.4f}' for _ in range(columns)] for _ in range(count))
+    return rows
+
+
+def sparse_rows(count, rng, columns=20):
+    """A wide grid where most cells are empty"""
+    rows = [[f'Column {col + 1}' for col in range(columns)]]
+    rows.extend([str(rng.randint(1, 99)) if rng.random() < 0.1 else '' for _ in range(columns)]
+                for _ in range(count))
+    return rows
+
+
+def timed(func, repeat=3):
+    """Best of `repeat` runs, in seconds, and the last result"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the compact sheet encoding')
+    parser.add_argument('--rows', type=int, default=50_000, help='Data rows per grid')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    grids = {
+        'expense': expense_rows(args.rows, rng),
+        'numeric': numeric_rows(args.rows, rng),
+        'sparse': sparse_rows(args.rows, rng),
+    }
+
+    print(f"{'Grid':<9} {'Encoding':<9} {'MB':>8} {'Ratio':>7} {'Encode ms/MB':>13} {'Decode ms/MB':>13}")
+    print("-" * 64)
+    for name, rows in grids.items():
+        plain = json.dumps(rows, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        plain_mb = len(plain) / (1024 * 1024)
+        print(f"{name:<9} {'json':<9} {plain_mb:>8.2f} {1:>7.1f} {'':>13} {'':>13}")
+
+        def report(label, size, encode_seconds, decode_seconds):
+            print(f"{'':<9} {label:<9} {size / (1024 * 1024):>8.2f} {len(plain) / size:>7.1f} "
+                  f"{encode_seconds * 1000 / plain_mb:>13.1f} {decode_seconds * 1000 / plain_mb:>13.1f}")
+
+        encode_seconds, body = timed(
+            lambda: json.dumps(to_columns(rows), separators=(',', ':'), ensure_ascii=False).encode('utf-8'))
+        decode_seconds, decoded = timed(lambda: from_columns(json.loads(body)))
+        assert decoded == rows
+        report('columns', len(body), encode_seconds, decode_seconds)
+
+        for codec in CODECS:
+            encode_seconds, blob = timed(lambda: pack_rows(rows, codec))
+            decode_seconds, decoded = timed(lambda: unpack_rows(blob))
+            assert decoded == rows
+            report(codec, len(blob), encode_seconds, decode_seconds)
+
+
+if __name__ == "__main__":
+    main()
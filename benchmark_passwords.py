@@ -0,0 +1,85 @@
+"""
+Benchmark password verification under different hashing policies.
+For each policy, reports logins per second on one core and through the
+bounded PasswordHasher pool with one thread per core, driven by more
+concurrent clients than there are threads.
+
+Usage:
+    python benchmark_passwords.py                                   # built-in policies
+    python benchmark_passwords.py --method scrypt:16384:8:1 --seconds 5
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+# Add the current directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from password_policy import PasswordHasher
+
+POLICIES = [
+    'pbkdf2:sha256:1000000',  # Default policy, and what set_password used before it was configurable
+    'pbkdf2:sha256:600000',
+    'pbkdf2:sha256:260000',
+    'scrypt:32768:8:1',       # Werkzeug's default scrypt parameters
+    'scrypt:16384:8:1',
+]
+PASSWORD = 'correct horse battery staple'
+
+
+def single_core(password_hash, seconds):
+    """Verifications per second in this thread"""
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        check_password_hash(password_hash, PASSWORD)
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def pooled(method, password_hash, seconds, workers, clients):
+    """Verifications per second through the pool, with `clients` threads logging in"""
+    hasher = PasswordHasher(method, workers=workers, max_pending=clients, wait_seconds=60)
+    count = 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client():
+        nonlocal count
+        while time.perf_counter() < deadline:
+            hasher.verify(password_hash, PASSWORD)
+            with lock:
+                count += 1
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark password verification policies')
+    parser.add_argument('--method', action='append', help='Policy to measure (repeatable)')
+    parser.add_argument('--seconds', type=float, default=3.0, help='Measuring time per policy')
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    print(f"{cores} core(s); pool uses {cores} thread(s) and {cores * 4} clients\n")
+    print(f"{'Policy':<24} {'ms/login':>9} {'Logins/s/core':>14} {'Pool logins/s':>14} {'Pool /core':>11}")
+    print("-" * 76)
+    for method in args.method or POLICIES:
+        password_hash = generate_password_hash(PASSWORD, method=method, salt_length=16)
+        per_core = single_core(password_hash, args.seconds)
+        total = pooled(method, password_hash, args.seconds, cores, cores * 4)
+        print(f"{method:<24} {1000 / per_core:>9.1f} {per_core:>14.1f} {total:>14.1f} {total / cores:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
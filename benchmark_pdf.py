@@ -0,0 +1,78 @@
+"""
+Benchmark the PDF export.
+Renders synthetic sheets of 10k, 100k and 500k cells and reports pages per
+second and peak memory. Each size runs in its own process so the peak RSS
+of one run does not hide the next.
+
+Usage:
+    python benchmark_pdf.py                 # all sizes
+    python benchmark_pdf.py --cells 100000  # a single size
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# Add the current directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from pdf_export import create_pdf
+
+SIZES = [10_000, 100_000, 500_000]
+COLUMNS = 10
+
+
+def synthetic_rows(cells, columns=COLUMNS):
+    """Yield a header plus enough rows of mixed text and numbers to reach `cells`"""
+    yield [f'Column {col + 1}' for col in range(columns)]
+    for row in range(cells // columns):
+        yield [f'Item {row}' if col == 0 else str(row * columns + col) for col in range(columns)]
+
+
+def run_one(cells):
+    """Render one sheet and return its measurements"""
+    with tempfile.TemporaryDirectory() as directory:
+        filepath = os.path.join(directory, 'benchmark.pdf')
+        start = time.perf_counter()
+        pages = create_pdf(synthetic_rows(cells), filepath, title='Benchmark')
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(filepath)
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    return {
+        'cells': cells,
+        'pages': pages,
+        'seconds': round(elapsed, 3),
+        'pages_per_second': round(pages / elapsed, 1) if elapsed else None,
+        'file_mb': round(size / (1024 * 1024), 2),
+        'peak_rss_mb': round(peak_mb, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the PDF export')
+    parser.add_argument('--cells', type=int, help='Run a single size in this process')
+    args = parser.parse_args()
+
+    if args.cells:
+        print(json.dumps(run_one(args.cells)))
+        return
+
+    print(f"{'Cells':>10} {'Pages':>7} {'Seconds':>9} {'Pages/s':>9} {'File MB':>9} {'Peak RSS MB':>12}")
+    print("-" * 60)
+    for cells in SIZES:
+        output = subprocess.run([sys.executable, __file__, '--cells', str(cells)],
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output)
+        print(f"{result['cells']:>10} {result['pages']:>7} {result['seconds']:>9} "
+              f"{result['pages_per_second']:>9} {result['file_mb']:>9} {result['peak_rss_mb']:>12}")
+
+
+if __name__ == "__main__":
+    main()
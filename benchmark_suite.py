@@ -0,0 +1,353 @@
+"""
+Benchmark the sheet lifecycle end to end.
+Drives the app through Flask's test client against a temporary SQLite
+database: creates sheets from the built-in templates and from synthetic
+grids of increasing size, then times opening them in the editor, saving
+them, exporting them in every format (with a cold and a warm export cache)
+and listing the history pages. Results are written as JSON so runs can be
+compared over time; --baseline (or --compare) flags operations that got
+slower than an earlier run.
+
+Usage:
+    python benchmark_suite.py                                     # all sizes up to 1M cells
+    python benchmark_suite.py --sizes templates,10000 --repeat 5 --output before.json
+    python benchmark_suite.py --sizes templates,10000 --baseline before.json
+    python benchmark_suite.py --compare before.json after.json
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Add the current directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_SIZES = 'templates,10000,100000,1000000'
+CATEGORIES = ['Groceries', 'Utilities', 'Transportation', 'Entertainment', 'Dining', 'Health', 'Travel', 'Office']
+
+
+class BenchmarkError(RuntimeError):
+    """Raised when the app answers a benchmark request with an error"""
+
+
+def synthetic_grid(cells, columns, rng):
+    """A header row plus enough data rows for `cells` cells, with one formula column"""
+    header = [f'Column {col + 1}' for col in range(columns)]
+    rows = [header]
+    for row in range(2, max(cells // columns, 1) + 2):
+        values = [str(row - 1), f'2024-{row % 12 + 1:02d}-{row % 28 + 1:02d}', rng.choice(CATEGORIES),
+                  f'{rng.uniform(1, 500):.2f}', str(rng.randint(1, 20)), f'=D{row}*E{row}']
+        for col in range(len(values), columns):
+            values.append(f'{rng.random() * 1000:.3f}' if col % 3 else '')
+        rows.append(values[:columns])
+    return rows
+
+
+def template_grids():
+    """One grid per built-in template: its headers followed by its sample rows"""
+    from templates import get_built_in_templates
+    return {f'template-{template.id}': [list(template.headers)] + [list(row) for row in template.sample_data]
+            for template in get_built_in_templates()}
+
+
+def summarize(runs, **extra):
+    """Timing summary of a list of durations in seconds"""
+    runs_ms = [round(run * 1000, 3) for run in runs]
+    return dict(extra, runs_ms=runs_ms, median_ms=round(statistics.median(runs_ms), 3),
+                min_ms=min(runs_ms), max_ms=max(runs_ms))
+
+
+class LifecycleBenchmark:
+    """
+    Times the sheet lifecycle through the test client
+
+    Args:
+        app_module: The imported app_updated module
+        app: App built by app_updated.create_app()
+        export_dir: Directory the export cache writes to; emptied for cold exports
+        repeat: Timed runs per operation
+        formats: Export formats to measure
+    """
+
+    def __init__(self, app_module, app, export_dir, repeat, formats):
+        self.app_module = app_module
+        self.app = app
+        self.export_dir = export_dir
+        self.repeat = repeat
+        self.formats = formats
+        self.client = app.test_client()
+        self.results = {}
+
+    def login(self, username, password):
+        response = self.client.post('/login', data={'username': username, 'password': password})
+        if response.status_code != 302:
+            raise BenchmarkError(f'Login as {username} failed')
+
+    def seed_history(self, users, sheets_per_user, rng):
+        """Other users' sheets and downloads, so history queries run against a populated table"""
+        app_module = self.app_module
+        db, User, Sheet, DownloadHistory = app_module.db, app_module.User, app_module.Sheet, app_module.DownloadHistory
+        with self.app.app_context():
+            # One shared hash keeps seeding from spending minutes stretching keys
+            password_hash = app_module.password_hasher.hash('benchmark')
+            demo = User.query.filter_by(username='demo').first()
+            owners = [demo.id]
+            for index in range(users):
+                user = User(username=f'bench-user-{index}', email=f'bench-user-{index}@example.com',
+                            name=f'Benchmark User {index}', password_hash=password_hash)
+                db.session.add(user)
+                db.session.flush()
+                owners.append(user.id)
+            for owner in owners:
+                for index in range(sheets_per_user):
+                    rows = synthetic_grid(rng.choice([20, 60, 200]), 5, rng)
+                    sheet = Sheet(sheet_name=f'history-{index}', data=rows, user_id=owner)
+                    db.session.add(sheet)
+                    db.session.flush()
+                    db.session.add(DownloadHistory(user_id=owner, sheet_id=sheet.id,
+                                                   filename=f'history-{index}.csv', format='csv'))
+                db.session.commit()
+
+    def run_grid(self, label, rows):
+        """Create, open, save and export one grid; returns the name of the sheet left behind"""
+        cells = sum(len(row) for row in rows)
+        names = [f'bench-{label}-{run}' for run in range(self.repeat)]
+
+        create_runs = []
+        for name in names:
+            start = time.perf_counter()
+            via = self.create(name, rows)
+            create_runs.append(time.perf_counter() - start)
+        self.record(label, 'create', create_runs, cells=cells, via=via)
+        # Keep the first copy and drop the others so later sizes see the same history
+        for name in names[1:]:
+            self.client.post(f'/delete_sheet/{name}')
+        name = names[0]
+
+        self.record(label, 'open', self.timed(lambda: self.client.get(f'/edit_sheet/{name}')), cells=cells)
+
+        version = self.check(self.client.get(f'/sheet_rows/{name}?limit=0')).json['version']
+        save_runs = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            response = self.check(self.client.post(f'/update_sheet/{name}',
+                                                   json={'data': rows, 'base_version': version}))
+            save_runs.append(time.perf_counter() - start)
+            version = response.json['version']
+        self.record(label, 'save', save_runs, cells=cells)
+
+        for format_type in self.formats:
+            url = f'/export_sheet/{name}/{format_type}'
+            cold_runs = []
+            size = 0
+            for _ in range(self.repeat):
+                self.clear_exports()
+                start = time.perf_counter()
+                size = len(self.check(self.client.get(url)).get_data())
+                cold_runs.append(time.perf_counter() - start)
+            self.record(label, f'export_{format_type}_cold', cold_runs, cells=cells, bytes=size)
+            self.record(label, f'export_{format_type}_warm', self.timed(lambda: self.client.get(url)),
+                        cells=cells, bytes=size)
+        return name
+
+    def run_history(self):
+        self.record('history', 'sheet_history', self.timed(lambda: self.client.get('/history')))
+        self.record('history', 'download_history', self.timed(lambda: self.client.get('/download_history')))
+
+    def create(self, name, rows):
+        """Create a sheet the way the UI would: the add form when the data fits, an import otherwise"""
+        data = ';'.join(','.join(row) for row in rows)
+        if len(data) < self.app.config['MAX_FORM_MEMORY_SIZE'] - 1024:
+            response = self.client.post('/add_sheet', data={'sheet_name': name, 'data': data})
+            if response.status_code != 302 or '/edit_sheet/' not in response.headers.get('Location', ''):
+                raise BenchmarkError(f'Creating {name} failed')
+            return 'form'
+
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        upload = (io.BytesIO(buffer.getvalue().encode('utf-8')), f'{name}.csv')
+        job = self.check(self.client.post('/import_sheet', data={'sheet_name': name, 'file': upload},
+                                          content_type='multipart/form-data')).json
+        from job_queue import DONE, FAILED
+        while True:
+            status = self.check(self.client.get(job['status_url'])).json
+            if status['status'] == DONE:
+                return 'import'
+            if status['status'] == FAILED:
+                raise BenchmarkError(f'Importing {name} failed: {status.get("message")}')
+            time.sleep(0.01)
+
+    def timed(self, send):
+        """Durations of `repeat` requests, including reading the whole body"""
+        runs = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            self.check(send()).get_data()
+            runs.append(time.perf_counter() - start)
+        return runs
+
+    def check(self, response):
+        if response.status_code != 200:
+            raise BenchmarkError(f'{response.request.method} {response.request.path} '
+                                 f'answered {response.status_code}')
+        if response.is_json and response.json.get('success') is False:
+            raise BenchmarkError(f'{response.request.path}: {response.json.get("message")}')
+        return response
+
+    def clear_exports(self):
+        for entry in os.scandir(self.export_dir):
+            if entry.is_file():
+                os.remove(entry.path)
+
+    def record(self, label, operation, runs, **extra):
+        result = summarize(runs, **extra)
+        self.results[f'{label}/{operation}'] = result
+        details = ', '.join(f'{key}={value}' for key, value in extra.items())
+        print(f"{label:<16} {operation:<22} {result['median_ms']:>10.1f} {result['min_ms']:>10.1f} "
+              f"{result['max_ms']:>10.1f}  {details}", flush=True)
+
+
+def run_suite(args):
+    workdir = tempfile.mkdtemp(prefix='excel-bench-')
+    database = args.database or os.path.join(workdir, 'bench.sqlite')
+    export_dir = os.path.join(workdir, 'exports')
+    os.makedirs(export_dir)
+    import app_updated
+    app = app_updated.create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.abspath(database)}',
+        'EXPORT_JOBS_DB': os.path.join(workdir, 'export_jobs.sqlite'),
+        'IMPORT_JOBS_DB': os.path.join(workdir, 'import_jobs.sqlite'),
+        'PROFILE_SAMPLE_RATE': 0,
+        'WTF_CSRF_ENABLED': False,
+    })
+    app.extensions['excel_generator']['export_cache'].directory = export_dir
+    app.test_cli_runner().invoke(app_updated.init_db_command)
+
+    formats = args.formats.split(',') if args.formats else list(app_updated.EXPORT_MIMETYPES)
+    bench = LifecycleBenchmark(app_updated, app, export_dir, args.repeat, formats)
+    rng = random.Random(42)
+    try:
+        bench.seed_history(args.users, args.history_sheets, rng)
+        bench.login('demo', 'password')
+
+        print(f"{'Grid':<16} {'Operation':<22} {'Median ms':>10} {'Min ms':>10} {'Max ms':>10}")
+        print("-" * 84)
+        for size in args.sizes.split(','):
+            if size == 'templates':
+                for label, rows in template_grids().items():
+                    bench.run_grid(label, rows)
+            else:
+                bench.run_grid(f'{int(size)}-cells', synthetic_grid(int(size), args.columns, rng))
+        bench.run_history()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'args': {key: value for key, value in vars(args).items() if key not in ('compare', 'baseline')},
+        },
+        'results': bench.results,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, current, threshold, min_ms):
+    """
+    Print each operation's change against a baseline run
+
+    Args:
+        baseline: Results dict of the earlier run
+        current: Results dict of the new run
+        threshold: Relative slowdown of the median that counts as a regression, e.g. 0.2 for 20%
+        min_ms: Absolute slowdowns smaller than this are treated as noise
+
+    Returns:
+        Names of the operations that regressed
+    """
+    regressions = []
+    print(f"\n{'Operation':<40} {'Before ms':>10} {'After ms':>10} {'Change':>8}")
+    print("-" * 80)
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            print(f"{name:<40} {'':>10} {result['median_ms']:>10.1f} {'new':>8}")
+            continue
+        old, new = before['median_ms'], result['median_ms']
+        change = (new - old) / old if old else 0.0
+        flag = ''
+        if change > threshold and new - old > min_ms:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        elif change < -threshold and old - new > min_ms:
+            flag = '  faster'
+        print(f"{name:<40} {old:>10.1f} {new:>10.1f} {change:>+8.0%}{flag}")
+    for name in baseline['results']:
+        if name not in current['results']:
+            print(f"{name:<40} {baseline['results'][name]['median_ms']:>10.1f} {'':>10} {'gone':>8}")
+    return regressions
+
+
+def load(path):
+    with open(path, encoding='utf-8') as handle:
+        return json.load(handle)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the sheet lifecycle through the test client')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                        help='Comma-separated grid sizes in cells; "templates" means the built-in templates')
+    parser.add_argument('--columns', type=int, default=20, help='Columns of the synthetic grids')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per operation')
+    parser.add_argument('--formats', help='Comma-separated export formats (default: all)')
+    parser.add_argument('--users', type=int, default=20, help='Other users seeded with sheets and downloads')
+    parser.add_argument('--history-sheets', type=int, default=50, help='Sheets seeded per user')
+    parser.add_argument('--database', help='SQLite file to use (default: a temporary file)')
+    parser.add_argument('--output', default='benchmark_results.json', help='Where to write the results')
+    parser.add_argument('--baseline', help='Results of an earlier run to compare against')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'),
+                        help='Only compare two result files')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Relative slowdown of the median counted as a regression')
+    parser.add_argument('--min-ms', type=float, default=2.0, help='Ignore slowdowns smaller than this')
+    args = parser.parse_args()
+
+    if args.compare:
+        baseline, current = load(args.compare[0]), load(args.compare[1])
+    else:
+        current = run_suite(args)
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump(current, handle, indent=2)
+        print(f"\nResults written to {args.output}")
+        baseline = load(args.baseline) if args.baseline else None
+
+    if baseline is not None:
+        regressions = compare(baseline, current, args.threshold, args.min_ms)
+        if regressions:
+            print(f"\n{len(regressions)} operation(s) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+        print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,12 +7,111 @@ DB_HOST = os.environ.get('DB_HOST', 'tramway.proxy.rlwy.net')
 DB_PORT = os.environ.get('DB_PORT', '58062')
 DB_NAME = os.environ.get('DB_NAME', 'railway')
 
-# SQLAlchemy database URI - updated for Railway
-SQLALCHEMY_DATABASE_URI = f'mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
+# SQLAlchemy database URI - updated for Railway; DATABASE_URL points the app at another
+# database, e.g. sqlite:////tmp/excel.sqlite for local runs and benchmarks
+SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or f'mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
 SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+# Connection pool per worker process; /pool_stats shows how much of it is used.
+# Connections idle longer than DB_POOL_RECYCLE seconds are replaced before the
+# proxy drops them, and each checkout is pinged so a dead connection is never handed out.
+# In-memory SQLite has no pool to size, so it ignores the first three.
+SQLALCHEMY_ENGINE_OPTIONS = {
+    'pool_size': int(os.environ.get('DB_POOL_SIZE', '5')),
+    'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', '10')),
+    'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),
+    'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', '280')),
+    'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes'),
+}
+
 # Application secret key
 SECRET_KEY = os.environ.get('SECRET_KEY', 'your_secret_key_for_development')
 
 # Debug mode
 DEBUG = os.environ.get('FLASK_ENV') != 'production'
+
+# Password hashing policy. Weaker hashes (fewer iterations, shorter salt) are upgraded on the
+# next login; stronger ones are left alone. The default matches what set_password used before.
+PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000000')
+PASSWORD_SALT_LENGTH = int(os.environ.get('PASSWORD_SALT_LENGTH', '16'))
+# Threads per process doing key stretching, and logins allowed to queue for them
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', '1'))
+PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', '32'))
+PASSWORD_HASH_WAIT_SECONDS = float(os.environ.get('PASSWORD_HASH_WAIT_SECONDS', '2'))
+
+# Per-process cache of the signed-in user loaded on each request
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', '4096'))
+USER_CACHE_SECONDS = int(os.environ.get('USER_CACHE_SECONDS', '30'))
+# How long the editor's JSON endpoints may trust the user snapshot kept in the session cookie.
+# A deleted or changed user keeps access to them for this long, so keep it to a few seconds;
+# that still covers the bursts of saves an editing session sends.
+SESSION_PRINCIPAL_SECONDS = int(os.environ.get('SESSION_PRINCIPAL_SECONDS', '5'))
+
+# Sheet storage: 'chunked' stores rows in fixed-size chunks, 'blob' keeps the whole grid in sheet.data
+SHEET_STORAGE = os.environ.get('SHEET_STORAGE', 'chunked')
+SHEET_CHUNK_ROWS = int(os.environ.get('SHEET_CHUNK_ROWS', '500'))
+
+# Opt-in: store chunks column-oriented and compressed with zlib, lzma or zstd (Python 3.14+).
+# 'none' keeps them as plain JSON rows; chunks written either way stay readable after a switch.
+SHEET_COMPRESSION = os.environ.get('SHEET_COMPRESSION', 'none')
+
+# Parsed numeric columns of recently edited sheets, reused by the next save so
+# whole-column aggregates are not re-read from every chunk (per worker process)
+COLUMN_CACHE_SHEETS = int(os.environ.get('COLUMN_CACHE_SHEETS', '64'))
+COLUMN_CACHE_SECONDS = int(os.environ.get('COLUMN_CACHE_SECONDS', '600'))
+
+# Patches: columns a sheet may grow to (wider imported sheets keep their width), and rows one batch may insert
+MAX_SHEET_COLS = int(os.environ.get('MAX_SHEET_COLS', '1024'))
+MAX_PATCH_ROWS = int(os.environ.get('MAX_PATCH_ROWS', '1000'))
+
+# Editor: sheets with more data rows than the threshold are rendered as a scrolling window
+EDITOR_VIRTUAL_THRESHOLD = int(os.environ.get('EDITOR_VIRTUAL_THRESHOLD', '500'))
+EDITOR_ROW_BLOCK = int(os.environ.get('EDITOR_ROW_BLOCK', '200'))
+EDITOR_MAX_WINDOW = int(os.environ.get('EDITOR_MAX_WINDOW', '2000'))
+
+# Rows (header included) returned by the sheet preview
+PREVIEW_ROWS = int(os.environ.get('PREVIEW_ROWS', '51'))
+
+# Export cache: rendered exports are kept in exports/ until it grows past this size
+EXPORT_CACHE_MAX_BYTES = int(os.environ.get('EXPORT_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+
+# Background exports: sheets with at least this many cells are exported by a worker thread
+EXPORT_ASYNC_CELLS = int(os.environ.get('EXPORT_ASYNC_CELLS', '200000'))
+EXPORT_WORKERS = int(os.environ.get('EXPORT_WORKERS', '2'))
+# SQLite file with export job state; empty means exports/.export_jobs.sqlite
+EXPORT_JOBS_DB = os.environ.get('EXPORT_JOBS_DB', '')
+
+# File imports: rows written per batch, and worker threads loading uploaded files
+IMPORT_BATCH_ROWS = int(os.environ.get('IMPORT_BATCH_ROWS', '2000'))
+IMPORT_WORKERS = int(os.environ.get('IMPORT_WORKERS', '1'))
+# SQLite file with import job state; empty means uploads/.import_jobs.sqlite
+IMPORT_JOBS_DB = os.environ.get('IMPORT_JOBS_DB', '')
+
+# Static assets: pages load one minified, content-hashed bundle per page instead of the individual files
+ASSET_BUNDLING = os.environ.get('ASSET_BUNDLING', 'true').lower() in ('1', 'true', 'yes')
+
+# HTML and JSON responses at least this large are gzipped for clients that accept it
+GZIP_MIN_BYTES = int(os.environ.get('GZIP_MIN_BYTES', '1024'))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', '6'))
+
+# How long browsers may cache built-in template payloads from /get_template
+TEMPLATE_CACHE_SECONDS = int(os.environ.get('TEMPLATE_CACHE_SECONDS', '86400'))
+
+# Per-process cache of each user's custom templates
+CUSTOM_TEMPLATE_CACHE_USERS = int(os.environ.get('CUSTOM_TEMPLATE_CACHE_USERS', '1024'))
+CUSTOM_TEMPLATE_CACHE_SECONDS = int(os.environ.get('CUSTOM_TEMPLATE_CACHE_SECONDS', '60'))
+
+# Rows per page on the sheet and download history pages
+HISTORY_PAGE_SIZE = int(os.environ.get('HISTORY_PAGE_SIZE', '50'))
+
+# /metrics, /pool_stats and /export_cache_stats: callers send "Authorization: Bearer <METRICS_TOKEN>";
+# while it is empty those endpoints are turned off
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Profiling: this fraction of requests runs under cProfile (0 turns it off), and profiles of
+# requests slower than PROFILE_THRESHOLD_MS are written to PROFILE_DIR (empty means profiles/)
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_THRESHOLD_MS = float(os.environ.get('PROFILE_THRESHOLD_MS', '1000'))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', '')
+# Also log the process's memory before and after each saved profile (uses memory-profiler)
+PROFILE_MEMORY = os.environ.get('PROFILE_MEMORY', 'false').lower() in ('1', 'true', 'yes')
@@ -0,0 +1,160 @@
+"""
+Export cache for Excel Generator.
+Rendered exports are stored in the export directory under a name derived
+from what was rendered (sheet, sheet version, format and options), so a
+download of an unchanged sheet is served from disk instead of being
+generated again. The directory is kept under a size limit by evicting the
+least recently used files.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+
+class ExportCache:
+    """
+    Size-bounded LRU cache of export files
+
+    Args:
+        directory: Directory holding the cached files
+        max_bytes: Total size the directory is trimmed to after each store
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(sheet_id, version, updated_at, format_type, options=None):
+        """Stable key for one rendering of a sheet; also used as the ETag"""
+        payload = json.dumps({
+            'sheet': sheet_id,
+            'version': version,
+            'updated_at': updated_at.isoformat() if updated_at else None,
+            'format': format_type,
+            'options': options or {},
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def path_for(self, key, extension):
+        return os.path.join(self.directory, f"{key}.{extension}")
+
+    def get(self, key, extension):
+        """Return the cached file path for `key`, or None on a miss"""
+        path = self.path_for(key, extension)
+        try:
+            # Touch the file so eviction sees it as recently used
+            os.utime(path)
+        except OSError:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return path
+
+    def record_not_modified(self):
+        """Count a request answered with 304 from the client's own copy"""
+        self._count('not_modified')
+
+    def store(self, key, extension, write):
+        """
+        Render a file into the cache
+
+        Args:
+            key: Cache key from make_key
+            extension: File extension without the dot
+            write: Callable taking a path and writing the export to it
+
+        Returns:
+            Path of the cached file
+        """
+        path = self.path_for(key, extension)
+        temp_path = self._temp_path(extension)
+        try:
+            write(temp_path)
+            os.replace(temp_path, path)
+        except BaseException:
+            self._discard(temp_path)
+            raise
+        self.evict(keep=path)
+        return path
+
+    def tee(self, key, extension, pieces):
+        """
+        Pass text pieces through while also writing them into the cache
+
+        The file is only added to the cache once every piece has been
+        produced, so an interrupted download leaves nothing behind.
+        """
+        temp_path = self._temp_path(extension)
+        completed = False
+        try:
+            with open(temp_path, 'w', encoding='utf-8', newline='') as handle:
+                for piece in pieces:
+                    handle.write(piece)
+                    yield piece
+            os.replace(temp_path, self.path_for(key, extension))
+            completed = True
+        finally:
+            if not completed:
+                self._discard(temp_path)
+        self.evict()
+
+    def evict(self, keep=None):
+        """Delete least recently used files until the directory fits in max_bytes"""
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if not entry.is_file() or entry.name.startswith('.') or entry.path == keep:
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        if keep and os.path.exists(keep):
+            total += os.path.getsize(keep)
+
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            self._discard(path)
+            self._count('evictions')
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self):
+        """Counters for this process, including the hit ratio"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _temp_path(self, extension):
+        os.makedirs(self.directory, exist_ok=True)
+        # Dot-prefixed so eviction skips files that are still being written
+        handle, path = tempfile.mkstemp(prefix='.tmp-', suffix=f'.{extension}', dir=self.directory)
+        os.close(handle)
+        return path
+
+    @staticmethod
+    def _discard(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,946 @@
+"""
+Formula engine for sheets.
+This module evaluates Excel-style formulas such as =SUM(D2:F2) or
+=IF(H2>40,H2-40,0) on the server. It keeps a dependency graph between cells
+so an edit only recalculates the formulas downstream of it.
+
+Cell references use Excel coordinates: A1 is row 0, column 0 of the grid,
+which is the header row. Supported functions are SUM, AVERAGE, MIN, MAX,
+COUNT and IF, together with arithmetic (+ - * / ^), comparisons and & for
+text concatenation. SUM, AVERAGE, MIN, MAX and COUNT over ranges run as
+NumPy reductions on a per-column numeric cache.
+"""
+import math
+import re
+from bisect import bisect_left, bisect_right, insort
+
+
+class CellError:
+    """An Excel error value such as #DIV/0!"""
+
+    def __init__(self, code):
+        self.code = code
+
+    def __eq__(self, other):
+        return isinstance(other, CellError) and other.code == self.code
+
+    def __hash__(self):
+        return hash(self.code)
+
+    def __str__(self):
+        return self.code
+
+    def __repr__(self):
+        return f'CellError({self.code!r})'
+
+
+DIV0 = CellError('#DIV/0!')
+VALUE = CellError('#VALUE!')
+NAME = CellError('#NAME?')
+NUM = CellError('#NUM!')
+CIRC = CellError('#CIRC!')
+SYNTAX = CellError('#ERROR!')
+
+ERRORS = {error.code: error for error in (DIV0, VALUE, NAME, NUM, CIRC, SYNTAX)}
+
+# Rows per bucket in the range dependency index
+RANGE_BUCKET_ROWS = 256
+
+
+class FormulaSyntaxError(ValueError):
+    """Raised when a formula cannot be parsed"""
+
+
+def is_formula(raw):
+    return isinstance(raw, str) and raw.startswith('=') and len(raw) > 1
+
+
+def column_index(letters):
+    """Convert column letters to a 0-based index (A -> 0, AA -> 26)"""
+    index = 0
+    for char in letters.upper():
+        index = index * 26 + ord(char) - 64
+    return index - 1
+
+
+def parse_literal(raw):
+    """Interpret a stored (non-formula) cell string as a value"""
+    if raw is None:
+        return None
+    if not isinstance(raw, str):
+        return raw
+    text = raw.strip()
+    if not text:
+        return None
+    if text in ERRORS:
+        return ERRORS[text]
+    try:
+        return float(text)
+    except ValueError:
+        return raw
+
+
+def format_value(value):
+    """Render a computed value the way it is shown in the grid and exports"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, float):
+        if value.is_integer() and abs(value) < 1e15:
+            return str(int(value))
+        return format(value, '.15g')
+    return str(value)
+
+
+# Parsing ---------------------------------------------------------------------
+
+_TOKEN_RE = re.compile(r'''
+    \s*(?:
+        (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+      | (?P<string>"(?:[^"]|"")*")
+      | (?P<range>\$?[A-Za-z]{1,3}\$?\d+:\$?[A-Za-z]{1,3}\$?\d+|\$?[A-Za-z]{1,3}:\$?[A-Za-z]{1,3})
+      | (?P<cell>\$?[A-Za-z]{1,3}\$?\d+)
+      | (?P<name>[A-Za-z_][A-Za-z0-9_.]*)
+      | (?P<op><>|>=|<=|[-+*/^&=<>(),])
+    )''', re.VERBOSE)
+
+_CELL_RE = re.compile(r'\$?([A-Za-z]{1,3})\$?(\d+)')
+_COLUMN_RE = re.compile(r'\$?([A-Za-z]{1,3})')
+
+COMPARISON_OPS = ('=', '<>', '<', '>', '<=', '>=')
+
+
+def _tokenize(text):
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN_RE.match(text, position)
+        if not match or match.end() == position:
+            raise FormulaSyntaxError(f'Unexpected character at {position}: {text[position:]!r}')
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind)))
+        position = match.end()
+    return tokens
+
+
+def _parse_cell(text):
+    match = _CELL_RE.fullmatch(text)
+    return int(match.group(2)) - 1, column_index(match.group(1))
+
+
+def _parse_range(text):
+    start, end = text.split(':')
+    if _CELL_RE.fullmatch(start):
+        r1, c1 = _parse_cell(start)
+        r2, c2 = _parse_cell(end)
+        return ('range', min(r1, r2), min(c1, c2), max(r1, r2), max(c1, c2))
+    # Whole column such as A:A or C:G; None means "to the last row"
+    c1 = column_index(_COLUMN_RE.fullmatch(start).group(1))
+    c2 = column_index(_COLUMN_RE.fullmatch(end).group(1))
+    return ('range', 0, min(c1, c2), None, max(c1, c2))
+
+
+class _Parser:
+    """Recursive descent parser producing a small tuple-based AST"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def take(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def expect(self, value):
+        kind, text = self.take()
+        if text != value:
+            raise FormulaSyntaxError(f'Expected {value!r}')
+
+    def parse(self):
+        node = self.comparison()
+        if self.position != len(self.tokens):
+            raise FormulaSyntaxError(f'Unexpected {self.peek()[1]!r}')
+        return node
+
+    def comparison(self):
+        node = self.concat()
+        while self.peek()[0] == 'op' and self.peek()[1] in COMPARISON_OPS:
+            op = self.take()[1]
+            node = ('bin', op, node, self.concat())
+        return node
+
+    def concat(self):
+        node = self.additive()
+        while self.peek() == ('op', '&'):
+            self.take()
+            node = ('bin', '&', node, self.additive())
+        return node
+
+    def additive(self):
+        node = self.multiplicative()
+        while self.peek()[0] == 'op' and self.peek()[1] in '+-':
+            op = self.take()[1]
+            node = ('bin', op, node, self.multiplicative())
+        return node
+
+    def multiplicative(self):
+        node = self.power()
+        while self.peek()[0] == 'op' and self.peek()[1] in '*/':
+            op = self.take()[1]
+            node = ('bin', op, node, self.power())
+        return node
+
+    def power(self):
+        node = self.unary()
+        while self.peek() == ('op', '^'):
+            self.take()
+            node = ('bin', '^', node, self.unary())
+        return node
+
+    def unary(self):
+        if self.peek()[0] == 'op' and self.peek()[1] in '+-':
+            op = self.take()[1]
+            operand = self.unary()
+            return ('neg', operand) if op == '-' else operand
+        return self.primary()
+
+    def primary(self):
+        kind, text = self.take()
+        if kind == 'number':
+            return ('num', float(text))
+        if kind == 'string':
+            return ('str', text[1:-1].replace('""', '"'))
+        if kind == 'range':
+            return _parse_range(text)
+        if kind in ('cell', 'name') and self.peek() == ('op', '('):
+            return self.call(text.upper())
+        if kind == 'cell':
+            return ('cell',) + _parse_cell(text)
+        if kind == 'name':
+            upper = text.upper()
+            if upper in ('TRUE', 'FALSE'):
+                return ('bool', upper == 'TRUE')
+            return ('error', NAME)
+        if (kind, text) == ('op', '('):
+            node = self.comparison()
+            self.expect(')')
+            return node
+        raise FormulaSyntaxError(f'Unexpected {text!r}' if text else 'Unexpected end of formula')
+
+    def call(self, name):
+        self.expect('(')
+        args = []
+        if self.peek() != ('op', ')'):
+            args.append(self.comparison())
+            while self.peek() == ('op', ','):
+                self.take()
+                args.append(self.comparison())
+        self.expect(')')
+        return ('call', name, args)
+
+
+def parse_formula(formula):
+    """Parse a formula string (with or without the leading '=') into an AST"""
+    text = formula[1:] if formula.startswith('=') else formula
+    return _Parser(_tokenize(text)).parse()
+
+
+def collect_references(node, cells, ranges):
+    """Gather the single-cell and range references used by an AST"""
+    kind = node[0]
+    if kind == 'cell':
+        cells.add((node[1], node[2]))
+    elif kind == 'range':
+        ranges.add(node[1:])
+    elif kind == 'neg':
+        collect_references(node[1], cells, ranges)
+    elif kind == 'bin':
+        collect_references(node[2], cells, ranges)
+        collect_references(node[3], cells, ranges)
+    elif kind == 'call':
+        for arg in node[2]:
+            collect_references(arg, cells, ranges)
+
+
+# Cell readers ------------------------------------------------------------------
+
+class GridReader:
+    """Reads raw cell text from an in-memory grid (list of rows)"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def num_rows(self):
+        return len(self.rows)
+
+    def get(self, row, col):
+        if 0 <= row < len(self.rows):
+            cells = self.rows[row]
+            if 0 <= col < len(cells):
+                return cells[col]
+        return None
+
+    def iter_rows(self, start=0, stop=None):
+        yield from self.rows[start:stop]
+
+
+class SheetCellReader:
+    """Reads raw cell text from a Sheet, loading and caching one chunk at a time"""
+
+    def __init__(self, sheet, max_chunks=64):
+        self.sheet = sheet
+        self.chunk_size = sheet.chunk_size
+        self.max_chunks = max_chunks
+        self.chunks = {}
+
+    def num_rows(self):
+        return self.sheet.num_rows()
+
+    def _chunk(self, index):
+        rows = self.chunks.get(index)
+        if rows is None:
+            if len(self.chunks) >= self.max_chunks:
+                self.chunks.pop(next(iter(self.chunks)))
+            start = index * self.chunk_size
+            rows = self.sheet.get_rows(start, start + self.chunk_size)
+            self.chunks[index] = rows
+        return rows
+
+    def get(self, row, col):
+        if row < 0 or row >= self.num_rows():
+            return None
+        cells = self._chunk(row // self.chunk_size)[row % self.chunk_size]
+        return cells[col] if 0 <= col < len(cells) else None
+
+    def iter_rows(self, start=0, stop=None):
+        total = self.num_rows()
+        stop = total if stop is None else min(stop, total)
+        for row in range(start, stop):
+            yield self._chunk(row // self.chunk_size)[row % self.chunk_size]
+
+
+# Column cache ------------------------------------------------------------------
+
+class ColumnCache:
+    """
+    Numeric copies of sheet columns for vectorized range aggregation
+
+    Each column is parsed once into a float64 array with a validity mask
+    marking the cells that hold numbers. Formula cells are left out of the
+    mask; the engine adds their computed values on top, so the cache stays
+    valid while formulas are recalculated and only has to be dropped when a
+    column's raw content changes.
+
+    Args:
+        reader: Object with iter_rows() for raw cell text
+        columns: Columns parsed earlier from the same grid (the `columns`
+            attribute of another cache), e.g. kept between requests
+    """
+
+    def __init__(self, reader, columns=None):
+        self.reader = reader
+        self.columns = dict(columns or {})  # col -> (numbers, valid, error rows, errors)
+        self._stats = {}   # (col, r1, r2) -> result of stats()
+
+    def invalidate(self, col):
+        if self.columns.pop(col, None) is not None:
+            self._stats = {key: value for key, value in self._stats.items() if key[0] != col}
+
+    def load(self, cols):
+        """Parse the given columns that are not cached yet, in a single pass over the rows"""
+        missing = [col for col in cols if col not in self.columns]
+        if not missing:
+            return
+
+        numbers = {col: [] for col in missing}
+        valid = {col: [] for col in missing}
+        errors = {col: ([], []) for col in missing}
+        for row_index, row in enumerate(self.reader.iter_rows()):
+            for col in missing:
+                value = parse_literal(row[col]) if col < len(row) else None
+                is_number = isinstance(value, float)
+                numbers[col].append(value if is_number else 0.0)
+                valid[col].append(is_number)
+                if isinstance(value, CellError):
+                    errors[col][0].append(row_index)
+                    errors[col][1].append(value)
+
+        # Imported on first use; most requests never evaluate a range aggregate
+        import numpy as np
+        for col in missing:
+            self.columns[col] = (
+                np.array(numbers[col], dtype=np.float64),
+                np.array(valid[col], dtype=bool),
+                errors[col][0],
+                errors[col][1],
+            )
+
+    def stats(self, col, r1, r2):
+        """
+        Aggregate the literal numbers of rows r1..r2 (inclusive) in a loaded column
+
+        Returns:
+            RangeStats, or (row, CellError) for the first error literal in the range
+        """
+        # Many formulas usually share a range (e.g. =A2/SUM(A:A) down a column)
+        key = (col, r1, r2)
+        result = self._stats.get(key)
+        if result is None:
+            result = self._stats[key] = self._compute_stats(col, r1, r2)
+        return result
+
+    def _compute_stats(self, col, r1, r2):
+        numbers, valid, error_rows, errors = self.columns[col]
+        position = bisect_left(error_rows, r1)
+        if position < len(error_rows) and error_rows[position] <= r2:
+            return error_rows[position], errors[position]
+
+        selected = numbers[r1:r2 + 1][valid[r1:r2 + 1]]
+        if not selected.size:
+            return RangeStats()
+        return RangeStats(float(selected.sum()), selected.size,
+                          float(selected.min()), float(selected.max()))
+
+
+class RangeStats:
+    """Running sum, count, minimum and maximum of the numbers in an aggregate"""
+
+    __slots__ = ('total', 'count', 'minimum', 'maximum')
+
+    def __init__(self, total=0.0, count=0, minimum=None, maximum=None):
+        self.total = total
+        self.count = count
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def add(self, number):
+        self.merge(RangeStats(number, 1, number, number))
+
+    def merge(self, other):
+        if not other.count:
+            return
+        self.total += other.total
+        self.minimum = other.minimum if not self.count else min(self.minimum, other.minimum)
+        self.maximum = other.maximum if not self.count else max(self.maximum, other.maximum)
+        self.count += other.count
+
+
+# Engine ------------------------------------------------------------------------
+
+class FormulaEngine:
+    """
+    Holds the formulas of one sheet, their dependency graph and computed values
+
+    Args:
+        reader: Object with get(row, col), num_rows() and iter_rows() for raw cell text
+        columns: Parsed columns to start the ColumnCache with
+    """
+
+    def __init__(self, reader, columns=None):
+        self.reader = reader
+        self.formulas = {}        # (row, col) -> formula text
+        self.compiled = {}        # (row, col) -> AST or CellError
+        self.references = {}      # (row, col) -> (cells, ranges)
+        self.values = {}          # (row, col) -> computed value
+        self._cell_dependents = {}
+        self._range_buckets = {}  # (col, bucket) -> set of (r1, r2, formula cell)
+        self._column_ranges = {}  # col -> set of (r1, formula cell) for open-ended ranges
+        self._formula_rows = {}   # col -> sorted rows holding formulas
+        self.columns = ColumnCache(reader, columns)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build an engine for an in-memory grid"""
+        return cls.scan(GridReader(rows))
+
+    @classmethod
+    def scan(cls, reader):
+        """Build an engine by scanning every cell the reader provides for formulas"""
+        engine = cls(reader)
+        for row_index, row in enumerate(reader.iter_rows()):
+            for col_index, raw in enumerate(row):
+                if is_formula(raw):
+                    engine._register(row_index, col_index, raw)
+        return engine
+
+    @classmethod
+    def from_cache(cls, reader, formulas, values, columns=None, typed=None):
+        """
+        Rebuild an engine from a stored formula index and cached results
+
+        Args:
+            formulas, values, typed: Dicts returned by to_cache()
+            columns: Parsed columns to start the ColumnCache with
+        """
+        engine = cls(reader, columns)
+        for key, formula in (formulas or {}).items():
+            engine._register(*_split_key(key), formula)
+        for key, display in (values or {}).items():
+            engine.values[_split_key(key)] = parse_literal(display)
+        for key, value in (typed or {}).items():
+            engine.values[_split_key(key)] = value
+        return engine
+
+    def to_cache(self):
+        """
+        Return (formulas, values, typed) dicts keyed by 'row:col' for storage
+
+        values holds the display text of every formula result. typed holds the
+        results that text would read back as something else (TRUE, the text
+        "007", floats rounded for display), so from_cache() restores them as
+        computed rather than as parse_literal() reads them.
+        """
+        formulas = {}
+        values = {}
+        typed = {}
+        for cell, text in self.formulas.items():
+            key = _join_key(cell)
+            value = self.values.get(cell)
+            display = format_value(value)
+            formulas[key] = text
+            values[key] = display
+            if not _reads_back(display, value):
+                typed[key] = value
+        return formulas, values, typed
+
+    def display_value(self, row, col):
+        return format_value(self.values.get((row, col)))
+
+    # Graph maintenance
+
+    def update_cell(self, row, col, raw):
+        """Record that a cell's raw content changed; call recalculate() afterwards"""
+        cell = (row, col)
+        self.columns.invalidate(col)
+        if cell in self.formulas:
+            if self.formulas[cell] == raw:
+                return
+            self._unregister(cell)
+        if is_formula(raw):
+            self._register(row, col, raw)
+
+    def _register(self, row, col, formula):
+        cell = (row, col)
+        self.formulas[cell] = formula
+        insort(self._formula_rows.setdefault(col, []), row)
+
+        try:
+            node = parse_formula(formula)
+        except FormulaSyntaxError:
+            self.compiled[cell] = SYNTAX
+            self.references[cell] = (set(), set())
+            return
+
+        cells, ranges = set(), set()
+        collect_references(node, cells, ranges)
+        self.compiled[cell] = node
+        self.references[cell] = (cells, ranges)
+
+        for ref in cells:
+            self._cell_dependents.setdefault(ref, set()).add(cell)
+        for r1, c1, r2, c2 in ranges:
+            for c in range(c1, c2 + 1):
+                if r2 is None:
+                    self._column_ranges.setdefault(c, set()).add((r1, cell))
+                    continue
+                for bucket in range(r1 // RANGE_BUCKET_ROWS, r2 // RANGE_BUCKET_ROWS + 1):
+                    self._range_buckets.setdefault((c, bucket), set()).add((r1, r2, cell))
+
+    def _unregister(self, cell):
+        row, col = cell
+        del self.formulas[cell]
+        del self.compiled[cell]
+        self.values.pop(cell, None)
+        rows = self._formula_rows[col]
+        rows.pop(bisect_left(rows, row))
+
+        cells, ranges = self.references.pop(cell)
+        for ref in cells:
+            self._cell_dependents[ref].discard(cell)
+        for r1, c1, r2, c2 in ranges:
+            for c in range(c1, c2 + 1):
+                if r2 is None:
+                    self._column_ranges[c].discard((r1, cell))
+                    continue
+                for bucket in range(r1 // RANGE_BUCKET_ROWS, r2 // RANGE_BUCKET_ROWS + 1):
+                    self._range_buckets[(c, bucket)].discard((r1, r2, cell))
+
+    def dependents(self, cell):
+        """Formula cells that reference `cell` directly or through a range"""
+        row, col = cell
+        found = set(self._cell_dependents.get(cell, ()))
+        for r1, r2, formula_cell in self._range_buckets.get((col, row // RANGE_BUCKET_ROWS), ()):
+            if r1 <= row <= r2:
+                found.add(formula_cell)
+        for r1, formula_cell in self._column_ranges.get(col, ()):
+            if row >= r1:
+                found.add(formula_cell)
+        return found
+
+    def _precedent_formulas(self, cell, candidates):
+        """Formula cells in `candidates` that `cell` reads from"""
+        cells, ranges = self.references.get(cell, ((), ()))
+        for ref in cells:
+            if ref in candidates:
+                yield ref
+        for r1, c1, r2, c2 in ranges:
+            for c in range(c1, c2 + 1):
+                rows = self._formula_rows.get(c, [])
+                lo = bisect_left(rows, r1)
+                hi = len(rows) if r2 is None else bisect_right(rows, r2)
+                for r in rows[lo:hi]:
+                    if (r, c) in candidates:
+                        yield (r, c)
+
+    # Recalculation
+
+    def recalculate(self, changed=None):
+        """
+        Recompute formulas and return the cells whose value changed
+
+        Args:
+            changed: Iterable of (row, col) cells that were edited. When omitted
+                every formula is recomputed.
+        """
+        if changed is None:
+            dirty = set(self.formulas)
+        else:
+            dirty = set()
+            queue = [cell for cell in changed]
+            dirty.update(cell for cell in queue if cell in self.formulas)
+            while queue:
+                for dependent in self.dependents(queue.pop()):
+                    if dependent not in dirty:
+                        dirty.add(dependent)
+                        queue.append(dependent)
+
+        order, cyclic = self._evaluation_order(dirty)
+        updated = {}
+        for cell in order:
+            value = CIRC if cell in cyclic else self._evaluate_cell(cell)
+            if self.values.get(cell) != value or cell not in self.values:
+                updated[cell] = value
+            self.values[cell] = value
+        return updated
+
+    def _evaluation_order(self, dirty):
+        """
+        Order dirty formulas so every formula comes after the ones it reads
+
+        The strongly connected components of the dependency graph are found
+        with Tarjan's algorithm, which finishes each component after every
+        component it reads from. All cells of a component with more than one
+        cell, or of a cell that reads itself, are part of a cycle.
+
+        Returns:
+            (order, cyclic) where cyclic is the set of cells in a cycle
+        """
+        order = []
+        cyclic = set()
+        index = {}      # cell -> DFS discovery number
+        lowlink = {}    # cell -> lowest discovery number reachable on the component stack
+        components = []
+        on_components = set()
+        self_loops = set()
+
+        def visit(cell):
+            index[cell] = lowlink[cell] = len(index)
+            components.append(cell)
+            on_components.add(cell)
+            return cell, self._precedent_formulas(cell, dirty)
+
+        for root in dirty:
+            if root in index:
+                continue
+            stack = [visit(root)]
+            while stack:
+                cell, precedents = stack[-1]
+                for precedent in precedents:
+                    if precedent not in index:
+                        stack.append(visit(precedent))
+                        break
+                    if precedent in on_components:
+                        lowlink[cell] = min(lowlink[cell], index[precedent])
+                        if precedent == cell:
+                            self_loops.add(cell)
+                else:
+                    stack.pop()
+                    if stack:
+                        parent = stack[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[cell])
+                    if lowlink[cell] != index[cell]:
+                        continue
+
+                    # cell is the root of a component: everything above it on the stack
+                    position = len(components) - 1
+                    while components[position] != cell:
+                        position -= 1
+                    component = components[position:]
+                    del components[position:]
+                    on_components.difference_update(component)
+                    if len(component) > 1 or cell in self_loops:
+                        cyclic.update(component)
+                    order.extend(component)
+        return order, cyclic
+
+    def _evaluate_cell(self, cell):
+        node = self.compiled[cell]
+        if isinstance(node, CellError):
+            return node
+        try:
+            value = self._eval(node)
+        except ZeroDivisionError:
+            return DIV0
+        except (OverflowError, ValueError):
+            return NUM
+        if isinstance(value, list):
+            # A bare range evaluates to its first cell
+            value = value[0] if value else None
+        return value
+
+    def cell_value(self, row, col):
+        """Value of a cell: computed for formulas, parsed from the grid otherwise"""
+        cell = (row, col)
+        if cell in self.formulas:
+            return self.values.get(cell)
+        return parse_literal(self.reader.get(row, col))
+
+    def range_values(self, r1, c1, r2, c2):
+        """Values of a rectangular range in row-major order"""
+        if r2 is None:
+            r2 = self.reader.num_rows() - 1
+        values = []
+        for offset, row in enumerate(self.reader.iter_rows(r1, r2 + 1)):
+            row_index = r1 + offset
+            for col in range(c1, c2 + 1):
+                if (row_index, col) in self.formulas:
+                    values.append(self.values.get((row_index, col)))
+                else:
+                    values.append(parse_literal(row[col]) if col < len(row) else None)
+        return values
+
+    def range_stats(self, r1, c1, r2, c2):
+        """
+        Aggregate the numbers in a range, skipping text, blanks and logical values
+
+        Literal cells are reduced with NumPy from the column cache; only the
+        formula cells inside the range are visited one by one.
+
+        Returns:
+            RangeStats, or the first CellError in the range (row-major order)
+        """
+        if r2 is None:
+            r2 = self.reader.num_rows() - 1
+        stats = RangeStats()
+        if r2 < r1:
+            return stats
+
+        self.columns.load(range(c1, c2 + 1))
+        first_error = None
+        for col in range(c1, c2 + 1):
+            column_stats = self.columns.stats(col, r1, r2)
+            if isinstance(column_stats, tuple):
+                position = column_stats[0], col
+                if first_error is None or position < first_error[0]:
+                    first_error = (position, column_stats[1])
+            else:
+                stats.merge(column_stats)
+
+            rows = self._formula_rows.get(col, [])
+            for row in rows[bisect_left(rows, r1):bisect_right(rows, r2)]:
+                value = self.values.get((row, col))
+                if isinstance(value, CellError):
+                    if first_error is None or (row, col) < first_error[0]:
+                        first_error = ((row, col), value)
+                    break
+                if isinstance(value, float):
+                    stats.add(value)
+
+        return first_error[1] if first_error else stats
+
+    def _eval(self, node):
+        kind = node[0]
+        if kind in ('num', 'str', 'bool'):
+            return node[1]
+        if kind == 'error':
+            return node[1]
+        if kind == 'cell':
+            return self.cell_value(node[1], node[2])
+        if kind == 'range':
+            return self.range_values(*node[1:])
+        if kind == 'neg':
+            value = _to_number(self._eval(node[1]))
+            return value if isinstance(value, CellError) else -value
+        if kind == 'bin':
+            return self._binary(node[1], self._eval(node[2]), self._eval(node[3]))
+        if kind == 'call':
+            return self._call(node[1], node[2])
+        raise FormulaSyntaxError(f'Unknown node {kind}')
+
+    def _binary(self, op, left, right):
+        if isinstance(left, list) or isinstance(right, list):
+            return VALUE
+        if isinstance(left, CellError):
+            return left
+        if isinstance(right, CellError):
+            return right
+
+        if op == '&':
+            return format_value(left) + format_value(right)
+        if op in COMPARISON_OPS:
+            return _compare(op, left, right)
+
+        left, right = _to_number(left), _to_number(right)
+        if isinstance(left, CellError):
+            return left
+        if isinstance(right, CellError):
+            return right
+        if op == '+':
+            return left + right
+        if op == '-':
+            return left - right
+        if op == '*':
+            return left * right
+        if op == '/':
+            return DIV0 if right == 0 else left / right
+        if op == '^':
+            result = left ** right
+            return NUM if isinstance(result, complex) else float(result)
+        return VALUE
+
+    def _call(self, name, args):
+        if name == 'IF':
+            if len(args) not in (2, 3):
+                return VALUE
+            condition = _to_bool(self._eval(args[0]))
+            if isinstance(condition, CellError):
+                return condition
+            if condition:
+                return self._eval(args[1])
+            return self._eval(args[2]) if len(args) == 3 else False
+
+        function = AGGREGATES.get(name)
+        if function is None:
+            return NAME
+        stats = self._aggregate_numbers(args)
+        return stats if isinstance(stats, CellError) else function(stats)
+
+    def _aggregate_numbers(self, args):
+        """Numbers from the arguments: ranges skip text and blanks, scalars are coerced"""
+        stats = RangeStats()
+        for arg in args:
+            if arg[0] == 'range':
+                range_stats = self.range_stats(*arg[1:])
+                if isinstance(range_stats, CellError):
+                    return range_stats
+                stats.merge(range_stats)
+                continue
+            number = _to_number(self._eval(arg))
+            if isinstance(number, CellError):
+                return number
+            stats.add(number)
+        return stats
+
+
+def _sum(stats):
+    return float(stats.total)
+
+
+def _average(stats):
+    return stats.total / stats.count if stats.count else DIV0
+
+
+def _min(stats):
+    return stats.minimum if stats.count else 0.0
+
+
+def _max(stats):
+    return stats.maximum if stats.count else 0.0
+
+
+def _count(stats):
+    return float(stats.count)
+
+
+AGGREGATES = {
+    'SUM': _sum,
+    'AVERAGE': _average,
+    'MIN': _min,
+    'MAX': _max,
+    'COUNT': _count,
+}
+
+
+def _to_number(value):
+    if isinstance(value, CellError):
+        return value
+    if value is None:
+        return 0.0
+    if isinstance(value, bool):
+        return 1.0 if value else 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    parsed = parse_literal(value)
+    if parsed is None:
+        return 0.0
+    return parsed if isinstance(parsed, float) else VALUE
+
+
+def _to_bool(value):
+    if isinstance(value, CellError):
+        return value
+    if isinstance(value, str):
+        upper = value.strip().upper()
+        if upper in ('TRUE', 'FALSE'):
+            return upper == 'TRUE'
+    number = _to_number(value)
+    return number if isinstance(number, CellError) else number != 0
+
+
+def _compare(op, left, right):
+    a, b = _sort_key(left), _sort_key(right)
+    if op == '=':
+        return a == b
+    if op == '<>':
+        return a != b
+    if op == '<':
+        return a < b
+    if op == '>':
+        return a > b
+    if op == '<=':
+        return a <= b
+    return a >= b
+
+
+def _sort_key(value):
+    # Excel orders numbers before text and text before logical values
+    if value is None:
+        return (0, 0.0)
+    if isinstance(value, bool):
+        return (2, value)
+    if isinstance(value, (int, float)):
+        return (0, float(value))
+    return (1, str(value).lower())
+
+
+def _reads_back(display, value):
+    """Whether parse_literal(display) gives back value, or value cannot be stored as JSON anyway"""
+    if isinstance(value, float) and not math.isfinite(value):
+        return True
+    parsed = parse_literal(display)
+    return parsed == value and type(parsed) is type(value)
+
+
+def _split_key(key):
+    row, col = key.split(':')
+    return int(row), int(col)
+
+
+def _join_key(cell):
+    return f'{cell[0]}:{cell[1]}'
@@ -0,0 +1,66 @@
+"""
+Gunicorn settings for Excel Generator.
+Gunicorn loads this file from the working directory, so the Procfile needs
+no extra flags. By default each worker process serves several requests at
+once on threads (gthread): a request waiting on the remote MySQL server or
+writing an export file only holds its own thread, not the whole worker.
+Everything can be overridden with the environment variables below or with
+gunicorn's own command line flags.
+"""
+import gc
+import multiprocessing
+import os
+
+cores = multiprocessing.cpu_count()
+
+# 'gthread' (default), 'sync', or 'gevent' (needs `pip install gevent`). Under gevent
+# password hashing and export rendering run on greenlets and block the other
+# requests of their worker while they use the CPU, so gthread is the better fit
+# unless the load is almost entirely waiting on the database.
+worker_class = os.environ.get('WEB_WORKER_CLASS', 'gthread')
+
+# Each worker holds its own copy of the app and its caches, so
+# the usual 2 x cores + 1 is capped by WEB_MAX_WORKERS on small containers
+workers = int(os.environ.get('WEB_CONCURRENCY') or min(2 * cores + 1, int(os.environ.get('WEB_MAX_WORKERS', '4'))))
+
+# Requests served at once per gthread worker; sync workers always serve one
+threads = int(os.environ.get('WEB_THREADS', '8')) if worker_class == 'gthread' else 1
+
+# Open connections per gevent worker
+worker_connections = int(os.environ.get('WEB_WORKER_CONNECTIONS', '1000'))
+
+# Give every thread a pooled database connection; the pool size is read by
+# config.py when the workers import the app. MySQL must allow
+# workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections. Under gevent the pool
+# is what limits how many requests query the database at once.
+if worker_class == 'gthread':
+    os.environ.setdefault('DB_POOL_SIZE', str(threads))
+
+# Browsers reuse connections between the editor's frequent JSON calls
+keepalive = int(os.environ.get('WEB_KEEPALIVE', '5'))
+
+timeout = int(os.environ.get('WEB_TIMEOUT', '30'))
+graceful_timeout = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', '30'))
+
+# Import the app once in the master and fork the workers from it: they start
+# without importing anything and share the master's memory copy-on-write. Off by
+# default under gevent, which has to patch the standard library before the app
+# is imported, and that only happens in the workers.
+preload_app = os.environ.get('WEB_PRELOAD', 'false' if worker_class == 'gevent' else 'true').lower() in ('1', 'true', 'yes')
+
+
+def when_ready(server):
+    """Fill the preloaded app's read-only caches once, before any worker is forked"""
+    if server.cfg.preload_app:
+        import app_updated
+        app_updated.warm_caches(server.app.wsgi())
+        # Keep the collector in the workers from touching (and so copying) the
+        # pages of everything loaded so far
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    """Give each worker forked from a preloaded app its own database connections"""
+    if server.cfg.preload_app:
+        import app_updated
+        app_updated.after_fork(server.app.wsgi())
@@ -5,13 +5,15 @@ from datetime import datetime
 # Include the current directory in the path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app_updated import app, db, User, Sheet
+from app_updated import create_app, db, upgrade_schema, User, Sheet
+
+app = create_app()
 
 def init_db():
     """Initialize the database with tables and sample data"""
     with app.app_context():
-        # Create tables
-        db.create_all()
+        # Create or migrate tables
+        upgrade_schema()
         
         # Check if we already have users
         if User.query.count() > 0:
@@ -65,7 +67,7 @@ def reset_db():
     """Delete and recreate all tables"""
     with app.app_context():
         db.drop_all()
-        db.create_all()
+        upgrade_schema()
         print("Database has been reset!")
 
 if __name__ == '__main__':
@@ -76,9 +78,11 @@ if __name__ == '__main__':
                 reset_db()
             else:
                 print("Operation cancelled.")
-        elif sys.argv[1] == 'init-only':
+        elif sys.argv[1] in ('init-only', 'upgrade'):
             with app.app_context():
-                db.create_all()
-                print("Tables created (no sample data added)")
+                if upgrade_schema() == 'created':
+                    print("Tables created (no sample data added)")
+                else:
+                    print("Migrations applied")
     else:
         init_db()
\ No newline at end of file
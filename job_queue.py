@@ -0,0 +1,179 @@
+"""
+Background jobs for Excel Generator.
+Long-running work such as large exports and file imports is done by a small
+thread pool instead of the request handler. Job state lives in a SQLite
+file, so any worker process can answer a status poll no matter which one
+runs the job.
+"""
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS job (
+    id TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    sheet_id INTEGER NOT NULL,
+    format TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    file_path TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_job_status ON job (status, created_at);
+"""
+
+
+class JobQueue:
+    """
+    SQLite-backed queue of sheet jobs drained by a local thread pool
+
+    Args:
+        db_path: Path of the SQLite file holding job state
+        run_job: Callable(job, report_progress) that does the work and
+            returns the job's result file path (or None). report_progress(done,
+            total) may be called while it runs.
+        workers: Number of worker threads in this process
+        stale_after: Seconds without progress after which a running job is
+            reported as failed (e.g. its worker process was restarted)
+        keep_for: Seconds finished jobs are kept before being purged
+    """
+
+    def __init__(self, db_path, run_job, workers=2, stale_after=600, keep_for=86400):
+        self.db_path = db_path
+        self.run_job = run_job
+        self.workers = workers
+        self.stale_after = stale_after
+        self.keep_for = keep_for
+        self._executor = None
+        self._lock = threading.Lock()
+        self._schema_ready = False
+
+    def enqueue(self, user_id, sheet_id, format_type, file_path=None, finished=False):
+        """
+        Add a job and wake a worker
+
+        Args:
+            user_id: Owner of the job
+            sheet_id: Sheet the job works on
+            format_type: File format (xlsx, csv or pdf)
+            file_path: File the job reads or, for finished jobs, its result
+            finished: Create the job as done (e.g. an export cache hit), so
+                no worker is needed
+
+        Returns:
+            The new job id
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        status = DONE if finished else QUEUED
+        with self._connect() as conn:
+            conn.execute('DELETE FROM job WHERE updated_at < ?', (now - self.keep_for,))
+            conn.execute(
+                'INSERT INTO job (id, user_id, sheet_id, format, status, file_path, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (job_id, user_id, sheet_id, format_type, status, file_path, now, now)
+            )
+        if status == QUEUED:
+            self._get_executor().submit(self._drain)
+        return job_id
+
+    def get(self, job_id, user_id):
+        """Return the job as a dict if it belongs to the user, else None"""
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT * FROM job WHERE id = ? AND user_id = ?', (job_id, user_id)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        if job['status'] in (QUEUED, RUNNING) and time.time() - job['updated_at'] > self.stale_after:
+            job['status'] = FAILED
+            job['error'] = 'Export was interrupted, please try again'
+        return job
+
+    def _drain(self):
+        """Run queued jobs until none are left"""
+        while True:
+            job = self._claim()
+            if job is None:
+                return
+
+            def report_progress(done, total, job_id=job['id']):
+                self._update(job_id, progress=done, total=total)
+
+            try:
+                file_path = self.run_job(job, report_progress)
+            except Exception as e:
+                self._update(job['id'], status=FAILED, error=str(e) or e.__class__.__name__)
+            else:
+                self._update(job['id'], status=DONE, file_path=file_path or job['file_path'])
+
+    def _claim(self):
+        """Atomically move the oldest queued job to running"""
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                'SELECT * FROM job WHERE status = ? ORDER BY created_at LIMIT 1', (QUEUED,)
+            ).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return None
+            conn.execute(
+                'UPDATE job SET status = ?, updated_at = ? WHERE id = ?',
+                (RUNNING, time.time(), row['id'])
+            )
+            conn.execute('COMMIT')
+        return dict(row)
+
+    def _update(self, job_id, **fields):
+        fields['updated_at'] = time.time()
+        assignments = ', '.join(f'{name} = ?' for name in fields)
+        with self._connect() as conn:
+            conn.execute(f'UPDATE job SET {assignments} WHERE id = ?', (*fields.values(), job_id))
+
+    def _get_executor(self):
+        # Created on first use so each forked server worker gets its own threads
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix='sheet-job')
+            return self._executor
+
+    def _connect(self):
+        if not self._schema_ready:
+            with _Connection(self.db_path) as conn:
+                conn.executescript(_SCHEMA)
+            self._schema_ready = True
+        return _Connection(self.db_path)
+
+
+class _Connection:
+    """Short-lived SQLite connection in autocommit mode, closed on exit"""
+
+    def __init__(self, db_path):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and self.conn.in_transaction:
+            self.conn.execute('ROLLBACK')
+        self.conn.close()
@@ -0,0 +1,32 @@
+"""Add (user_id, created_at) indexes for history listings
+
+Revision ID: 0b7e4c1a9d52
+Revises: f3a8d6c2b947
+Create Date: 2026-10-18 15:21:40.772913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b7e4c1a9d52'
+down_revision = 'f3a8d6c2b947'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('sheet', schema=None) as batch_op:
+        batch_op.create_index('ix_sheet_user_id_created_at', ['user_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('download_history', schema=None) as batch_op:
+        batch_op.create_index('ix_download_history_user_id_created_at', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('download_history', schema=None) as batch_op:
+        batch_op.drop_index('ix_download_history_user_id_created_at')
+
+    with op.batch_alter_table('sheet', schema=None) as batch_op:
+        batch_op.drop_index('ix_sheet_user_id_created_at')
@@ -0,0 +1,27 @@
+"""Add typed_values to Sheet model
+
+Revision ID: 3e7b9d1f5c26
+Revises: b6d1e8f4a273
+Create Date: 2026-10-18 16:48:21.553907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3e7b9d1f5c26'
+down_revision = 'b6d1e8f4a273'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Left NULL for existing sheets; their formula cache is rebuilt on the next save
+    with op.batch_alter_table('sheet', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('typed_values', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('sheet', schema=None) as batch_op:
+        batch_op.drop_column('typed_values')
@@ -0,0 +1,57 @@
+"""Add unique (user_id, sheet_name) index to sheet
+
+Revision ID: 7d3f9a2e6b15
+Revises: 0b7e4c1a9d52
+Create Date: 2026-10-18 15:58:12.093366
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d3f9a2e6b15'
+down_revision = '0b7e4c1a9d52'
+branch_labels = None
+depends_on = None
+
+sheet_table = sa.table(
+    'sheet',
+    sa.column('id', sa.Integer),
+    sa.column('user_id', sa.Integer),
+    sa.column('sheet_name', sa.String),
+)
+
+
+def upgrade():
+    # Older rows may share a name; keep the first and number the others
+    bind = op.get_bind()
+    duplicates = bind.execute(
+        sa.select(sheet_table.c.user_id, sheet_table.c.sheet_name)
+        .group_by(sheet_table.c.user_id, sheet_table.c.sheet_name)
+        .having(sa.func.count() > 1)
+    ).fetchall()
+    for user_id, sheet_name in duplicates:
+        taken = {name for (name,) in bind.execute(
+            sa.select(sheet_table.c.sheet_name).where(sheet_table.c.user_id == user_id)
+        )}
+        ids = [row_id for (row_id,) in bind.execute(
+            sa.select(sheet_table.c.id)
+            .where(sheet_table.c.user_id == user_id, sheet_table.c.sheet_name == sheet_name)
+            .order_by(sheet_table.c.id)
+        )]
+        number = 2
+        for row_id in ids[1:]:
+            while f'{sheet_name} ({number})'[:100] in taken:
+                number += 1
+            new_name = f'{sheet_name} ({number})'[:100]
+            taken.add(new_name)
+            bind.execute(sheet_table.update().where(sheet_table.c.id == row_id).values(sheet_name=new_name))
+
+    with op.batch_alter_table('sheet', schema=None) as batch_op:
+        batch_op.create_index('ix_sheet_user_id_sheet_name', ['user_id', 'sheet_name'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('sheet', schema=None) as batch_op:
+        batch_op.drop_index('ix_sheet_user_id_sheet_name')
@@ -0,0 +1,56 @@
+"""Store sheet chunks column-oriented and compressed
+
+Revision ID: 9c2e4f7a1d38
+Revises: 7d3f9a2e6b15
+Create Date: 2026-10-18 16:41:27.550912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+from sheet_codec import unpack_rows
+
+
+# revision identifiers, used by Alembic.
+revision = '9c2e4f7a1d38'
+down_revision = '7d3f9a2e6b15'
+branch_labels = None
+depends_on = None
+
+chunk_table = sa.table(
+    'sheet_chunk',
+    sa.column('sheet_id', sa.Integer),
+    sa.column('chunk_index', sa.Integer),
+    sa.column('rows', sa.JSON),
+    sa.column('packed', sa.LargeBinary),
+)
+
+
+def upgrade():
+    # Existing chunks stay plain JSON and are read as such; they are packed when next written
+    with op.batch_alter_table('sheet_chunk', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('packed', sa.LargeBinary().with_variant(mysql.LONGBLOB(), 'mysql'),
+                                      nullable=True))
+        batch_op.alter_column('rows',
+               existing_type=sa.JSON(),
+               nullable=True)
+
+
+def downgrade():
+    # Unpack compressed chunks back into the JSON column before dropping it
+    bind = op.get_bind()
+    packed = bind.execute(
+        sa.select(chunk_table.c.sheet_id, chunk_table.c.chunk_index)
+        .where(chunk_table.c.packed.isnot(None))
+    ).fetchall()
+    for sheet_id, chunk_index in packed:
+        where = (chunk_table.c.sheet_id == sheet_id) & (chunk_table.c.chunk_index == chunk_index)
+        blob = bind.execute(sa.select(chunk_table.c.packed).where(where)).scalar()
+        bind.execute(chunk_table.update().where(where).values(rows=unpack_rows(blob), packed=None))
+
+    with op.batch_alter_table('sheet_chunk', schema=None) as batch_op:
+        batch_op.alter_column('rows',
+               existing_type=sa.JSON(),
+               nullable=False)
+        batch_op.drop_column('packed')
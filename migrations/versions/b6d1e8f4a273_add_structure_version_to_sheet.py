@@ -0,0 +1,29 @@
+"""Add structure_version to Sheet model
+
+Revision ID: b6d1e8f4a273
+Revises: 9c2e4f7a1d38
+Create Date: 2026-10-18 14:12:40.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6d1e8f4a273'
+down_revision = '9c2e4f7a1d38'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('sheet', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('structure_version', sa.Integer(), nullable=False, server_default='1'))
+
+    # Nothing is known about earlier saves, so treat the current version as the last structural one
+    op.execute('UPDATE sheet SET structure_version = version')
+
+
+def downgrade():
+    with op.batch_alter_table('sheet', schema=None) as batch_op:
+        batch_op.drop_column('structure_version')
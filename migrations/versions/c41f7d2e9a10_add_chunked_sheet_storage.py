@@ -0,0 +1,119 @@
+"""Add chunked sheet storage
+
+Revision ID: c41f7d2e9a10
+Revises: 5ba8c28af60b
+Create Date: 2026-10-18 09:12:44.318205
+
+"""
+import hashlib
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41f7d2e9a10'
+down_revision = '5ba8c28af60b'
+branch_labels = None
+depends_on = None
+
+CHUNK_ROWS = 500
+
+sheet_table = sa.table(
+    'sheet',
+    sa.column('id', sa.Integer),
+    sa.column('data', sa.JSON),
+    sa.column('storage', sa.String),
+    sa.column('row_count', sa.Integer),
+    sa.column('chunk_size', sa.Integer),
+)
+
+chunk_table = sa.table(
+    'sheet_chunk',
+    sa.column('sheet_id', sa.Integer),
+    sa.column('chunk_index', sa.Integer),
+    sa.column('rows', sa.JSON),
+    sa.column('checksum', sa.String),
+)
+
+
+def chunk_checksum(rows):
+    # Must match app_updated.chunk_checksum
+    payload = json.dumps(rows, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def upgrade():
+    op.create_table(
+        'sheet_chunk',
+        sa.Column('sheet_id', sa.Integer(), nullable=False),
+        sa.Column('chunk_index', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('rows', sa.JSON(), nullable=False),
+        sa.Column('checksum', sa.String(length=40), nullable=False),
+        sa.ForeignKeyConstraint(['sheet_id'], ['sheet.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('sheet_id', 'chunk_index')
+    )
+
+    with op.batch_alter_table('sheet', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('storage', sa.String(length=20), nullable=False, server_default='blob'))
+        batch_op.add_column(sa.Column('row_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('chunk_size', sa.Integer(), nullable=False, server_default=str(CHUNK_ROWS)))
+        batch_op.alter_column('data',
+               existing_type=sa.JSON(),
+               nullable=True)
+
+    # Convert existing blobs one sheet at a time so memory stays bounded by the largest sheet
+    bind = op.get_bind()
+    sheet_ids = [row.id for row in bind.execute(sa.select(sheet_table.c.id))]
+    for sheet_id in sheet_ids:
+        data = bind.execute(
+            sa.select(sheet_table.c.data).where(sheet_table.c.id == sheet_id)
+        ).scalar() or []
+
+        chunks = []
+        for offset in range(0, len(data), CHUNK_ROWS):
+            rows = data[offset:offset + CHUNK_ROWS]
+            chunks.append({
+                'sheet_id': sheet_id,
+                'chunk_index': offset // CHUNK_ROWS,
+                'rows': rows,
+                'checksum': chunk_checksum(rows),
+            })
+        if chunks:
+            bind.execute(chunk_table.insert(), chunks)
+
+        bind.execute(
+            sheet_table.update()
+            .where(sheet_table.c.id == sheet_id)
+            .values(storage='chunked', row_count=len(data), chunk_size=CHUNK_ROWS, data=None)
+        )
+
+
+def downgrade():
+    # Reassemble chunked sheets into a single blob before dropping the chunk table
+    bind = op.get_bind()
+    chunked = bind.execute(
+        sa.select(sheet_table.c.id).where(sheet_table.c.storage == 'chunked')
+    ).fetchall()
+    for (sheet_id,) in chunked:
+        data = []
+        for (rows,) in bind.execute(
+            sa.select(chunk_table.c.rows)
+            .where(chunk_table.c.sheet_id == sheet_id)
+            .order_by(chunk_table.c.chunk_index)
+        ):
+            data.extend(rows)
+        bind.execute(
+            sheet_table.update().where(sheet_table.c.id == sheet_id).values(data=data, storage='blob')
+        )
+
+    with op.batch_alter_table('sheet', schema=None) as batch_op:
+        batch_op.alter_column('data',
+               existing_type=sa.JSON(),
+               nullable=False)
+        batch_op.drop_column('chunk_size')
+        batch_op.drop_column('row_count')
+        batch_op.drop_column('storage')
+
+    op.drop_table('sheet_chunk')
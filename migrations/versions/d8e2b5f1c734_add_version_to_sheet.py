@@ -0,0 +1,26 @@
+"""Add version to Sheet model
+
+Revision ID: d8e2b5f1c734
+Revises: c41f7d2e9a10
+Create Date: 2026-10-18 10:03:27.551872
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8e2b5f1c734'
+down_revision = 'c41f7d2e9a10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('sheet', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    with op.batch_alter_table('sheet', schema=None) as batch_op:
+        batch_op.drop_column('version')
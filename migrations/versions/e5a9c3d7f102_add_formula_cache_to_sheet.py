@@ -0,0 +1,29 @@
+"""Add formula cache to Sheet model
+
+Revision ID: e5a9c3d7f102
+Revises: d8e2b5f1c734
+Create Date: 2026-10-18 11:26:05.904417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a9c3d7f102'
+down_revision = 'd8e2b5f1c734'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Left NULL for existing sheets; the cache is built on their next save
+    with op.batch_alter_table('sheet', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('formula_cells', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('computed_values', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('sheet', schema=None) as batch_op:
+        batch_op.drop_column('computed_values')
+        batch_op.drop_column('formula_cells')
@@ -0,0 +1,41 @@
+"""Add custom template table
+
+Revision ID: f3a8d6c2b947
+Revises: e5a9c3d7f102
+Create Date: 2026-10-18 14:36:09.204417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a8d6c2b947'
+down_revision = 'e5a9c3d7f102'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'custom_template',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('description', sa.String(length=255), nullable=True),
+        sa.Column('default_sheet_name', sa.String(length=100), nullable=True),
+        sa.Column('headers', sa.JSON(), nullable=False),
+        sa.Column('sample_data', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('custom_template', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_custom_template_user_id'), ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('custom_template', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_custom_template_user_id'))
+
+    op.drop_table('custom_template')
@@ -0,0 +1,61 @@
+"""
+Keyset pagination helpers for Excel Generator.
+Listing pages are ordered newest first by (created_at, id). Instead of an
+OFFSET, each page carries an opaque cursor with the position of its last
+row, so fetching page 50 costs the same index range scan as page 1.
+"""
+import base64
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(created_at, row_id):
+    """Opaque, URL-safe cursor for the row at (created_at, id)"""
+    raw = f"{created_at.isoformat() if created_at else ''}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (created_at, id) from a cursor, or None if it is malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded).decode('utf-8').split('|')
+        return (datetime.fromisoformat(created_at) if created_at else None), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def keyset_page(query, created_column, id_column, cursor=None, per_page=50):
+    """
+    Fetch one page of a query ordered by (created_at, id) descending
+
+    Args:
+        query: Query selecting rows that expose `created_at` and `id`
+        created_column: Column to order by, e.g. Sheet.created_at
+        id_column: Tie-breaking primary key column, e.g. Sheet.id
+        cursor: Cursor returned with the previous page, if any
+        per_page: Rows per page
+
+    Returns:
+        (rows, next_cursor) where next_cursor is None on the last page
+    """
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        created_at, row_id = position
+        if created_at is None:
+            # Rows without a timestamp sort last; only the id orders them
+            query = query.filter(created_column.is_(None), id_column < row_id)
+        else:
+            query = query.filter(or_(
+                created_column < created_at,
+                and_(created_column == created_at, id_column < row_id),
+                created_column.is_(None)
+            ))
+
+    rows = query.order_by(created_column.desc(), id_column.desc()).limit(per_page + 1).all()
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, next_cursor
@@ -0,0 +1,111 @@
+"""
+Password hashing policy for Excel Generator.
+Hashing and verification run on a small, bounded thread pool. hashlib
+releases the GIL while it stretches keys, so the pool caps how many cores
+logins can take at once, and a burst of logins waits in a short queue (or
+is turned away) instead of tying up every worker. Stored hashes that are
+weaker than the policy (fewer iterations, a smaller scrypt cost, a shorter
+salt, or another algorithm) are reported by needs_rehash so the caller can
+upgrade them on the next successful login; stronger ones are kept.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Raised when the hashing queue is full and the caller should retry later"""
+
+
+class PasswordHasher:
+    """
+    Hashes and verifies passwords according to one policy
+
+    Args:
+        method: Werkzeug hash method, e.g. 'pbkdf2:sha256:600000' or 'scrypt:32768:8:1'
+        salt_length: Characters of salt in new hashes
+        workers: Threads hashing at the same time, i.e. cores logins may use
+        max_pending: Requests allowed to wait for a free thread
+        wait_seconds: How long a request waits for a queue slot before giving up
+    """
+
+    def __init__(self, method, salt_length=16, workers=1, max_pending=32, wait_seconds=2.0):
+        self.method = normalize_method(method)
+        self.salt_length = salt_length
+        self.workers = workers
+        self.wait_seconds = wait_seconds
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def hash(self, password):
+        """Hash a password with the current policy"""
+        return self._run(generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, password_hash, password):
+        """Check a password against a stored hash, whatever policy made it"""
+        if not password_hash or password is None:
+            return False
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """
+        Whether a stored hash is weaker than the current policy
+
+        Hashes made with the same algorithm are only replaced when their cost
+        or salt is lower, so lowering the configured cost never downgrades them.
+        """
+        try:
+            method, salt, _ = password_hash.split('$', 2)
+            stored = _cost(normalize_method(method))
+        except (AttributeError, ValueError):
+            return True
+        current = _cost(self.method)
+        if stored[0] != current[0]:
+            return True
+        return stored[1] < current[1] or len(salt) < self.salt_length
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(timeout=self.wait_seconds):
+            raise PasswordHasherBusy('Too many password checks in progress')
+        try:
+            future = self._pool().submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def _pool(self):
+        # Created on first use so forked worker processes start their own threads
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                        thread_name_prefix='password-hash')
+        return self._executor
+
+
+def normalize_method(method):
+    """Spell out the defaults Werkzeug fills in, e.g. 'pbkdf2' -> 'pbkdf2:sha256:1000000'"""
+    name, *args = method.split(':')
+    if name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}'
+    if name == 'scrypt':
+        n, r, p = map(int, args) if args else (2 ** 15, 8, 1)
+        return f'scrypt:{n}:{r}:{p}'
+    return method
+
+
+def _cost(method):
+    """(algorithm, work factor) of a normalized method; work is 0 when unknown"""
+    name, *args = method.split(':')
+    if name == 'pbkdf2':
+        return f'pbkdf2:{args[0]}', int(args[1])
+    if name == 'scrypt':
+        n, r, p = map(int, args)
+        return 'scrypt', n * r * p
+    return method, 0
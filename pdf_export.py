@@ -0,0 +1,191 @@
+"""
+PDF export for Excel Generator.
+This module renders a sheet as a paginated table without any third-party
+PDF library. Pages are written to disk as soon as they are full, the header
+row is repeated at the top of every page, and only the current page is kept
+in memory.
+"""
+import zlib
+from itertools import chain, islice
+
+# A4 landscape, in points
+PAGE_WIDTH = 842
+PAGE_HEIGHT = 595
+MARGIN = 36
+
+FONT_SIZE = 9
+MIN_FONT_SIZE = 6
+ROW_HEIGHT_RATIO = 1.6
+CELL_PADDING = 3
+
+# Rows looked at to size the columns before the first page is written
+SAMPLE_ROWS = 200
+
+# Average Helvetica glyph width as a fraction of the font size
+CHAR_WIDTH = 0.55
+MIN_COLUMN_CHARS = 4
+MAX_COLUMN_CHARS = 40
+
+
+def create_pdf(rows, filepath, title=None):
+    """
+    Write rows to a PDF file as a table, one page at a time
+
+    Args:
+        rows: Iterable of rows, the first one being the header
+        filepath: Destination path
+        title: Optional title printed above the table on every page
+
+    Returns:
+        Number of pages written
+    """
+    rows = iter(rows)
+    header = next(rows, None) or []
+    sample = list(islice(rows, SAMPLE_ROWS))
+    layout = _TableLayout(header, sample, title)
+
+    with open(filepath, 'wb') as handle:
+        writer = _PdfWriter(handle)
+        page = []
+        for row in chain(sample, rows):
+            page.append(row)
+            if len(page) == layout.rows_per_page:
+                writer.add_page(layout.render_page(page, writer.page_count + 1))
+                page = []
+        if page or not writer.page_count:
+            writer.add_page(layout.render_page(page, writer.page_count + 1))
+        writer.close()
+        return writer.page_count
+
+
+class _TableLayout:
+    """Column widths, font size and drawing commands for one table"""
+
+    def __init__(self, header, sample, title):
+        self.header = [str(value) for value in header]
+        self.title = title
+        self.columns = max([len(self.header)] + [len(row) for row in sample]) or 1
+
+        # Size columns by their longest value in the header and sample rows
+        chars = [MIN_COLUMN_CHARS] * self.columns
+        for row in chain([self.header], sample):
+            for col, value in enumerate(row[:self.columns]):
+                chars[col] = min(max(chars[col], len(str(value))), MAX_COLUMN_CHARS)
+
+        available = PAGE_WIDTH - 2 * MARGIN
+        needed = sum(chars) * CHAR_WIDTH + self.columns * 2 * CELL_PADDING
+        self.font_size = max(min(FONT_SIZE, FONT_SIZE * available / needed), MIN_FONT_SIZE)
+        total_chars = sum(chars)
+        self.widths = [available * count / total_chars for count in chars]
+
+        self.row_height = self.font_size * ROW_HEIGHT_RATIO
+        self.top = PAGE_HEIGHT - MARGIN - (self.row_height * 1.5 if title else 0)
+        footer = self.row_height
+        self.rows_per_page = max(int((self.top - MARGIN - footer) / self.row_height) - 1, 1)
+
+    def render_page(self, rows, page_number):
+        """Return the content stream drawing the header, `rows` and the page number"""
+        ops = [b'0.5 w']
+        y = self.top
+        if self.title:
+            ops.append(_text(MARGIN, y + self.row_height * 0.5, 'F2', self.font_size + 2, self.title))
+
+        # Header background, then one text line per row
+        ops.append(b'0.9 g %.2f %.2f %.2f %.2f re f 0 g' % (
+            MARGIN, y - self.row_height, PAGE_WIDTH - 2 * MARGIN, self.row_height))
+        ops.extend(self._row_ops(self.header, y, 'F2'))
+        for row in rows:
+            y -= self.row_height
+            ops.extend(self._row_ops(row, y, 'F1'))
+        bottom = y - self.row_height
+
+        # Grid lines
+        ops.append(b'0.7 G')
+        line_y = self.top
+        for _ in range(len(rows) + 2):
+            ops.append(b'%.2f %.2f m %.2f %.2f l' % (MARGIN, line_y, PAGE_WIDTH - MARGIN, line_y))
+            line_y -= self.row_height
+        x = MARGIN
+        for width in [0] + self.widths:
+            x += width
+            ops.append(b'%.2f %.2f m %.2f %.2f l' % (x, self.top, x, bottom))
+        ops.append(b'S 0 G')
+
+        ops.append(_text(PAGE_WIDTH - MARGIN - 40, MARGIN - self.row_height, 'F1',
+                         MIN_FONT_SIZE + 1, f'Page {page_number}'))
+        return b'\n'.join(ops)
+
+    def _row_ops(self, row, y, font):
+        ops = []
+        x = MARGIN
+        baseline = y - self.row_height + (self.row_height - self.font_size) / 2 + 1
+        for col, width in enumerate(self.widths):
+            value = row[col] if col < len(row) else ''
+            text = _fit(str(value) if value is not None else '', width - 2 * CELL_PADDING, self.font_size)
+            if text:
+                ops.append(_text(x + CELL_PADDING, baseline, font, self.font_size, text))
+            x += width
+        return ops
+
+
+class _PdfWriter:
+    """Writes PDF objects sequentially and the cross-reference table on close"""
+
+    CATALOG, PAGES, FONT_REGULAR, FONT_BOLD = 1, 2, 3, 4
+
+    def __init__(self, handle):
+        self.handle = handle
+        self.offsets = {}
+        self.page_ids = []
+        self.next_id = 5
+        self.handle.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        self._object(self.CATALOG, b'<< /Type /Catalog /Pages 2 0 R >>')
+        self._object(self.FONT_REGULAR, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica '
+                                        b'/Encoding /WinAnsiEncoding >>')
+        self._object(self.FONT_BOLD, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold '
+                                     b'/Encoding /WinAnsiEncoding >>')
+
+    @property
+    def page_count(self):
+        return len(self.page_ids)
+
+    def add_page(self, content):
+        data = zlib.compress(content)
+        content_id, page_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+        self._object(content_id, b'<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream' % (
+            len(data), data))
+        self._object(page_id, b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] '
+                              b'/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>' % (
+                                  PAGE_WIDTH, PAGE_HEIGHT, content_id))
+        self.page_ids.append(page_id)
+
+    def close(self):
+        kids = b' '.join(b'%d 0 R' % page_id for page_id in self.page_ids)
+        self._object(self.PAGES, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(self.page_ids)))
+
+        xref_offset = self.handle.tell()
+        size = self.next_id
+        lines = [b'xref', b'0 %d' % size, b'0000000000 65535 f ']
+        lines.extend(b'%010d 00000 n ' % self.offsets[object_id] for object_id in range(1, size))
+        lines.append(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (size, xref_offset))
+        self.handle.write(b'\n'.join(lines))
+
+    def _object(self, object_id, body):
+        self.offsets[object_id] = self.handle.tell()
+        self.handle.write(b'%d 0 obj\n%s\nendobj\n' % (object_id, body))
+
+
+def _fit(text, width, font_size):
+    """Truncate text with an ellipsis so it fits in `width` points"""
+    max_chars = int(width / (font_size * CHAR_WIDTH))
+    if len(text) <= max_chars:
+        return text
+    return text[:max(max_chars - 3, 0)] + '...' if max_chars > 3 else text[:max_chars]
+
+
+def _text(x, y, font, size, text):
+    encoded = text.encode('cp1252', errors='replace')
+    escaped = encoded.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+    escaped = escaped.replace(b'\r', b' ').replace(b'\n', b' ')
+    return b'BT /%s %.1f Tf %.2f %.2f Td (%s) Tj ET' % (font.encode(), size, x, y, escaped)
@@ -0,0 +1,145 @@
+"""
+Connection pool instrumentation for Excel Generator.
+InstrumentedQueuePool times every checkout, including the wait for a free
+connection and any reconnect, and PoolMetrics keeps the counters and a
+latency histogram for the stats endpoint. Each worker process has its own
+pool, so the numbers describe one process. engine_options() picks the pool
+for a database URL.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+# Engine options only a QueuePool accepts
+QUEUE_POOL_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout')
+
+# Upper bounds, in milliseconds, of the checkout latency histogram buckets
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class PoolMetrics:
+    """Checkout counters and latency histogram for one engine's pool"""
+
+    def __init__(self):
+        self.engine = None
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.connects = 0
+            self.invalidations = 0
+            self.wait_seconds = 0.0
+            self.max_wait_seconds = 0.0
+            self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)  # The last one is +Inf
+
+    def attach(self, engine):
+        """Start collecting from an engine's pool"""
+        self.engine = engine
+        engine.pool.metrics = self
+        event.listen(engine, 'connect', self._on_connect)
+        event.listen(engine, 'invalidate', self._on_invalidate)
+
+    def record_checkout(self, seconds, timed_out=False):
+        bucket = bisect_left(LATENCY_BUCKETS_MS, seconds * 1000)
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+            self.buckets[bucket] += 1
+
+    def stats(self):
+        """Current pool state and counters since start (or the last reset)"""
+        pool = self.engine.pool if self.engine is not None else None
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            histogram = {f'le_{bound}ms': count for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets)}
+            histogram['le_inf'] = self.buckets[-1]
+            stats = {
+                'pid': os.getpid(),
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'connects': self.connects,
+                'invalidations': self.invalidations,
+                'wait_seconds_total': round(self.wait_seconds, 6),
+                'wait_ms_avg': round(self.wait_seconds * 1000 / attempts, 3) if attempts else 0,
+                'wait_ms_max': round(self.max_wait_seconds * 1000, 3),
+                'checkout_latency_histogram': histogram,
+            }
+        if isinstance(pool, QueuePool):
+            stats.update({
+                'pool_size': pool.size(),
+                'checked_out': pool.checkedout(),
+                'checked_in': pool.checkedin(),
+                'overflow': max(pool.overflow(), 0),
+                'timeout_seconds': pool.timeout(),
+            })
+        return stats
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        # Includes stale connections found by pool_pre_ping
+        with self._lock:
+            self.invalidations += 1
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that reports how long each checkout took to its PoolMetrics"""
+
+    metrics = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            if self.metrics is not None:
+                self.metrics.record_checkout(time.perf_counter() - start, timed_out=True)
+            raise
+        if self.metrics is not None:
+            self.metrics.record_checkout(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() swaps in a new pool; keep reporting to the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def engine_options(url, options):
+    """
+    Engine options for a database URL, using InstrumentedQueuePool where a pool is kept
+
+    In-memory SQLite shares a single connection (Flask-SQLAlchemy gives it a
+    StaticPool), and that pool, like any other non-queue pool, rejects the
+    QueuePool sizing options, so they are left out there.
+
+    Args:
+        url: Database URL
+        options: Configured engine options; not modified
+    """
+    options = dict(options)
+    url = make_url(url)
+    in_memory = url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+    if not in_memory:
+        options.setdefault('poolclass', InstrumentedQueuePool)
+    poolclass = options.get('poolclass')
+    if poolclass is None or not issubclass(poolclass, QueuePool):
+        for key in QUEUE_POOL_OPTIONS:
+            options.pop(key, None)
+    return options
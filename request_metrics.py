@@ -0,0 +1,286 @@
+"""
+Request instrumentation for Excel Generator.
+RequestMetrics times every request and records, per endpoint, the latency,
+the number and duration of database queries, the time spent rendering
+templates and the size of the response body, and renders them in the
+Prometheus text format. RequestProfiler runs cProfile on a sample of
+requests and writes a profile to disk for those slower than a threshold.
+Everything is kept per worker process.
+"""
+import cProfile
+import importlib.util
+import os
+import random
+import threading
+import time
+from datetime import datetime
+
+from flask import before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+
+# Upper bounds of the histogram buckets
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+class Histogram:
+    """Cumulative Prometheus histogram keyed by a tuple of label values"""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted(self._series.items())
+            series = [(labels, list(values)) for labels, values in series]
+        for labels, values in series:
+            label_text = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels))
+            prefix = label_text + ',' if label_text else ''
+            for bound, count in zip(self.buckets, values):
+                lines.append(f'{self.name}_bucket{{{prefix}le="{_number(bound)}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {values[-1]}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {_number(values[-2])}')
+            lines.append(f'{self.name}_count{{{label_text}}} {values[-1]}')
+        return lines
+
+
+class Counter:
+    """Prometheus counter keyed by a tuple of label values"""
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            series = sorted(self._series.items())
+        for labels, value in series:
+            label_text = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels))
+            lines.append(f'{self.name}{{{label_text}}} {_number(value)}')
+        return lines
+
+
+class RequestMetrics:
+    """
+    Per-endpoint request, query, template and response size metrics
+
+    Args:
+        prefix: Prepended to every metric name
+    """
+
+    def __init__(self, prefix='excelapp'):
+        self.prefix = prefix
+        self.requests = Counter(f'{prefix}_requests_total', 'Requests handled',
+                                ('endpoint', 'method', 'status'))
+        self.latency = Histogram(f'{prefix}_request_duration_seconds',
+                                 'Time from the start of the request until the response was ready',
+                                 ('endpoint', 'method'), SECONDS_BUCKETS)
+        self.db_queries = Histogram(f'{prefix}_request_db_queries', 'Database queries per request',
+                                    ('endpoint',), QUERY_BUCKETS)
+        self.db_seconds = Histogram(f'{prefix}_request_db_seconds', 'Time spent in database queries per request',
+                                    ('endpoint',), SECONDS_BUCKETS)
+        self.template_seconds = Histogram(f'{prefix}_request_template_seconds',
+                                          'Time spent rendering templates per request',
+                                          ('endpoint',), SECONDS_BUCKETS)
+        self.response_bytes = Histogram(f'{prefix}_response_bytes', 'Response body size as sent, after compression',
+                                        ('endpoint',), BYTES_BUCKETS)
+        self.profiler = None
+
+    def init_app(self, app, engine, profiler=None):
+        """
+        Start collecting for an app and its database engine
+
+        Register this before any after_request hook that changes the body
+        (such as compression): Flask runs those hooks in reverse order, so
+        the metrics then see the response as it is sent.
+        """
+        self.profiler = profiler
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._teardown)
+        before_render_template.connect(self._template_started, app, weak=False)
+        template_rendered.connect(self._template_finished, app, weak=False)
+        event.listen(engine, 'before_cursor_execute', self._query_started)
+        event.listen(engine, 'after_cursor_execute', self._query_finished)
+
+    def current(self):
+        """Query count, query time and template time so far in this request"""
+        return {
+            'db_queries': g.get('_metrics_queries', 0),
+            'db_seconds': g.get('_metrics_query_seconds', 0.0),
+            'template_seconds': g.get('_metrics_template_seconds', 0.0),
+        }
+
+    def render(self, extra_lines=()):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in (self.requests, self.latency, self.db_queries, self.db_seconds,
+                       self.template_seconds, self.response_bytes):
+            lines.extend(metric.render())
+        lines.extend(extra_lines)
+        return '\n'.join(lines) + '\n'
+
+    def _start(self):
+        g._metrics_start = time.perf_counter()
+        g._metrics_queries = 0
+        g._metrics_query_seconds = 0.0
+        g._metrics_template_seconds = 0.0
+        if self.profiler is not None:
+            self.profiler.start()
+
+    def _finish(self, response):
+        start = g.pop('_metrics_start', None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        endpoint = request.endpoint or 'unmatched'  # 404s share one label
+        self.requests.inc((endpoint, request.method, str(response.status_code)))
+        self.latency.observe((endpoint, request.method), elapsed)
+        self.db_queries.observe((endpoint,), g._metrics_queries)
+        self.db_seconds.observe((endpoint,), g._metrics_query_seconds)
+        self.template_seconds.observe((endpoint,), g._metrics_template_seconds)
+        # Streamed and file responses have no length until they are sent
+        length = response.calculate_content_length()
+        if length is not None:
+            self.response_bytes.observe((endpoint,), length)
+        if self.profiler is not None:
+            self.profiler.finish(endpoint, elapsed, self.current())
+        return response
+
+    def _teardown(self, exception):
+        # The profiler is left running when a later after_request hook raised
+        if self.profiler is not None:
+            self.profiler.cancel()
+
+    def _template_started(self, sender, template, context, **extra):
+        g.setdefault('_metrics_template_stack', []).append(time.perf_counter())
+
+    def _template_finished(self, sender, template, context, **extra):
+        stack = g.get('_metrics_template_stack')
+        if not stack:
+            return
+        elapsed = time.perf_counter() - stack.pop()
+        # Only the outermost render counts, so nested render_template calls are not counted twice
+        if not stack and '_metrics_template_seconds' in g:
+            g._metrics_template_seconds += elapsed
+
+    def _query_started(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            conn.info.setdefault('_metrics_query_start', []).append(time.perf_counter())
+
+    def _query_finished(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('_metrics_query_start')
+        if not starts or not has_request_context() or '_metrics_queries' not in g:
+            return
+        g._metrics_query_seconds += time.perf_counter() - starts.pop()
+        g._metrics_queries += 1
+
+
+class RequestProfiler:
+    """
+    Profiles a random sample of requests and saves the slow ones
+
+    Args:
+        directory: Where .prof files are written (load them with pstats or snakeviz)
+        sample_rate: Fraction of requests to profile, 0 to 1
+        threshold_seconds: Profiles of requests faster than this are discarded
+        memory: Also record the process's memory before and after each profiled request
+    """
+
+    def __init__(self, directory, sample_rate, threshold_seconds, memory=False, logger=None):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.threshold_seconds = threshold_seconds
+        # memory-profiler takes a while to import (it pulls in IPython), so only when asked
+        self.memory = memory and importlib.util.find_spec('memory_profiler') is not None
+        self.logger = logger
+        self.saved = 0
+        # cProfile can only run in one thread of a process at a time
+        self._busy = threading.Lock()
+
+    def start(self):
+        if random.random() >= self.sample_rate or not self._busy.acquire(blocking=False):
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler (a debugger, or a profile run by hand) is active
+            self._busy.release()
+            return
+        g._profile = profile
+        g._profile_memory = _memory_mib() if self.memory else None
+
+    def finish(self, endpoint, elapsed, counts):
+        profile = self._stop()
+        if profile is None or elapsed < self.threshold_seconds:
+            return None
+
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+        path = os.path.join(self.directory, f'{stamp}-{endpoint}-{elapsed * 1000:.0f}ms.prof')
+        profile.dump_stats(path)
+        self.saved += 1
+
+        if self.logger is not None:
+            memory = ''
+            if g.get('_profile_memory') is not None:
+                after = _memory_mib()
+                memory = f', memory {after:.1f} MiB ({after - g._profile_memory:+.1f})'
+            self.logger.warning('Slow request %s %s took %.0f ms (%d queries in %.0f ms, templates %.0f ms%s); profile saved to %s',
+                                request.method, request.path, elapsed * 1000, counts['db_queries'],
+                                counts['db_seconds'] * 1000, counts['template_seconds'] * 1000, memory, path)
+        return path
+
+    def cancel(self):
+        self._stop()
+
+    def _stop(self):
+        profile = g.pop('_profile', None)
+        if profile is None:
+            return None
+        profile.disable()
+        self._busy.release()
+        return profile
+
+
+def _memory_mib():
+    from memory_profiler import memory_usage
+    # One sample; memory_usage otherwise samples for a tenth of a second
+    return memory_usage(-1, interval=0.001, timeout=0.001)[0]
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(value) if value != int(value) else str(int(value))
+    return str(value)
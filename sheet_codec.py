@@ -0,0 +1,151 @@
+"""
+Compact sheet encoding for Excel Generator.
+Grids are stored and transferred column by column. A column with many
+repeated values (empty cells, categories such as "Credit Card") keeps each
+distinct value once plus a list of small integer codes. For storage the
+column layout is serialized to JSON and compressed with a stdlib codec.
+
+Column layout (also the editor's "columns" wire format):
+    {"widths": [[5, 120], [3, 1]],          # runs of [row width, row count]
+     "columns": [{"dict": ["", "Food"], "codes": [1, 0, 1]},
+                 {"values": ["12.50", "3", "8"]}]}
+
+Column N holds one value for every row that is wider than N, in row order,
+so ragged rows round-trip exactly.
+"""
+import json
+import lzma
+import zlib
+
+MAGIC = b'SC'
+FORMAT_VERSION = 1
+
+# Codec name -> (tag byte, compress, decompress)
+CODECS = {
+    'zlib': (b'z', lambda data: zlib.compress(data, 6), zlib.decompress),
+    'lzma': (b'x', lambda data: lzma.compress(data, preset=1), lzma.decompress),
+}
+try:
+    # Python 3.14+ ships Zstandard in the standard library
+    from compression import zstd
+    CODECS['zstd'] = (b's', lambda data: zstd.compress(data, level=3), zstd.decompress)
+except ImportError:
+    pass
+
+_CODECS_BY_TAG = {tag: (name, decompress) for name, (tag, _, decompress) in CODECS.items()}
+
+
+class SheetCodecError(ValueError):
+    """Raised when an encoded grid is malformed or uses an unknown codec"""
+
+
+def to_columns(rows):
+    """
+    Convert a list of rows to the column layout
+
+    Args:
+        rows: List of rows (lists of JSON values), possibly of different widths
+
+    Returns:
+        Dict with "widths" and "columns", ready for json.dumps
+    """
+    widths = []
+    for row in rows:
+        if widths and widths[-1][0] == len(row):
+            widths[-1][1] += 1
+        else:
+            widths.append([len(row), 1])
+
+    max_width = max((width for width, _ in widths), default=0)
+    if len(widths) == 1:
+        # Rectangular grid, the common case
+        columns = [list(column) for column in zip(*rows)]
+    else:
+        columns = [[] for _ in range(max_width)]
+        for row in rows:
+            for col, value in enumerate(row):
+                columns[col].append(value)
+
+    return {'widths': widths, 'columns': [_encode_column(values) for values in columns]}
+
+
+def from_columns(payload):
+    """Rebuild the list of rows from the column layout"""
+    try:
+        widths = payload['widths']
+        columns = [_decode_column(column) for column in payload['columns']]
+        if len(widths) == 1:
+            width, count = widths[0]
+            if width == 0:
+                return [[] for _ in range(count)]
+            rows = [list(row) for row in zip(*columns[:width])]
+            if len(columns) < width or len(rows) != count:
+                raise SheetCodecError('Column lengths do not match the row widths')
+            return rows
+
+        positions = [0] * len(columns)
+        rows = []
+        for width, count in widths:
+            for _ in range(count):
+                row = []
+                for col in range(width):
+                    row.append(columns[col][positions[col]])
+                    positions[col] += 1
+                rows.append(row)
+        return rows
+    except SheetCodecError:
+        raise
+    except (KeyError, TypeError, ValueError, IndexError) as e:
+        raise SheetCodecError(f'Malformed column payload: {e}')
+
+
+def pack_rows(rows, codec='zlib'):
+    """Encode rows to compressed bytes: magic, format version, codec tag, body"""
+    if codec not in CODECS:
+        raise SheetCodecError(f'Unknown sheet codec: {codec}')
+    tag, compress, _ = CODECS[codec]
+    body = json.dumps(to_columns(rows), separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return MAGIC + bytes([FORMAT_VERSION]) + tag + compress(body)
+
+
+def unpack_rows(blob):
+    """Decode bytes written by pack_rows back to a list of rows"""
+    blob = bytes(blob)
+    if blob[:2] != MAGIC or blob[2:3] != bytes([FORMAT_VERSION]):
+        raise SheetCodecError('Not a packed sheet payload')
+    codec = _CODECS_BY_TAG.get(blob[3:4])
+    if codec is None:
+        raise SheetCodecError(f'Unsupported sheet codec tag: {blob[3:4]!r}')
+    name, decompress = codec
+    try:
+        body = decompress(blob[4:])
+    except Exception as e:
+        raise SheetCodecError(f'Corrupt {name} payload: {e}')
+    return from_columns(json.loads(body))
+
+
+def _encode_column(values):
+    """Dictionary-encode a column when that makes it smaller"""
+    codes = []
+    lookup = {}
+    try:
+        for value in values:
+            # Key on the type as well, so 1, 1.0 and True stay distinct
+            key = (value.__class__, value)
+            code = lookup.get(key)
+            if code is None:
+                code = lookup[key] = len(lookup)
+            codes.append(code)
+            if len(lookup) * 2 > len(values):
+                return {'values': values}
+    except TypeError:
+        # Unhashable cells (nested lists or objects) are stored as they are
+        return {'values': values}
+    return {'dict': [value for _, value in lookup], 'codes': codes}
+
+
+def _decode_column(column):
+    if 'values' in column:
+        return column['values']
+    dictionary = column['dict']
+    return [dictionary[code] for code in column['codes']]
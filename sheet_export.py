@@ -0,0 +1,103 @@
+"""
+Export module for Excel Generator.
+This module writes sheets to CSV and XLSX one row at a time, so memory use
+stays flat no matter how large the sheet is.
+"""
+import csv
+import io
+from urllib.parse import quote
+
+# Rows written into the CSV buffer before it is handed to the response
+CSV_BATCH_ROWS = 500
+
+EXPORT_MIMETYPES = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv',
+    'pdf': 'application/pdf',
+}
+
+
+def iter_csv(rows, batch_rows=CSV_BATCH_ROWS):
+    """
+    Yield a CSV document in pieces of `batch_rows` rows
+
+    Args:
+        rows: Iterable of rows, the first one being the header
+        batch_rows: Rows per yielded piece
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    width = None
+    pending = 0
+
+    for row in rows:
+        if width is None:
+            width = len(row)
+        writer.writerow(_pad(row, width))
+        pending += 1
+        if pending >= batch_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    if pending:
+        yield buffer.getvalue()
+
+
+def write_csv(rows, filepath):
+    """Write rows to a CSV file, one batch at a time"""
+    with open(filepath, 'w', encoding='utf-8', newline='') as handle:
+        for piece in iter_csv(rows):
+            handle.write(piece)
+
+
+def write_xlsx(rows, filepath, worksheet_name='Sheet1'):
+    """
+    Write rows to an XLSX file using XlsxWriter's constant memory mode
+
+    In constant memory mode each row is flushed to a temporary file as soon as
+    the next one starts, so only a single row is held in memory.
+
+    Args:
+        rows: Iterable of rows, the first one being the header
+        filepath: Destination path
+        worksheet_name: Name of the worksheet tab
+    """
+    # Imported here so workers that never export to XLSX don't load it
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(filepath, {
+        'constant_memory': True,
+        # Cells hold computed values; text that looks like a formula stays text
+        'strings_to_formulas': False,
+    })
+    try:
+        worksheet = workbook.add_worksheet(worksheet_name)
+        header_format = workbook.add_format({'bold': True, 'border': 1})
+        width = None
+        for row_index, row in enumerate(rows):
+            if width is None:
+                width = len(row)
+                worksheet.write_row(row_index, 0, row, header_format)
+            else:
+                worksheet.write_row(row_index, 0, _pad(row, width))
+    finally:
+        workbook.close()
+
+
+def attachment_header(filename):
+    """Content-Disposition value for a download, with a UTF-8 fallback for non-ASCII names"""
+    try:
+        filename.encode('ascii')
+    except UnicodeEncodeError:
+        return f"attachment; filename*=UTF-8''{quote(filename)}"
+    escaped = filename.replace('\\', '\\\\').replace('"', '\\"')
+    return f'attachment; filename="{escaped}"'
+
+
+def _pad(row, width):
+    # Short rows get empty cells so every line has the header's width
+    if len(row) < width:
+        return list(row) + [''] * (width - len(row))
+    return row
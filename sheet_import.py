@@ -0,0 +1,100 @@
+"""
+Import module for Excel Generator.
+This module reads uploaded CSV and XLSX files one row at a time, so an
+import only ever holds a single batch of rows in memory.
+"""
+import csv
+import io
+import os
+from datetime import date, datetime, time
+
+IMPORT_FORMATS = ('csv', 'xlsx')
+
+
+class SheetImportError(ValueError):
+    """Raised when an uploaded file cannot be read"""
+
+
+class RowReader:
+    """
+    Iterates over the rows of an uploaded file as lists of strings
+
+    Args:
+        filepath: Path of the uploaded file
+        format_type: 'csv' or 'xlsx'
+    """
+
+    def __init__(self, filepath, format_type):
+        if format_type not in IMPORT_FORMATS:
+            raise SheetImportError(f'Unsupported import format: {format_type}')
+        self.filepath = filepath
+        self.format_type = format_type
+        self.rows_read = 0
+        self._progress = lambda: (0, 0)
+
+    def __iter__(self):
+        rows = self._iter_csv() if self.format_type == 'csv' else self._iter_xlsx()
+        for row in rows:
+            self.rows_read += 1
+            yield row
+
+    def progress(self):
+        """(done, total) in bytes for CSV and rows for XLSX"""
+        return self._progress()
+
+    def _iter_csv(self):
+        total = os.path.getsize(self.filepath)
+        with open(self.filepath, 'rb') as raw:
+            self._progress = lambda: (raw.tell() if not raw.closed else total, total)
+            text = io.TextIOWrapper(raw, encoding='utf-8-sig', errors='replace', newline='')
+            # Sniff the delimiter from whole lines at the start of the file
+            sample = text.read(64 * 1024)
+            if '\n' in sample:
+                sample = sample[:sample.rindex('\n')]
+            try:
+                delimiter = csv.Sniffer().sniff(sample, delimiters=',;\t|').delimiter
+            except csv.Error:
+                delimiter = ','
+            text.seek(0)
+            try:
+                # Only the delimiter is sniffed; quoting follows Excel's rules
+                yield from csv.reader(text, csv.excel, delimiter=delimiter)
+            except csv.Error as e:
+                raise SheetImportError(f'Invalid CSV on line {self.rows_read + 1}: {e}')
+
+    def _iter_xlsx(self):
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+        from zipfile import BadZipFile
+
+        try:
+            workbook = load_workbook(self.filepath, read_only=True, data_only=True)
+        except (InvalidFileException, BadZipFile, KeyError) as e:
+            raise SheetImportError(f'Invalid XLSX file: {e}')
+        try:
+            worksheet = workbook.worksheets[0]
+            total = worksheet.max_row or 0
+            self._progress = lambda: (self.rows_read, max(total, self.rows_read))
+            for values in worksheet.iter_rows(values_only=True):
+                row = [cell_text(value) for value in values]
+                # Read-only mode pads rows to the sheet's width; drop the empty tail
+                while row and row[-1] == '':
+                    row.pop()
+                yield row
+        finally:
+            workbook.close()
+
+
+def cell_text(value):
+    """Convert a spreadsheet value to the text stored in a sheet cell"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ') if value.time() != time() else value.date().isoformat()
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    return str(value)
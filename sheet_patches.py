@@ -0,0 +1,231 @@
+"""
+Patch operations for sheets.
+This module applies batched cell, row and column edits to a sheet so a save
+only touches the rows it changes instead of re-uploading the whole grid.
+
+Supported operations (row 0 is the header row):
+    {"op": "set_cell", "row": 3, "col": 1, "value": "42", "expect": "41"}
+    {"op": "insert_row", "index": 5, "count": 1, "rows": [[...]]}
+    {"op": "delete_row", "index": 5, "count": 1}
+    {"op": "insert_col", "index": 2, "count": 1, "values": [...]}
+    {"op": "delete_col", "index": 2, "count": 1}
+    {"op": "move_row", "from": 4, "to": 1}
+    {"op": "move_col", "from": 0, "to": 3}
+"""
+
+STRUCTURAL_OPS = {'insert_row', 'delete_row', 'insert_col', 'delete_col', 'move_row', 'move_col'}
+
+# Defaults for the limits below; the app passes MAX_SHEET_COLS and MAX_PATCH_ROWS from config.py
+MAX_COLS = 1024
+MAX_INSERT_ROWS = 1000
+
+
+class PatchError(ValueError):
+    """Raised when a patch is malformed or does not fit the sheet"""
+
+
+class PatchConflict(PatchError):
+    """
+    Raised when set_cell patches expected different cell contents
+
+    Attributes:
+        cells: (row, col) cells whose stored value did not match `expect`
+    """
+
+    def __init__(self, cells):
+        super().__init__(f'{len(cells)} edited cell(s) were changed by someone else')
+        self.cells = cells
+
+
+def apply_patches(sheet, patches, max_cols=MAX_COLS, max_insert_rows=MAX_INSERT_ROWS):
+    """
+    Apply a list of patches to a sheet in order
+
+    Consecutive cell edits are buffered and written one chunk at a time, so a
+    batch of edits in the same area costs a single read and write. A set_cell
+    patch with "expect" only applies if the cell still holds that text (or,
+    for a formula, shows it as its result); otherwise the whole batch fails
+    with PatchConflict. Row
+    indexes must fall inside the sheet, and column indexes inside
+    max(sheet width, max_cols), so one request cannot grow the grid without
+    bound.
+
+    Args:
+        sheet: Sheet model instance (anything with the Sheet row API)
+        patches: List of patch dicts
+        max_cols: Columns a sheet may grow to; wider sheets keep their width
+        max_insert_rows: Rows one batch may insert in total
+
+    Returns:
+        Set of (row, col) cells edited by set_cell patches, or None when the
+        batch changed the grid's shape and every formula has to be rescanned
+    """
+    buffer = _CellBuffer(sheet)
+    changed = set()
+    structural = False
+    col_limit = max(_width(sheet), max_cols)
+    inserted_rows = 0
+
+    for position, patch in enumerate(patches):
+        if not isinstance(patch, dict):
+            raise PatchError(f'Patch {position} is not an object')
+
+        op = patch.get('op')
+        if op == 'set_cell':
+            row = _index(patch, 'row', position, sheet.num_rows() - 1)
+            col = _index(patch, 'col', position, col_limit - 1)
+            value = patch.get('value', '')
+            expect = patch.get('expect')
+            buffer.set(row, col, '' if value is None else str(value),
+                       None if expect is None else str(expect))
+            changed.add((row, col))
+            continue
+
+        if op not in STRUCTURAL_OPS:
+            raise PatchError(f'Patch {position}: unknown operation {op!r}')
+
+        # Structural edits shift indices, so pending cell edits go first
+        buffer.flush()
+        structural = True
+
+        if op == 'insert_row':
+            index = _index(patch, 'index', position, sheet.num_rows())
+            rows = patch.get('rows')
+            if rows is None:
+                count = _count(patch, position, max_insert_rows - inserted_rows)
+                rows = [[''] * _width(sheet) for _ in range(count)]
+            elif not isinstance(rows, list) or not all(isinstance(r, list) for r in rows):
+                raise PatchError(f'Patch {position}: rows must be a list of lists')
+            elif len(rows) > max_insert_rows - inserted_rows:
+                raise PatchError(f'Patch {position}: a batch may insert at most {max_insert_rows} rows')
+            elif any(len(r) > col_limit for r in rows):
+                raise PatchError(f'Patch {position}: rows may have at most {col_limit} columns')
+            inserted_rows += len(rows)
+            sheet.splice_rows(index, 0, [[str(v) for v in r] for r in rows])
+
+        elif op == 'delete_row':
+            index = _index(patch, 'index', position, sheet.num_rows() - 1)
+            sheet.splice_rows(index, _count(patch, position, sheet.num_rows() - index), [])
+
+        elif op == 'move_row':
+            source = _index(patch, 'from', position, sheet.num_rows() - 1)
+            target = _index(patch, 'to', position, sheet.num_rows() - 1)
+            row = sheet.get_rows(source, source + 1)[0]
+            sheet.splice_rows(source, 1, [])
+            sheet.splice_rows(target, 0, [row])
+
+        elif op == 'insert_col':
+            count = _count(patch, position, col_limit - _width(sheet))
+            index = _index(patch, 'index', position, col_limit - count)
+            values = patch.get('values') or []
+            if not isinstance(values, list):
+                raise PatchError(f'Patch {position}: values must be a list')
+
+            def insert(row, row_index):
+                _pad(row, index)
+                value = str(values[row_index]) if row_index < len(values) else ''
+                row[index:index] = [value] + [''] * (count - 1)
+            _map_rows(sheet, insert)
+
+        elif op == 'delete_col':
+            index = _index(patch, 'index', position, col_limit - 1)
+            count = _count(patch, position, col_limit - index)
+
+            def delete(row, row_index):
+                del row[index:index + count]
+            _map_rows(sheet, delete)
+
+        elif op == 'move_col':
+            source = _index(patch, 'from', position, col_limit - 1)
+            target = _index(patch, 'to', position, col_limit - 1)
+
+            def move(row, row_index):
+                _pad(row, max(source, target) + 1)
+                row.insert(target, row.pop(source))
+            _map_rows(sheet, move)
+
+    buffer.flush()
+    return None if structural else changed
+
+
+class _CellBuffer:
+    """Collects cell edits and writes them grouped by chunk"""
+
+    def __init__(self, sheet):
+        self.sheet = sheet
+        self.cells = {}
+        self.expected = {}  # (row, col) -> text the first edit of the cell expected
+
+    def set(self, row, col, value, expect=None):
+        self.cells.setdefault(row, {})[col] = value
+        if expect is not None:
+            self.expected.setdefault((row, col), expect)
+
+    def flush(self):
+        if not self.cells:
+            return
+
+        conflicts = []
+        computed = getattr(self.sheet, 'computed_values', None) or {}
+
+        size = self.sheet.chunk_size
+        by_chunk = {}
+        for row_index, cols in self.cells.items():
+            by_chunk.setdefault(row_index // size, {})[row_index] = cols
+
+        for chunk_index in sorted(by_chunk):
+            start = chunk_index * size
+            rows = self.sheet.get_rows(start, start + size)
+            for row_index, cols in by_chunk[chunk_index].items():
+                row = rows[row_index - start]
+                _pad(row, max(cols) + 1)
+                for col in cols:
+                    expect = self.expected.get((row_index, col))
+                    if expect is not None and expect not in (row[col], computed.get(f'{row_index}:{col}')):
+                        conflicts.append((row_index, col))
+                for col, value in cols.items():
+                    row[col] = value
+            self.sheet.set_rows(start, rows)
+
+        self.cells = {}
+        self.expected = {}
+        if conflicts:
+            raise PatchConflict(sorted(conflicts))
+
+
+def _map_rows(sheet, func):
+    """Apply func(row, row_index) to every row, one chunk-sized window at a time"""
+    size = sheet.chunk_size
+    for start in range(0, sheet.num_rows(), size):
+        rows = sheet.get_rows(start, start + size)
+        for offset, row in enumerate(rows):
+            func(row, start + offset)
+        sheet.set_rows(start, rows)
+
+
+def _width(sheet):
+    header = sheet.get_rows(0, 1)
+    return len(header[0]) if header else 0
+
+
+def _pad(row, length):
+    if len(row) < length:
+        row.extend([''] * (length - len(row)))
+
+
+def _index(patch, key, position, limit):
+    value = patch.get(key)
+    if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+        raise PatchError(f'Patch {position}: {key} must be a non-negative integer')
+    if value > limit:
+        raise PatchError(f'Patch {position}: {key} {value} is out of range')
+    return value
+
+
+def _count(patch, position, limit):
+    count = patch.get('count', 1)
+    if not isinstance(count, int) or isinstance(count, bool) or count < 1:
+        raise PatchError(f'Patch {position}: count must be a positive integer')
+    if count > limit:
+        raise PatchError(f'Patch {position}: count {count} is out of range')
+    return count
@@ -602,17 +602,8 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
-    // Add row and column buttons
-    const addRowBtn = document.getElementById('addRowBtn');
-    const addColumnBtn = document.getElementById('addColumnBtn');
-    const deleteRowBtn = document.getElementById('deleteRowBtn');
-    const deleteColumnBtn = document.getElementById('deleteColumnBtn');
+    // Row and column buttons are handled by excel-grid-operations.js
     const saveBtn = document.getElementById('saveSheetBtn');
-    
-    if (addRowBtn) addRowBtn.addEventListener('click', addRow);
-    if (addColumnBtn) addColumnBtn.addEventListener('click', addColumn);
-    if (deleteRowBtn) deleteRowBtn.addEventListener('click', deleteSelectedRow);
-    if (deleteColumnBtn) deleteColumnBtn.addEventListener('click', deleteSelectedColumn);
     if (saveBtn) saveBtn.addEventListener('click', saveSheetData);
     
     // Merge cells button
@@ -648,21 +639,24 @@ document.addEventListener('DOMContentLoaded', function() {
         }
         
         // Ctrl+I to insert row
-        if ((e.ctrlKey || e.metaKey) && e.key === 'i') {
+        if ((e.ctrlKey || e.metaKey) && e.key === 'i' && window.gridOperations) {
             e.preventDefault();
-            addRow();
+            window.gridOperations.addRow();
         }
         
         // Ctrl+Shift+I to insert column
-        if ((e.ctrlKey || e.metaKey) && e.shiftKey && e.key === 'I') {
+        if ((e.ctrlKey || e.metaKey) && e.shiftKey && e.key === 'I' && window.gridOperations) {
             e.preventDefault();
-            addColumn();
+            window.gridOperations.addColumn();
         }
     });
     
-    // Set up cell selection on sheet cells
+    // Set up cell selection on sheet cells, once per cell
+    const selectableCells = new WeakSet();
     const setupCellSelectionHandlers = () => {
         document.querySelectorAll('.sheet-cell').forEach(cell => {
+            if (selectableCells.has(cell)) return;
+            selectableCells.add(cell);
             cell.addEventListener('click', function(event) {
                 toggleCellSelection(this, false, event);
             });
@@ -671,372 +665,12 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Run setup after a short delay to ensure DOM is fully loaded
     setTimeout(setupCellSelectionHandlers, 500);
+    // Virtualized sheets build new rows as the user scrolls
+    document.addEventListener('sheet:rowsrendered', setupCellSelectionHandlers);
     
     console.log('Excel buttons initialized');
 });
 
-/**
- * Add a new row to the table
- */
-function addRow() {
-    const table = document.getElementById('sheetTable');
-    if (!table) return;
-    
-    const tbody = table.querySelector('tbody');
-    if (!tbody) return;
-    
-    const rows = tbody.querySelectorAll('tr');
-    const lastRowIndex = rows.length > 0 ? parseInt(rows[rows.length - 1].getAttribute('data-row')) : -1;
-    const newRowIndex = lastRowIndex + 1;
-    
-    // Get number of columns from header
-    const headerCells = table.querySelectorAll('thead th');
-    const numColumns = headerCells.length;
-    
-    // Create new row
-    const newRow = document.createElement('tr');
-    newRow.setAttribute('data-row', newRowIndex);
-    
-    // Create cells for the row
-    for (let col = 0; col < numColumns; col++) {
-        const cell = document.createElement('td');
-        cell.className = 'sheet-cell';
-        cell.setAttribute('data-row', newRowIndex);
-        cell.setAttribute('data-col', col);
-        
-        const editableDiv = document.createElement('div');
-        editableDiv.className = 'editable-cell';
-        editableDiv.contentEditable = true;
-        
-        // Add event listeners to make editing work
-        editableDiv.addEventListener('click', function(e) {
-            e.stopPropagation();
-            this.focus();
-            
-            // Update selection and formula bar
-            const parentCell = this.closest('.sheet-cell');
-            if (parentCell) {
-                clearSelection();
-                selectCell(parentCell);
-                updateSelectionInfo();
-                
-                const formulaBar = document.getElementById('formulaBar');
-                if (formulaBar) {
-                    formulaBar.value = this.textContent;
-                }
-            }
-        });
-        
-        editableDiv.addEventListener('input', function() {
-            const formulaBar = document.getElementById('formulaBar');
-            if (formulaBar) {
-                formulaBar.value = this.textContent;
-            }
-        });
-        
-        cell.appendChild(editableDiv);
-        
-        // Add cell selection event handler
-        cell.addEventListener('mousedown', function(e) {
-            if (e.target === this) {
-                if (!(e.ctrlKey || e.metaKey)) {
-                    clearSelection();
-                }
-                selectCell(this);
-                updateSelectionInfo();
-            }
-        });
-        
-        newRow.appendChild(cell);
-    }
-    
-    // Append the row
-    tbody.appendChild(newRow);
-    
-    // Show notification
-    showToast('Row added successfully', 'success');
-}
-
-/**
- * Add a new column to the table
- */
-function addColumn() {
-    const table = document.getElementById('sheetTable');
-    if (!table) return;
-    
-    // Get header row and all data rows
-    const headerRow = table.querySelector('thead tr');
-    const dataRows = table.querySelectorAll('tbody tr');
-    
-    if (!headerRow) return;
-    
-    const headerCells = headerRow.querySelectorAll('th');
-    const newColumnIndex = headerCells.length;
-    
-    // Create new header cell
-    const newHeaderCell = document.createElement('th');
-    newHeaderCell.className = 'sheet-header';
-    newHeaderCell.setAttribute('data-col', newColumnIndex);
-    newHeaderCell.style.width = '80px';
-    
-    // Create editable div for header
-    const headerEditableDiv = document.createElement('div');
-    headerEditableDiv.className = 'editable-cell';
-    headerEditableDiv.contentEditable = true;
-    
-    // Add event listeners for header editing
-    headerEditableDiv.addEventListener('click', function(e) {
-        e.stopPropagation();
-        this.focus();
-        
-        const parentCell = this.closest('.sheet-header');
-        if (parentCell) {
-            clearSelection();
-            selectCell(parentCell);
-            updateSelectionInfo();
-            
-            const formulaBar = document.getElementById('formulaBar');
-            if (formulaBar) {
-                formulaBar.value = this.textContent;
-            }
-        }
-    });
-    
-    headerEditableDiv.addEventListener('input', function() {
-        const formulaBar = document.getElementById('formulaBar');
-        if (formulaBar) {
-            formulaBar.value = this.textContent;
-        }
-    });
-    
-    newHeaderCell.appendChild(headerEditableDiv);
-    
-    // Add header cell selection handler
-    newHeaderCell.addEventListener('mousedown', function(e) {
-        if (e.target === this) {
-            if (!(e.ctrlKey || e.metaKey)) {
-                clearSelection();
-            }
-            selectCell(this);
-            updateSelectionInfo();
-        }
-    });
-    
-    // Add the header cell
-    headerRow.appendChild(newHeaderCell);
-    
-    // Add new column letter in column headers container
-    const columnHeadersContainer = document.getElementById('columnHeaders');
-    if (columnHeadersContainer) {
-        const colHeader = document.createElement('div');
-        colHeader.className = 'excel-column-header';
-        colHeader.setAttribute('data-col', newColumnIndex);
-        colHeader.textContent = columnIndexToLetter(newColumnIndex);
-        
-        // Create resize handle
-        const resizeHandle = document.createElement('div');
-        resizeHandle.className = 'col-resize-handle';
-        resizeHandle.setAttribute('data-col', newColumnIndex);
-        colHeader.appendChild(resizeHandle);
-        
-        columnHeadersContainer.appendChild(colHeader);
-    }
-    
-    // Add cell to each row
-    dataRows.forEach(row => {
-        const rowIndex = parseInt(row.getAttribute('data-row'));
-        
-        // Create new cell
-        const newCell = document.createElement('td');
-        newCell.className = 'sheet-cell';
-        newCell.setAttribute('data-row', rowIndex);
-        newCell.setAttribute('data-col', newColumnIndex);
-        
-        // Create editable div
-        const editableDiv = document.createElement('div');
-        editableDiv.className = 'editable-cell';
-        editableDiv.contentEditable = true;
-        
-        // Add event listeners
-        editableDiv.addEventListener('click', function(e) {
-            e.stopPropagation();
-            this.focus();
-            
-            const parentCell = this.closest('.sheet-cell');
-            if (parentCell) {
-                clearSelection();
-                selectCell(parentCell);
-                updateSelectionInfo();
-                
-                const formulaBar = document.getElementById('formulaBar');
-                if (formulaBar) {
-                    formulaBar.value = this.textContent;
-                }
-            }
-        });
-        
-        editableDiv.addEventListener('input', function() {
-            const formulaBar = document.getElementById('formulaBar');
-            if (formulaBar) {
-                formulaBar.value = this.textContent;
-            }
-        });
-        
-        newCell.appendChild(editableDiv);
-        
-        // Add cell selection
-        newCell.addEventListener('mousedown', function(e) {
-            if (e.target === this) {
-                if (!(e.ctrlKey || e.metaKey)) {
-                    clearSelection();
-                }
-                selectCell(this);
-                updateSelectionInfo();
-            }
-        });
-        
-        row.appendChild(newCell);
-    });
-    
-    // Show notification
-    showToast('Column added successfully', 'success');
-}
-
-/**
- * Delete selected row(s)
- */
-function deleteSelectedRow() {
-    if (window.selectedCells.length === 0) {
-        showToast('Please select at least one cell', 'error');
-        return;
-    }
-    
-    // Get all unique row indexes
-    const rowIndices = [...new Set(
-        window.selectedCells.map(cell => 
-            parseInt(cell.getAttribute('data-row'))
-        ).filter(row => !isNaN(row))
-    )].sort((a, b) => b - a); // Sort in descending order to delete from bottom up
-    
-    if (rowIndices.length === 0) {
-        showToast('No valid rows selected', 'error');
-        return;
-    }
-    
-    // Confirm deletion
-    if (!confirm(`Are you sure you want to delete ${rowIndices.length > 1 ? 'these rows' : 'this row'}?`)) {
-        return;
-    }
-    
-    // Delete rows
-    const table = document.getElementById('sheetTable');
-    const tbody = table.querySelector('tbody');
-    
-    rowIndices.forEach(rowIndex => {
-        const row = tbody.querySelector(`tr[data-row="${rowIndex}"]`);
-        if (row) {
-            row.remove();
-        }
-    });
-    
-    // Renumber remaining rows
-    const remainingRows = tbody.querySelectorAll('tr');
-    remainingRows.forEach((row, index) => {
-        row.setAttribute('data-row', index);
-        
-        // Update row cells
-        row.querySelectorAll('td').forEach(cell => {
-            cell.setAttribute('data-row', index);
-        });
-    });
-    
-    // Clear selection
-    clearSelection();
-    showToast('Row(s) deleted successfully', 'success');
-}
-
-/**
- * Delete selected column(s)
- */
-function deleteSelectedColumn() {
-    if (window.selectedCells.length === 0) {
-        showToast('Please select at least one cell', 'error');
-        return;
-    }
-    
-    // Get all unique column indexes
-    const colIndices = [...new Set(
-        window.selectedCells.map(cell => 
-            parseInt(cell.getAttribute('data-col'))
-        ).filter(col => !isNaN(col))
-    )].sort((a, b) => b - a); // Sort in descending order to delete from right to left
-    
-    if (colIndices.length === 0) {
-        showToast('No valid columns selected', 'error');
-        return;
-    }
-    
-    // Confirm deletion
-    if (!confirm(`Are you sure you want to delete ${colIndices.length > 1 ? 'these columns' : 'this column'}?`)) {
-        return;
-    }
-    
-    const table = document.getElementById('sheetTable');
-    const thead = table.querySelector('thead');
-    const columnHeaders = document.getElementById('columnHeaders');
-    
-    colIndices.forEach(colIndex => {
-        // Remove column header
-        const th = thead.querySelector(`th[data-col="${colIndex}"]`);
-        if (th) th.remove();
-        
-        // Remove column from column headers container
-        if (columnHeaders) {
-            const colHeader = columnHeaders.querySelector(`.excel-column-header[data-col="${colIndex}"]`);
-            if (colHeader) colHeader.remove();
-        }
-        
-        // Remove column cells
-        table.querySelectorAll(`td[data-col="${colIndex}"]`).forEach(cell => {
-            cell.remove();
-        });
-    });
-    
-    // Renumber remaining columns
-    const headCells = thead.querySelectorAll('th');
-    headCells.forEach((cell, index) => {
-        cell.setAttribute('data-col', index);
-    });
-    
-    // Update column header labels
-    if (columnHeaders) {
-        const colHeaders = columnHeaders.querySelectorAll('.excel-column-header');
-        colHeaders.forEach((header, index) => {
-            header.setAttribute('data-col', index);
-            header.textContent = columnIndexToLetter(index);
-            
-            // Update resize handle
-            const resizeHandle = header.querySelector('.col-resize-handle');
-            if (resizeHandle) {
-                resizeHandle.setAttribute('data-col', index);
-            }
-        });
-    }
-    
-    // Update all data cells
-    const rows = table.querySelectorAll('tbody tr');
-    rows.forEach(row => {
-        const cells = row.querySelectorAll('td');
-        cells.forEach((cell, index) => {
-            cell.setAttribute('data-col', index);
-        });
-    });
-    
-    // Clear selection
-    clearSelection();
-    showToast('Column(s) deleted successfully', 'success');
-}
-
 /**
  * Convert column index to letter (A, B, C, ... Z, AA, AB, etc.)
  */
@@ -1057,6 +691,9 @@ function columnIndexToLetter(index) {
  * Save sheet data
  */
 function saveSheetData() {
+    // The sheet editor saves through its patch queue and handles the save button itself
+    if (window.sheetPatches) return;
+    
     const sheetName = document.getElementById('sheetTable').getAttribute('data-sheet-name');
     const rows = document.querySelectorAll('#sheetTable tbody tr');
     const headers = document.querySelectorAll('#sheetTable thead th');
@@ -1083,19 +720,30 @@ function saveSheetData() {
         data.push(dataRow);
     });
     
-    // Send data to server
+    // Send data to server along with the version it was loaded at
+    const table = document.getElementById('sheetTable');
+    const baseVersion = parseInt(table.getAttribute('data-version'));
+    const payload = { data: data, base_version: isNaN(baseVersion) ? null : baseVersion };
+    if (window.sheetCodec) {
+        // Dictionary-encoded columns are much smaller for repetitive sheets
+        payload.data = window.sheetCodec.encodeColumns(data);
+        payload.encoding = 'columns';
+    }
     fetch(`/update_sheet/${sheetName}`, {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json',
             'X-CSRFToken': document.querySelector('meta[name="csrf-token"]').getAttribute('content')
         },
-        body: JSON.stringify({ data: data })
+        body: JSON.stringify(payload)
     })
     .then(response => response.json())
     .then(data => {
         if (data.success) {
+            if (data.version) table.setAttribute('data-version', data.version);
             showToast('Sheet saved successfully', 'success');
+        } else if (data.conflict) {
+            showToast('This sheet was changed elsewhere. Reload the page to see the latest version before saving.', 'error');
         } else {
             showToast('Error saving sheet: ' + data.message, 'error');
         }
@@ -331,7 +331,11 @@ document.addEventListener('DOMContentLoaded', function() {
             item.addEventListener('click', function() {
                 const editableDiv = cell.querySelector('.editable-cell');
                 if (editableDiv) {
-                    editableDiv.textContent = value;
+                    if (typeof window.setCellValue === 'function') {
+                        window.setCellValue(editableDiv, value);
+                    } else {
+                        editableDiv.textContent = value;
+                    }
                     validateCell(cell);
                 }
                 dropdown.remove();
@@ -25,17 +25,25 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
-    // Get all editable cells
-    const editableCells = document.querySelectorAll('.editable-cell');
-    editableCells.forEach(cell => {
-        cell.addEventListener('blur', function() {
-            if (this.textContent.trim().startsWith('=')) {
-                // This is a formula - try to evaluate it
-                const cellElement = this.closest('.sheet-cell, .sheet-header');
-                evaluateFormula(this.textContent, cellElement);
-            }
+    // Evaluate formulas typed into editable cells, once per cell
+    const formulaCells = new WeakSet();
+    function setupFormulaCells() {
+        document.querySelectorAll('.editable-cell').forEach(cell => {
+            if (formulaCells.has(cell)) return;
+            formulaCells.add(cell);
+            cell.addEventListener('blur', function() {
+                if (this.textContent.trim().startsWith('=')) {
+                    // This is a formula - try to evaluate it
+                    const cellElement = this.closest('.sheet-cell, .sheet-header');
+                    evaluateFormula(this.textContent, cellElement);
+                }
+            });
         });
-    });
+    }
+    
+    setupFormulaCells();
+    // Virtualized sheets build new rows as the user scrolls
+    document.addEventListener('sheet:rowsrendered', setupFormulaCells);
     
     /**
      * Apply formula to the currently selected cell
@@ -50,7 +58,11 @@ document.addEventListener('DOMContentLoaded', function() {
         const editableDiv = cell.querySelector('.editable-cell');
         if (!editableDiv) return;
         
-        editableDiv.textContent = formula;
+        if (typeof window.setCellValue === 'function') {
+            window.setCellValue(editableDiv, formula);
+        } else {
+            editableDiv.textContent = formula;
+        }
         editableDiv.classList.add('has-formula');
         
         evaluateFormula(formula, cell);
@@ -302,6 +314,8 @@ document.addEventListener('DOMContentLoaded', function() {
     function evaluateAllFormulas() {
         const cellsWithFormulas = document.querySelectorAll('.sheet-cell[data-formula], .sheet-header[data-formula]');
         cellsWithFormulas.forEach(cell => {
+            // Results already shown (e.g. in virtualized rows) come from the server's formula engine
+            if (cell.querySelector('.formula-result')) return;
             const formula = cell.getAttribute('data-formula');
             if (formula && formula.trim().startsWith('=')) {
                 evaluateFormula(formula, cell);
@@ -17,6 +17,9 @@ document.addEventListener('DOMContentLoaded', function() {
         
         // Add context menu items if context menu exists
         addContextMenuItems();
+        
+        // The one implementation of each row/column edit, for keyboard shortcuts in other scripts
+        window.gridOperations = { addRow, addColumn, deleteSelectedRow, deleteSelectedColumn };
     }
     
     /**
@@ -90,8 +93,10 @@ document.addEventListener('DOMContentLoaded', function() {
         const headerCells = table.querySelectorAll('thead th');
         const columnCount = headerCells.length;
         
-        // Determine next row index
-        const nextRowIndex = parseInt(lastRow.getAttribute('data-row')) + 1;
+        // Determine next row index (virtualized sheets only render part of the rows)
+        const nextRowIndex = window.sheetVirtualGrid ?
+            window.sheetVirtualGrid.totalRows :
+            parseInt(lastRow.getAttribute('data-row')) + 1;
         
         // Create new row
         const newRow = document.createElement('tr');
@@ -135,6 +140,9 @@ document.addEventListener('DOMContentLoaded', function() {
         // Add the row to the table
         tbody.appendChild(newRow);
         
+        // Queue the matching server-side patch (grid row 0 is the header row)
+        queuePatch({ op: 'insert_row', index: nextRowIndex + 1 });
+        
         // Update any selection related functionality
         if (window.updateSelectionInfo) {
             window.updateSelectionInfo();
@@ -191,6 +199,9 @@ document.addEventListener('DOMContentLoaded', function() {
         // Add header cell to the header row
         headerRow.appendChild(headerCell);
         
+        // Queue the matching server-side patch
+        queuePatch({ op: 'insert_col', index: nextColIndex });
+        
         // Add column cells to each data row
         dataRows.forEach(row => {
             const rowIndex = parseInt(row.getAttribute('data-row'));
@@ -286,6 +297,7 @@ document.addEventListener('DOMContentLoaded', function() {
         
         // Remove the row
         tbody.removeChild(row);
+        queuePatch({ op: 'delete_row', index: rowIndex + 1 });
         
         // Update data-row attributes for subsequent rows
         const remainingRows = tbody.querySelectorAll('tr');
@@ -374,6 +386,7 @@ document.addEventListener('DOMContentLoaded', function() {
         
         // Update data-col attributes for subsequent columns
         updateColumnIndices(colIndex);
+        queuePatch({ op: 'delete_col', index: colIndex });
         
         // Clear selection
         if (window.clearCellSelection) {
@@ -470,6 +483,15 @@ document.addEventListener('DOMContentLoaded', function() {
         return result;
     }
     
+    /**
+     * Send a structural change to the editor's patch queue
+     */
+    function queuePatch(patch) {
+        if (window.sheetPatches) {
+            window.sheetPatches.queue(patch);
+        }
+    }
+    
     /**
      * Show toast notification
      */
@@ -218,7 +218,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 if (cell) {
                     const editableDiv = cell.querySelector('.editable-cell');
                     if (editableDiv) {
-                        editableDiv.textContent = rowData[j];
+                        setCellText(editableDiv, rowData[j]);
                     }
                 }
             }
@@ -227,6 +227,17 @@ document.addEventListener('DOMContentLoaded', function() {
         showToast('Pasted data', 'success');
     }
     
+    /**
+     * Set a cell's text and record the edit, as typing into it would
+     */
+    function setCellText(editableDiv, value) {
+        if (typeof window.setCellValue === 'function') {
+            window.setCellValue(editableDiv, value);
+        } else {
+            editableDiv.textContent = value;
+        }
+    }
+    
     /**
      * Get cell at specified row and column
      */
@@ -271,7 +282,7 @@ document.addEventListener('DOMContentLoaded', function() {
         window.selectedCells.forEach(cell => {
             const editableDiv = cell.querySelector('.editable-cell');
             if (editableDiv) {
-                editableDiv.textContent = '';
+                setCellText(editableDiv, '');
             }
         });
         
@@ -478,7 +489,7 @@ document.addEventListener('DOMContentLoaded', function() {
             editableDiv.focus();
             
             // Clear existing content and set to the pressed key
-            editableDiv.textContent = e.key;
+            setCellText(editableDiv, e.key);
             
             // Position cursor at the end
             const range = document.createRange();
@@ -2,6 +2,8 @@
  * Excel export functionality to ensure files download properly
  */
 document.addEventListener('DOMContentLoaded', function() {
+    const POLL_INTERVAL = 1500;
+    
     // Attach event handlers to export links
     initializeExportLinks();
     
@@ -21,9 +23,15 @@ document.addEventListener('DOMContentLoaded', function() {
     function handleExport(e) {
         e.preventDefault();
         
-        // Get export URL and format
+        // Get export URL and format (/export_sheet/<sheet_name>/<format_type>)
         const url = this.getAttribute('href');
-        const format = url.split('format_type=')[1];
+        const format = url.split('?')[0].split('/').pop();
+        
+        // Large sheets are rendered by a background job instead of the request
+        if (shouldExportInBackground()) {
+            startBackgroundExport(url.replace('/export_sheet/', '/start_export/'), format);
+            return;
+        }
         
         // Show loading indicator
         showToast(`Preparing ${format.toUpperCase()} export...`, 'info');
@@ -59,6 +67,66 @@ document.addEventListener('DOMContentLoaded', function() {
         }, 3000);
     }
     
+    /**
+     * Whether the sheet is above the size the server renders in the background
+     */
+    function shouldExportInBackground() {
+        const table = document.getElementById('sheetTable');
+        if (!table) return false;
+        
+        const cells = parseInt(table.getAttribute('data-export-cells')) || 0;
+        const threshold = parseInt(table.getAttribute('data-async-export-cells')) || 0;
+        return threshold > 0 && cells >= threshold;
+    }
+    
+    /**
+     * Queue an export job, poll until it finishes and then download the file
+     */
+    function startBackgroundExport(startUrl, format) {
+        showToast(`Preparing ${format.toUpperCase()} export in the background...`, 'info');
+        
+        fetch(startUrl, {
+            method: 'POST',
+            headers: {
+                'X-CSRFToken': document.querySelector('meta[name="csrf-token"]').getAttribute('content')
+            }
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) throw new Error(data.message);
+            pollExportJob(data.status_url, format);
+        })
+        .catch(error => {
+            console.error('Error starting export:', error);
+            showToast(`Could not start the export: ${error.message}`, 'error');
+        });
+    }
+    
+    function pollExportJob(statusUrl, format) {
+        fetch(statusUrl)
+            .then(response => response.json())
+            .then(data => {
+                if (!data.success) throw new Error(data.message);
+                
+                if (data.status === 'done') {
+                    window.location.href = data.download_url;
+                    showToast(`${format.toUpperCase()} export completed! Check your downloads folder.`, 'success');
+                } else if (data.status === 'failed') {
+                    throw new Error(data.message || 'Export failed');
+                } else {
+                    if (data.total) {
+                        const percent = Math.floor(data.progress * 100 / data.total);
+                        console.log(`${format.toUpperCase()} export: ${percent}%`);
+                    }
+                    setTimeout(() => pollExportJob(statusUrl, format), POLL_INTERVAL);
+                }
+            })
+            .catch(error => {
+                console.error('Error exporting sheet:', error);
+                showToast(`Export failed: ${error.message}`, 'error');
+            });
+    }
+    
     /**
      * Show toast notification
      */
@@ -0,0 +1,61 @@
+/**
+ * Column layout used to send sheet rows between the editor and the server.
+ * Mirrors sheet_codec.py: each column keeps its distinct values once plus a
+ * list of integer codes when that is smaller, and row widths are stored as
+ * runs so ragged rows round-trip exactly.
+ */
+(function() {
+    function encodeColumns(rows) {
+        const widths = [];
+        const columns = [];
+        rows.forEach(row => {
+            const last = widths[widths.length - 1];
+            if (last && last[0] === row.length) {
+                last[1]++;
+            } else {
+                widths.push([row.length, 1]);
+            }
+            row.forEach((value, col) => {
+                if (!columns[col]) columns[col] = [];
+                columns[col].push(value);
+            });
+        });
+        return { widths: widths, columns: columns.map(encodeColumn) };
+    }
+
+    function encodeColumn(values) {
+        const lookup = new Map();
+        const codes = [];
+        for (const value of values) {
+            let code = lookup.get(value);
+            if (code === undefined) {
+                code = lookup.size;
+                lookup.set(value, code);
+                if (lookup.size * 2 > values.length) return { values: values };
+            }
+            codes.push(code);
+        }
+        return { dict: Array.from(lookup.keys()), codes: codes };
+    }
+
+    function decodeColumns(payload) {
+        const columns = payload.columns.map(column => {
+            if (column.values) return column.values;
+            return column.codes.map(code => column.dict[code]);
+        });
+        const positions = columns.map(() => 0);
+        const rows = [];
+        payload.widths.forEach(([width, count]) => {
+            for (let i = 0; i < count; i++) {
+                const row = new Array(width);
+                for (let col = 0; col < width; col++) {
+                    row[col] = columns[col][positions[col]++];
+                }
+                rows.push(row);
+            }
+        });
+        return rows;
+    }
+
+    window.sheetCodec = { encodeColumns, decodeColumns };
+})();
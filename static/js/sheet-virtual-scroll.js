@@ -0,0 +1,206 @@
+/**
+ * Virtualized row rendering for large sheets.
+ * Only the rows in the viewport (plus an overscan) exist in the DOM; the rest
+ * are fetched from /sheet_rows in blocks as the user scrolls. Formula cells
+ * show the results the server computed, like cells the editor recalculates.
+ * Each render dispatches 'sheet:rowsrendered' so per-cell handlers can be
+ * attached to the new rows.
+ */
+document.addEventListener('DOMContentLoaded', function() {
+    const table = document.getElementById('sheetTable');
+    if (!table || table.getAttribute('data-virtual') !== 'true') return;
+
+    const workspace = document.querySelector('.excel-workspace');
+    const tbody = table.querySelector('tbody');
+    const sheetName = table.getAttribute('data-sheet-name');
+    const BLOCK_SIZE = parseInt(table.getAttribute('data-row-block')) || 200;
+    const OVERSCAN = 20;
+    const DEFAULT_ROW_HEIGHT = 28;
+
+    let totalRows = parseInt(table.getAttribute('data-total-rows')) || 0;
+    let rowHeight = DEFAULT_ROW_HEIGHT;
+    let renderedRange = { start: -1, end: -1 };
+    let frameRequested = false;
+
+    // Block index -> array of rows, and block index -> in-flight request
+    const blocks = new Map();
+    const loading = new Map();
+    // Grid "row:col" -> computed result of a formula cell (grid row 0 is the header)
+    const computed = new Map(Object.entries(JSON.parse(table.getAttribute('data-computed') || '{}')));
+
+    table.classList.add('virtual-sheet');
+    seedFromDom();
+    render();
+
+    workspace.addEventListener('scroll', scheduleRender, { passive: true });
+    window.addEventListener('resize', scheduleRender);
+
+    // Keep the cache in sync with edits so re-rendered rows show them
+    tbody.addEventListener('input', function(e) {
+        const cell = e.target.closest('td[data-row][data-col]');
+        if (!cell) return;
+        const rowIndex = parseInt(cell.getAttribute('data-row'));
+        const row = getCachedRow(rowIndex);
+        if (row) {
+            const col = parseInt(cell.getAttribute('data-col'));
+            while (row.length <= col) row.push('');
+            row[col] = e.target.textContent;
+            // The server sends the new result once the edit is saved
+            computed.delete(`${rowIndex + 1}:${col}`);
+        }
+    });
+
+    /**
+     * Use the rows rendered by the server as the first block
+     */
+    function seedFromDom() {
+        const rows = [];
+        tbody.querySelectorAll('tr[data-row]').forEach(tr => {
+            rows.push(Array.from(tr.querySelectorAll('td')).map(td => td.textContent.trim()));
+        });
+        blocks.set(0, rows);
+
+        const firstRow = tbody.querySelector('tr[data-row]');
+        if (firstRow && firstRow.offsetHeight) {
+            rowHeight = firstRow.offsetHeight;
+        }
+    }
+
+    function scheduleRender() {
+        if (frameRequested) return;
+        frameRequested = true;
+        requestAnimationFrame(function() {
+            frameRequested = false;
+            render();
+        });
+    }
+
+    /**
+     * Render the visible window, fetching any missing blocks first
+     */
+    function render(force) {
+        const tableTop = table.offsetTop + (table.tHead ? table.tHead.offsetHeight : 0);
+        const scrollTop = Math.max(workspace.scrollTop - tableTop, 0);
+        const start = Math.max(Math.floor(scrollTop / rowHeight) - OVERSCAN, 0);
+        const end = Math.min(Math.ceil((scrollTop + workspace.clientHeight) / rowHeight) + OVERSCAN, totalRows);
+
+        if (!force && start === renderedRange.start && end === renderedRange.end) return;
+
+        const missing = [];
+        for (let block = Math.floor(start / BLOCK_SIZE); block * BLOCK_SIZE < end; block++) {
+            if (!blocks.has(block)) missing.push(fetchBlock(block));
+        }
+        if (missing.length) {
+            // Only re-render when something arrived, so a failing request can't loop
+            Promise.all(missing).then(loaded => {
+                if (loaded.some(Boolean)) render(true);
+            });
+        }
+
+        // Remember the cell being edited so it can be focused again after re-rendering
+        const focusedCell = tbody.contains(document.activeElement) ?
+            document.activeElement.closest('td[data-row][data-col]') : null;
+
+        const columnCount = table.querySelectorAll('thead th').length;
+        const fragment = document.createDocumentFragment();
+        for (let rowIndex = start; rowIndex < end; rowIndex++) {
+            fragment.appendChild(buildRow(rowIndex, getCachedRow(rowIndex), columnCount));
+        }
+
+        tbody.replaceChildren(fragment);
+        table.style.setProperty('--virtual-top', (start * rowHeight) + 'px');
+        table.style.setProperty('--virtual-bottom', ((totalRows - end) * rowHeight) + 'px');
+        renderedRange = { start, end };
+
+        if (focusedCell) {
+            const selector = `td[data-row="${focusedCell.getAttribute('data-row')}"][data-col="${focusedCell.getAttribute('data-col')}"] .editable-cell`;
+            const editable = tbody.querySelector(selector);
+            if (editable) editable.focus();
+        }
+
+        document.dispatchEvent(new CustomEvent('sheet:rowsrendered', { detail: renderedRange }));
+    }
+
+    function buildRow(rowIndex, values, columnCount) {
+        const tr = document.createElement('tr');
+        tr.setAttribute('data-row', rowIndex);
+        if (!values) tr.classList.add('virtual-loading');
+
+        for (let col = 0; col < columnCount; col++) {
+            const td = document.createElement('td');
+            td.className = 'sheet-cell';
+            td.setAttribute('data-row', rowIndex);
+            td.setAttribute('data-col', col);
+
+            const editableDiv = document.createElement('div');
+            editableDiv.className = 'editable-cell';
+            editableDiv.contentEditable = values ? 'true' : 'false';
+            const raw = values && values[col] !== undefined ? String(values[col]) : '';
+            const key = `${rowIndex + 1}:${col}`;
+            if (raw.startsWith('=') && computed.has(key)) {
+                // Same markup showComputedValues gives formula cells after a save
+                td.setAttribute('data-formula', raw);
+                editableDiv.textContent = computed.get(key);
+                editableDiv.classList.add('formula-result');
+                editableDiv.setAttribute('title', raw);
+            } else {
+                editableDiv.textContent = raw;
+            }
+
+            td.appendChild(editableDiv);
+            tr.appendChild(td);
+        }
+        return tr;
+    }
+
+    function getCachedRow(rowIndex) {
+        const block = blocks.get(Math.floor(rowIndex / BLOCK_SIZE));
+        return block ? block[rowIndex % BLOCK_SIZE] : undefined;
+    }
+
+    function fetchBlock(block) {
+        if (loading.has(block)) return loading.get(block);
+
+        const params = new URLSearchParams({ offset: block * BLOCK_SIZE, limit: BLOCK_SIZE, encoding: 'columns' });
+        const request = fetch(`/sheet_rows/${encodeURIComponent(sheetName)}?${params}`)
+            .then(response => response.json())
+            .then(data => {
+                if (!data.success) throw new Error(data.message);
+                blocks.set(block, data.encoding === 'columns' ? window.sheetCodec.decodeColumns(data.columns) : data.rows);
+                Object.entries(data.values || {}).forEach(([key, value]) => computed.set(key, value));
+                totalRows = data.total_rows;
+                return true;
+            })
+            .catch(error => {
+                console.error('Error loading rows:', error);
+                return false;
+            })
+            .finally(() => loading.delete(block));
+
+        loading.set(block, request);
+        return request;
+    }
+
+    /**
+     * Drop cached rows and re-render from the server, e.g. after rows were inserted or deleted
+     */
+    function reload() {
+        blocks.clear();
+        computed.clear();
+        render(true);
+    }
+
+    /**
+     * Remember formula results from a save ("row:col" -> value) for rows rendered later
+     */
+    function setComputedValues(values) {
+        Object.entries(values).forEach(([key, value]) => computed.set(key, value));
+    }
+
+    window.sheetVirtualGrid = {
+        reload,
+        setComputedValues,
+        get totalRows() { return totalRows; },
+        set totalRows(value) { totalRows = value; }
+    };
+});
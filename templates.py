@@ -1,10 +1,15 @@
 """
 Templates module for Excel Generator.
-This module provides built-in templates for creating sheets.
+This module provides built-in templates for creating sheets. The catalog is
+built once at import and never changes afterwards, so every derived value
+(sample data string, JSON payload, ETag) is computed up front.
 """
+import hashlib
+import json
+from types import MappingProxyType
 
 class SheetTemplate:
-    """Represents a template for creating new sheets"""
+    """Represents a template for creating new sheets. Instances are read-only."""
     
     def __init__(self, id, name, headers=None, sample_data=None, default_sheet_name=None, description=None):
         """
@@ -18,20 +23,33 @@ class SheetTemplate:
             default_sheet_name: Default name for sheets created from this template
             description: Description of the template
         """
-        self.id = id
-        self.name = name
-        self.headers = headers or []
-        self.sample_data = sample_data or []
-        self.default_sheet_name = default_sheet_name or name
-        self.description = description or ""
-        self.sample_data_string = ""  # Will be computed when needed
+        set_attr = super().__setattr__
+        set_attr('id', id)
+        set_attr('name', name)
+        set_attr('headers', tuple(headers or ()))
+        set_attr('sample_data', tuple(tuple(row) for row in sample_data or ()))
+        set_attr('default_sheet_name', default_sheet_name or name)
+        set_attr('description', description or "")
+        set_attr('sample_data_string', ';'.join(','.join(map(str, row)) for row in self.sample_data))
+        
+        # Response body of /get_template/<id> and its ETag
+        payload = json.dumps({
+            'success': True,
+            'headers': ','.join(self.headers),
+            'sample_data': self.sample_data_string
+        }).encode('utf-8')
+        set_attr('json_payload', payload)
+        set_attr('etag', hashlib.sha1(payload).hexdigest())
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"SheetTemplate is read-only (tried to set {name!r})")
 
     def __str__(self):
         return f"Template: {self.name} ({len(self.headers)} columns)"
 
-def get_built_in_templates():
-    """Return a list of built-in sheet templates"""
-    templates = [
+def _build_templates():
+    """Construct the built-in sheet templates"""
+    return [
         # Assignment Tracker
         SheetTemplate(
             id="1",
@@ -128,13 +146,15 @@ def get_built_in_templates():
             description="Track employee attendance and calculate overtime"
         )
     ]
-    
-    # Pre-compute sample_data_string for each template
-    for template in templates:
-        if template.sample_data:
-            rows = []
-            for row in template.sample_data:
-                rows.append(','.join(map(str, row)))
-            template.sample_data_string = ';'.join(rows)
-    
-    return templates
+
+# Built once per process; shared by every request
+BUILT_IN_TEMPLATES = tuple(_build_templates())
+TEMPLATES_BY_ID = MappingProxyType({template.id: template for template in BUILT_IN_TEMPLATES})
+
+def get_built_in_templates():
+    """Return the built-in sheet templates"""
+    return BUILT_IN_TEMPLATES
+
+def get_built_in_template(template_id):
+    """Return the built-in template with the given id, or None"""
+    return TEMPLATES_BY_ID.get(str(template_id))
@@ -0,0 +1,143 @@
+import json
+import random
+
+import pytest
+
+from formula_engine import FormulaEngine, GridReader, format_value
+
+COLUMNS = 'ABCDE'
+
+
+def full_values(grid):
+    """Display values of a fresh engine that recomputes every formula"""
+    engine = FormulaEngine.from_rows(grid)
+    engine.recalculate()
+    return displayed(engine)
+
+
+def displayed(engine):
+    return {cell: format_value(value) for cell, value in engine.values.items()}
+
+
+def reload(engine, grid):
+    """Rebuild an engine from its cache after a trip through JSON, as a Sheet save does"""
+    formulas, values, typed = json.loads(json.dumps(engine.to_cache()))
+    return FormulaEngine.from_cache(GridReader(grid), formulas, values, typed=typed)
+
+
+def random_ref(rng, rows):
+    return f'{rng.choice(COLUMNS)}{rng.randint(1, rows)}'
+
+
+def random_cell(rng, rows):
+    kind = rng.random()
+    if kind < 0.1:
+        return f'={random_ref(rng, rows)}+{random_ref(rng, rows)}'
+    if kind < 0.2:
+        return f'=SUM({random_ref(rng, rows)}:{random_ref(rng, rows)})'
+    if kind < 0.25:
+        return f'=IF({random_ref(rng, rows)}>3,{random_ref(rng, rows)},1)'
+    if kind < 0.3:
+        return f'=AVERAGE({random_ref(rng, rows)}:{random_ref(rng, rows)})'
+    if kind < 0.35:
+        return f'=SUM({rng.choice(COLUMNS)}:{rng.choice(COLUMNS)})'
+    if kind < 0.4:
+        return f'={random_ref(rng, rows)}>2'
+    if kind < 0.45:
+        return f'="0"&{random_ref(rng, rows)}'
+    if kind < 0.5:
+        return f'={random_ref(rng, rows)}/3'
+    if kind < 0.85:
+        return str(rng.randint(-5, 9))
+    return ''
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_incremental_matches_full_recalculation(seed):
+    rng = random.Random(seed)
+    rows = rng.randint(2, 7)
+    grid = [[random_cell(rng, rows) for _ in COLUMNS] for _ in range(rows)]
+    engine = FormulaEngine.from_rows(grid)
+    engine.recalculate()
+
+    for step in range(8):
+        if step % 2:
+            engine = reload(engine, grid)
+        row, col = rng.randrange(rows), rng.randrange(len(COLUMNS))
+        grid[row][col] = random_cell(rng, rows)
+        engine.update_cell(row, col, grid[row][col])
+        engine.recalculate({(row, col)})
+        assert displayed(engine) == full_values(grid)
+
+
+def test_incremental_matches_full_recalculation_around_nested_cycles():
+    # E5 reads D4, whose column range reaches back to E5 through B5; a plain
+    # depth-first search found that cycle or not depending on where it started
+    grid = [
+        ['', '', '', '', ''],
+        ['', '-2', '=IF(C3>3,D1,1)', '', ''],
+        ['=SUM(A2:A1)', '=IF(C3>3,C2,1)', '', '=AVERAGE(B5:B1)', '=IF(C3>3,B6,1)'],
+        ['', '', '=IF(E7>3,D2,1)', '=SUM(A:B)', ''],
+        ['', '=SUM(A:E)', '=B7+A1', '', '=IF(C6>3,D4,1)'],
+        ['', '', '', '', ''],
+        ['=AVERAGE(A3:C6)', '=IF(C6>3,A7,1)', '=E6+A2', '=IF(E2>3,C7,1)', '=D1+B2'],
+    ]
+    engine = FormulaEngine.from_rows(grid)
+    engine.recalculate()
+
+    grid[1][1] = '=D2+A4'
+    engine.update_cell(1, 1, '=D2+A4')
+    engine.recalculate({(1, 1)})
+    assert displayed(engine) == full_values(grid)
+    assert displayed(engine)[(4, 4)] == '#CIRC!'
+
+
+@pytest.mark.parametrize('formula, expected', [
+    ('=A2*3', '3'),          # TRUE counts as 1
+    ('=A3&"x"', '007x'),     # text that looks like a number stays text
+    ('=A4=1/3', 'TRUE'),     # full precision, not the displayed 0.333333333333333
+    ('=SUM(A2:A3)', '0'),    # ranges skip logical values and text
+    ('=COUNT(A4:A5)', '1'),
+])
+def test_cached_results_keep_their_type(formula, expected):
+    grid = [['x'], ['=1>0'], ['="007"'], ['=1/3'], ['=""'], ['']]
+    engine = FormulaEngine.from_rows(grid)
+    engine.recalculate()
+    engine = reload(engine, grid)
+
+    grid[5][0] = formula
+    engine.update_cell(5, 0, formula)
+    engine.recalculate({(5, 0)})
+    assert engine.display_value(5, 0) == expected
+    assert displayed(engine) == full_values(grid)
+
+
+@pytest.mark.parametrize('grid, expected', [
+    # Two-cell cycle, and a cell that reads it
+    ([['=B1', '=A1', '=A1+1']], {(0, 0): '#CIRC!', (0, 1): '#CIRC!', (0, 2): '#CIRC!'}),
+    # Cycle through a branch of IF that is never taken
+    ([['=B1+C1', '=A1', '=IF(1>2,B1,5)']], {(0, 0): '#CIRC!', (0, 1): '#CIRC!', (0, 2): '#CIRC!'}),
+    # A range that includes the formula itself
+    ([['1'], ['2'], ['=SUM(A1:A3)']], {(2, 0): '#CIRC!'}),
+    ([['=A1']], {(0, 0): '#CIRC!'}),
+    # Long chain, no cycle
+    ([['1'], ['=A1+1'], ['=A2+1'], ['=A3+1']], {(1, 0): '2', (2, 0): '3', (3, 0): '4'}),
+])
+def test_cycles(grid, expected):
+    assert full_values(grid) == expected
+
+
+def test_breaking_and_closing_a_cycle_incrementally():
+    grid = [['=B1', '=A1', '=A1*2']]
+    engine = FormulaEngine.from_rows(grid)
+    engine.recalculate()
+
+    grid[0][1] = '5'
+    engine.update_cell(0, 1, '5')
+    engine.recalculate({(0, 1)})
+    assert displayed(engine) == {(0, 0): '5', (0, 2): '10'}
+
+    grid[0][1] = '=C1'
+    engine.update_cell(0, 1, '=C1')
+    engine.recalculate({(0, 1)})
+    assert displayed(engine) == {(0, 0): '#CIRC!', (0, 1): '#CIRC!', (0, 2): '#CIRC!'}
@@ -0,0 +1,47 @@
+import pytest
+from werkzeug.security import generate_password_hash
+
+from password_policy import PasswordHasher, normalize_method
+
+
+def stored(method, salt_length=16):
+    return generate_password_hash('secret', method, salt_length)
+
+
+@pytest.mark.parametrize('method, expected', [
+    ('pbkdf2', 'pbkdf2:sha256:1000000'),
+    ('pbkdf2:sha512', 'pbkdf2:sha512:1000000'),
+    ('scrypt', 'scrypt:32768:8:1'),
+])
+def test_normalize_method(method, expected):
+    assert normalize_method(method) == expected
+
+
+@pytest.mark.parametrize('password_hash, expected', [
+    (stored('pbkdf2:sha256:1000'), False),
+    (stored('pbkdf2:sha256:999'), True),
+    (stored('pbkdf2:sha256:5000'), False),          # stronger hashes are kept
+    (stored('pbkdf2:sha256:1000', 8), True),
+    (stored('pbkdf2:sha256:5000', 32), False),
+    (stored('pbkdf2:sha512:5000'), True),           # another hash function
+    (stored('scrypt:1024:8:1'), True),              # another algorithm
+    ('plain-text', True),
+    (None, True),
+])
+def test_needs_rehash_only_for_weaker_hashes(password_hash, expected):
+    hasher = PasswordHasher('pbkdf2:sha256:1000', salt_length=16)
+    assert hasher.needs_rehash(password_hash) is expected
+
+
+def test_scrypt_cost():
+    hasher = PasswordHasher('scrypt:1024:8:1')
+    assert hasher.needs_rehash(stored('scrypt:512:8:1'))
+    assert not hasher.needs_rehash(stored('scrypt:2048:8:1'))
+
+
+def test_hash_and_verify():
+    hasher = PasswordHasher('pbkdf2:sha256:1000')
+    password_hash = hasher.hash('secret')
+    assert hasher.verify(password_hash, 'secret')
+    assert not hasher.verify(password_hash, 'wrong')
+    assert not hasher.needs_rehash(password_hash)
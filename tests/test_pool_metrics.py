@@ -0,0 +1,34 @@
+from sqlalchemy.pool import StaticPool
+
+from app_updated import create_app, db, pool_metrics
+from pool_metrics import InstrumentedQueuePool, engine_options
+
+OPTIONS = {'pool_size': 5, 'max_overflow': 10, 'pool_timeout': 10.0,
+           'pool_recycle': 280, 'pool_pre_ping': True}
+
+
+def test_pooled_backends_use_the_instrumented_pool():
+    for url in ('mysql+pymysql://user@db/app', 'sqlite:////tmp/app.db'):
+        assert engine_options(url, OPTIONS) == dict(OPTIONS, poolclass=InstrumentedQueuePool)
+
+
+def test_in_memory_sqlite_drops_queue_pool_options():
+    for url in ('sqlite://', 'sqlite:///:memory:'):
+        assert engine_options(url, OPTIONS) == {'pool_recycle': 280, 'pool_pre_ping': True}
+
+
+def test_app_runs_on_in_memory_sqlite():
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    with app.app_context():
+        assert isinstance(db.engine.pool, StaticPool)
+        db.create_all()
+        assert db.session.execute(db.text('SELECT 1')).scalar() == 1
+        assert 'pool_size' not in pool_metrics.stats()
+
+
+def test_app_times_checkouts_on_file_sqlite(tmp_path):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "app.db"}'})
+    with app.app_context():
+        assert isinstance(db.engine.pool, InstrumentedQueuePool)
+        db.session.execute(db.text('SELECT 1'))
+        assert pool_metrics.stats()['pool_size'] == 5
@@ -0,0 +1,42 @@
+import time
+
+import pytest
+
+from app_updated import create_app, db, User, SessionUser, user_cache
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "users.db"}'})
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username='owner', email='owner@example.com', password_hash='-'))
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_snapshot_is_trusted_for_a_few_seconds(app):
+    assert app.config['SESSION_PRINCIPAL_SECONDS'] <= 10
+    data = SessionUser(1, 'owner', 'owner@example.com', None, None).to_session()
+    assert SessionUser.from_session(data, 1, 5).username == 'owner'
+    assert SessionUser.from_session(data, 2, 5) is None
+    data['loaded_at'] = time.time() - 6
+    assert SessionUser.from_session(data, 1, 5) is None
+
+
+def test_deleted_user_loses_access_once_the_snapshot_expires(app):
+    user = User.query.one()
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)
+        session['_fresh'] = True
+        session['principal'] = dict(SessionUser.from_user(user).to_session(),
+                                    loaded_at=time.time() - app.config['SESSION_PRINCIPAL_SECONDS'] - 1)
+    db.session.delete(user)
+    db.session.commit()
+    user_cache.invalidate(user.id)
+
+    response = client.get('/sheet_rows/Sheet')
+    assert response.status_code in (302, 401)
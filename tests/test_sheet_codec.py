@@ -0,0 +1,68 @@
+import pytest
+
+from sheet_codec import CODECS, to_columns, from_columns, pack_rows, unpack_rows, SheetCodecError
+
+GRIDS = [
+    [],
+    [[]],
+    [[], []],
+    [['Name', 'Amount'], ['Food', '12.50'], ['Food', '3'], ['Rent', '800']],
+    # Ragged rows, including an empty one
+    [['a', 'b', 'c'], ['d'], [], ['e', 'f'], ['g', 'h', 'i', 'j']],
+    # Values that compare equal but have different types stay distinct
+    [[1, 1.0, True], [1, 1.0, True], [0, 0.0, False], [None, '', '1']],
+    # Unhashable cells
+    [[[1, 2], {'k': 'v'}], [[1, 2], {'k': 'v'}]],
+    [['', 'Credit Card'] for _ in range(50)],
+    [['héllo', '数字', '🙂']],
+]
+
+
+@pytest.mark.parametrize('rows', GRIDS)
+def test_column_layout_round_trip(rows):
+    assert from_columns(to_columns(rows)) == rows
+
+
+@pytest.mark.parametrize('codec', sorted(CODECS))
+@pytest.mark.parametrize('rows', GRIDS)
+def test_packed_round_trip(rows, codec):
+    assert unpack_rows(pack_rows(rows, codec)) == rows
+
+
+def test_repeated_values_are_dictionary_encoded():
+    columns = to_columns([['', 'Credit Card'] for _ in range(10)])['columns']
+    assert columns[1] == {'dict': ['Credit Card'], 'codes': [0] * 10}
+
+
+def test_unpack_accepts_memoryview():
+    rows = [['a', 'b']]
+    assert unpack_rows(memoryview(pack_rows(rows))) == rows
+
+
+def test_unknown_codec():
+    with pytest.raises(SheetCodecError):
+        pack_rows([['a']], 'snappy')
+
+
+@pytest.mark.parametrize('blob', [
+    b'',
+    b'not a sheet',
+    b'SC\x02z',
+    b'SC\x01?' + b'body',
+    b'SC\x01z' + b'corrupt',
+])
+def test_bad_payloads(blob):
+    with pytest.raises(SheetCodecError):
+        unpack_rows(blob)
+
+
+@pytest.mark.parametrize('payload', [
+    {},
+    {'widths': [[2, 2]], 'columns': [{'values': ['a', 'b']}]},
+    {'widths': [[1, 3]], 'columns': [{'values': ['a']}]},
+    {'widths': [[1, 1], [2, 1]], 'columns': [{'values': ['a', 'b']}]},
+    {'widths': [[1, 1]], 'columns': [{'dict': ['a'], 'codes': [4]}]},
+])
+def test_malformed_column_layout(payload):
+    with pytest.raises(SheetCodecError):
+        from_columns(payload)
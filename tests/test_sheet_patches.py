@@ -0,0 +1,167 @@
+import pytest
+
+from sheet_patches import apply_patches, PatchError, PatchConflict
+
+
+class GridSheet:
+    """In-memory stand-in for the Sheet row API, with small chunks"""
+
+    chunk_size = 2
+
+    def __init__(self, rows, computed_values=None):
+        self.rows = [list(row) for row in rows]
+        self.computed_values = computed_values or {}
+
+    def num_rows(self):
+        return len(self.rows)
+
+    def get_rows(self, start=0, stop=None):
+        return [list(row) for row in self.rows[start:stop]]
+
+    def set_rows(self, start, rows):
+        self.rows[start:start + len(rows)] = [list(row) for row in rows]
+
+    def splice_rows(self, start, delete_count, rows):
+        self.rows[start:start + delete_count] = [list(row) for row in rows]
+
+
+def make_sheet():
+    return GridSheet([['A', 'B', 'C'], ['1', '2', '3'], ['4', '5', '6']])
+
+
+def apply(sheet, *patches, **limits):
+    return apply_patches(sheet, list(patches), **limits)
+
+
+def test_set_cell_at_corners():
+    sheet = make_sheet()
+    changed = apply(sheet,
+                    {'op': 'set_cell', 'row': 0, 'col': 0, 'value': 'x'},
+                    {'op': 'set_cell', 'row': 2, 'col': 2, 'value': 9})
+    assert changed == {(0, 0), (2, 2)}
+    assert sheet.rows == [['x', 'B', 'C'], ['1', '2', '3'], ['4', '5', '9']]
+
+
+def test_set_cell_past_the_width_pads_the_row():
+    sheet = make_sheet()
+    apply(sheet, {'op': 'set_cell', 'row': 1, 'col': 4, 'value': 'e'}, max_cols=5)
+    assert sheet.rows[1] == ['1', '2', '3', '', 'e']
+
+
+@pytest.mark.parametrize('patch', [
+    {'op': 'set_cell', 'row': 3, 'col': 0},
+    {'op': 'set_cell', 'row': 0, 'col': 5},
+    {'op': 'set_cell', 'row': -1, 'col': 0},
+    {'op': 'set_cell', 'row': True, 'col': 0},
+    {'op': 'insert_row', 'index': 4},
+    {'op': 'insert_row', 'index': 3, 'count': 11},
+    {'op': 'insert_row', 'index': 0, 'rows': [['x'] * 6]},
+    {'op': 'delete_row', 'index': 3},
+    {'op': 'delete_row', 'index': 2, 'count': 2},
+    {'op': 'delete_row', 'index': 0, 'count': 0},
+    {'op': 'move_row', 'from': 0, 'to': 3},
+    {'op': 'insert_col', 'index': 0, 'count': 3},
+    {'op': 'insert_col', 'index': 5, 'count': 1},
+    {'op': 'delete_col', 'index': 5},
+    {'op': 'delete_col', 'index': 4, 'count': 2},
+    {'op': 'move_col', 'from': 5, 'to': 0},
+    {'op': 'resize'},
+    'set_cell',
+])
+def test_out_of_range_and_malformed_patches(patch):
+    sheet = make_sheet()
+    with pytest.raises(PatchError):
+        apply(sheet, patch, max_cols=5, max_insert_rows=10)
+
+
+def test_inserted_rows_are_capped_per_batch():
+    sheet = make_sheet()
+    with pytest.raises(PatchError):
+        apply(sheet,
+              {'op': 'insert_row', 'index': 1, 'count': 6},
+              {'op': 'insert_row', 'index': 1, 'rows': [[]] * 5},
+              max_insert_rows=10)
+
+
+def test_insert_row_at_top_and_bottom():
+    sheet = make_sheet()
+    changed = apply(sheet,
+                    {'op': 'insert_row', 'index': 0, 'rows': [['h', 1, 2.5]]},
+                    {'op': 'insert_row', 'index': 4, 'count': 2})
+    assert changed is None
+    assert sheet.rows == [['h', '1', '2.5'], ['A', 'B', 'C'], ['1', '2', '3'], ['4', '5', '6'],
+                          ['', '', ''], ['', '', '']]
+
+
+def test_delete_last_rows():
+    sheet = make_sheet()
+    apply(sheet, {'op': 'delete_row', 'index': 1, 'count': 2})
+    assert sheet.rows == [['A', 'B', 'C']]
+
+
+def test_move_row_between_ends():
+    sheet = make_sheet()
+    apply(sheet, {'op': 'move_row', 'from': 2, 'to': 0})
+    assert sheet.rows == [['4', '5', '6'], ['A', 'B', 'C'], ['1', '2', '3']]
+    apply(sheet, {'op': 'move_row', 'from': 0, 'to': 2})
+    assert sheet.rows == make_sheet().rows
+
+
+def test_insert_col_at_both_edges():
+    sheet = make_sheet()
+    apply(sheet,
+          {'op': 'insert_col', 'index': 0, 'values': ['first']},
+          {'op': 'insert_col', 'index': 4, 'values': ['last', 'x']},
+          max_cols=5)
+    assert sheet.rows == [['first', 'A', 'B', 'C', 'last'],
+                          ['', '1', '2', '3', 'x'],
+                          ['', '4', '5', '6', '']]
+
+
+def test_insert_col_past_the_width_pads_rows():
+    sheet = make_sheet()
+    apply(sheet, {'op': 'insert_col', 'index': 4, 'count': 1}, max_cols=5)
+    assert sheet.rows[0] == ['A', 'B', 'C', '', '']
+
+
+def test_delete_col_at_both_edges():
+    sheet = make_sheet()
+    apply(sheet, {'op': 'delete_col', 'index': 2}, {'op': 'delete_col', 'index': 0})
+    assert sheet.rows == [['B'], ['2'], ['5']]
+
+
+def test_move_col_between_ends():
+    sheet = make_sheet()
+    apply(sheet, {'op': 'move_col', 'from': 0, 'to': 2})
+    assert sheet.rows == [['B', 'C', 'A'], ['2', '3', '1'], ['5', '6', '4']]
+
+
+def test_wide_sheet_keeps_its_width():
+    sheet = GridSheet([['x'] * 8])
+    apply(sheet, {'op': 'set_cell', 'row': 0, 'col': 7, 'value': 'y'}, max_cols=4)
+    assert sheet.rows[0][7] == 'y'
+
+
+def test_cell_edits_apply_before_structural_edits():
+    sheet = make_sheet()
+    apply(sheet,
+          {'op': 'set_cell', 'row': 1, 'col': 0, 'value': 'moved'},
+          {'op': 'move_row', 'from': 1, 'to': 2},
+          {'op': 'set_cell', 'row': 1, 'col': 0, 'value': 'new'})
+    assert sheet.rows == [['A', 'B', 'C'], ['new', '5', '6'], ['moved', '2', '3']]
+
+def test_expect_matches_raw_or_computed_value():
+    sheet = GridSheet([['A', 'B'], ['=1+1', '3']], computed_values={'1:0': '2'})
+    apply(sheet,
+          {'op': 'set_cell', 'row': 1, 'col': 0, 'value': '5', 'expect': '2'},
+          {'op': 'set_cell', 'row': 1, 'col': 1, 'value': '6', 'expect': '3'})
+    assert sheet.rows[1] == ['5', '6']
+
+
+def test_expect_conflict_lists_the_cells():
+    sheet = make_sheet()
+    with pytest.raises(PatchConflict) as info:
+        apply(sheet,
+              {'op': 'set_cell', 'row': 2, 'col': 2, 'value': 'x', 'expect': 'stale'},
+              {'op': 'set_cell', 'row': 0, 'col': 0, 'value': 'y', 'expect': 'A'})
+    assert info.value.cells == [(2, 2)]
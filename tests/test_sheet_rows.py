@@ -0,0 +1,51 @@
+import json
+import re
+
+import pytest
+
+from app_updated import create_app, db, Sheet, User
+from sheet_codec import from_columns
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "sheets.db"}',
+        'EDITOR_VIRTUAL_THRESHOLD': 2,
+        'EDITOR_ROW_BLOCK': 2,
+    })
+    with app.app_context():
+        db.create_all()
+        user = User(username='owner', email='owner@example.com', password_hash='-')
+        db.session.add(user)
+        db.session.flush()
+        rows = [['Item', 'Price', 'Total']] + [[f'item{n}', str(n), f'=B{n + 2}*2'] for n in range(5)]
+        db.session.add(Sheet(sheet_name='Orders', user_id=user.id, data=rows))
+        db.session.commit()
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user.id)
+            session['_fresh'] = True
+        yield client
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.mark.parametrize('encoding', ['rows', 'columns'])
+def test_sheet_rows_returns_formulas_and_their_results(client, encoding):
+    data = client.get('/sheet_rows/Orders', query_string={'offset': 2, 'limit': 2, 'encoding': encoding}).get_json()
+    rows = from_columns(data['columns']) if encoding == 'columns' else data['rows']
+    assert rows == [['item2', '2', '=B4*2'], ['item3', '3', '=B5*2']]
+    assert data['values'] == {'3:2': '4', '4:2': '6'}
+
+
+def test_sheet_rows_values_follow_the_column_window(client):
+    data = client.get('/sheet_rows/Orders', query_string={'offset': 0, 'limit': 5, 'col_limit': 2}).get_json()
+    assert data['rows'][0] == ['item0', '0']
+    assert data['values'] == {}
+
+
+def test_virtual_editor_embeds_results_of_the_first_rows(client):
+    html = client.get('/edit_sheet/Orders').get_data(as_text=True)
+    computed = re.search(r"data-computed='([^']*)'", html).group(1)
+    assert json.loads(computed) == {'1:2': '0', '2:2': '2'}
@@ -0,0 +1,105 @@
+import pytest
+
+from app_updated import create_app, db, Sheet, SheetChunk, User
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "sheets.db"}',
+        'SHEET_CHUNK_ROWS': 3,
+    })
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username='owner', email='owner@example.com', password_hash='-'))
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+def grid(count, width=3):
+    return [[f'r{row}c{col}' for col in range(width)] for row in range(count)]
+
+
+def reload(sheet):
+    db.session.commit()
+    sheet_id = sheet.id
+    db.session.expunge_all()
+    return db.session.get(Sheet, sheet_id)
+
+
+def make_sheet(rows, storage):
+    sheet = Sheet(sheet_name='Sheet', user_id=User.query.one().id, storage=storage, data=rows)
+    db.session.add(sheet)
+    return sheet
+
+
+@pytest.mark.parametrize('storage', ['blob', 'chunked'])
+@pytest.mark.parametrize('count', [0, 1, 3, 4, 10])
+def test_rows_round_trip(app, storage, count):
+    rows = grid(count) + [['ragged'], []]
+    sheet = reload(make_sheet(rows, storage))
+    assert sheet.num_rows() == len(rows)
+    assert sheet.get_rows() == rows
+    assert sheet.get_rows(2, 5) == rows[2:5]
+
+
+@pytest.mark.parametrize('storage', ['blob', 'chunked'])
+@pytest.mark.parametrize('start, delete_count, inserted', [
+    (0, 0, 2),   # before the first row
+    (2, 2, 0),   # across a chunk boundary
+    (3, 0, 5),   # on a chunk boundary
+    (8, 3, 1),   # past the last row
+    (0, 10, 0),  # everything
+])
+def test_splice_rows_round_trip(app, storage, start, delete_count, inserted):
+    rows = grid(10)
+    sheet = make_sheet(rows, storage)
+    new_rows = [[f'new{n}'] for n in range(inserted)]
+
+    sheet.splice_rows(start, delete_count, new_rows)
+    rows[start:start + delete_count] = new_rows
+    sheet = reload(sheet)
+    assert sheet.get_rows() == rows
+
+
+def test_convert_to_chunked_keeps_rows(app):
+    rows = grid(7)
+    sheet = reload(make_sheet(rows, 'blob'))
+    sheet.convert_to_chunked(chunk_size=2)
+    sheet = reload(sheet)
+    assert sheet.is_chunked
+    assert sheet.get_rows() == rows
+
+
+@pytest.mark.parametrize('storage', ['blob', 'chunked'])
+def test_saved_formula_results_keep_their_type(app, storage):
+    sheet = reload(make_sheet([['Flag', 'Code'], ['=1>0', '="007"'], ['', '']], storage))
+    sheet.set_rows(2, [['=A2*3', '=B2&"x"']])
+    sheet.recalculate({(2, 0), (2, 1)})
+    sheet = reload(sheet)
+    assert sheet.get_display_rows(2, 3) == [['3', '007x']]
+
+
+@pytest.mark.parametrize('codec', ['none', 'zlib'])
+def test_chunks_round_trip_with_each_compression(app, codec):
+    app.config['SHEET_COMPRESSION'] = codec
+    rows = grid(7)
+    sheet = reload(make_sheet(rows, 'chunked'))
+    chunks = SheetChunk.query.filter_by(sheet_id=sheet.id).all()
+    assert all((chunk.packed is None) == (codec == 'none') for chunk in chunks)
+    assert sheet.get_rows() == rows
+
+
+def test_chunks_stay_readable_after_switching_compression(app):
+    rows = grid(7)
+    sheet = reload(make_sheet(rows, 'chunked'))
+    app.config['SHEET_COMPRESSION'] = 'zlib'
+    sheet.set_rows(4, [['changed']])
+    rows[4] = ['changed']
+    sheet = reload(sheet)
+    packed = [chunk.packed is not None for chunk in
+              SheetChunk.query.filter_by(sheet_id=sheet.id).order_by(SheetChunk.chunk_index)]
+    assert packed == [False, True, False]
+    assert sheet.get_rows() == rows